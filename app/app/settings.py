@@ -45,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # answers /healthz and /readyz before anything else runs
+    'core.health.HealthCheckMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,16 +82,64 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# requests check connections out of a per-process pool instead of opening
+# one each, see core.backends.postgresql_pool; DB_POOL=off to disable
+DB_POOL = os.environ.get('DB_POOL', 'on') != 'off'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql_pool' if DB_POOL
+        else 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        # seconds before a connection attempt to an unreachable server fails
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'IDLE_TIMEOUT': 300,
+            'CHECK_INTERVAL': 5,
+            'TIMEOUT': 30,
+        },
     }
 }
 
+# read replicas of the primary as host or host=weight, separated by commas;
+# the safe-method requests of the api read from them, see core.replicas
+DATABASE_REPLICAS = {}
+for number, replica in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, weight = replica.partition('=')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS[f'replica_{number}'] = int(weight or 1)
+if not DATABASE_REPLICAS:
+    # a second connection to the primary, only read from once named in
+    # DATABASE_REPLICAS, so replica routing can be exercised locally
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# seconds a replica failing to connect is left out
+REPLICA_RETRY_AFTER = 30
+# seconds users read from the primary after writing, longer than replicas
+# may lag behind it
+READ_YOUR_WRITES_WINDOW = 5
+READ_YOUR_WRITES_CACHE_SIZE = 100000
+# alias in CACHES of a cache shared between processes, required once
+# DATABASE_REPLICAS is set, see core.checks
+READ_YOUR_WRITES_SHARED_CACHE = os.environ.get(
+    'READ_YOUR_WRITES_SHARED_CACHE')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -130,4 +182,115 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 
+# how media is sent once access is checked: 'django' streams files from
+# the worker, 'x-accel-redirect' (nginx) and 'x-sendfile' (Apache,
+# lighttpd) hand the transfer to the front-end server
+MEDIA_SERVING = os.environ.get('MEDIA_SERVING', 'django')
+# internal nginx location aliasing MEDIA_ROOT, for 'x-accel-redirect'
+MEDIA_ACCEL_REDIRECT_LOCATION = os.environ.get(
+    'MEDIA_ACCEL_REDIRECT_LOCATION', '/protected-media/')
+# seconds clients may keep files whose name changes with their content
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
 AUTH_USER_MODEL = 'core.User'
+
+# paginated lists counting at least this many rows use the planner's
+# estimate instead of an exact COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+# Token authentication cache
+
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 60
+# alias in CACHES of a cache shared between processes, None to disable
+AUTH_TOKEN_SHARED_CACHE = os.environ.get('AUTH_TOKEN_SHARED_CACHE')
+
+
+# Post api
+
+# most tags or contents created by one bulk request
+POST_BULK_CREATE_MAX_SIZE = 1000
+# tags returned by the tag cloud by default and at most
+TAG_CLOUD_SIZE = 50
+TAG_CLOUD_MAX_SIZE = 500
+# tags returned by ?prefix= autocompletion by default and at most
+TAG_AUTOCOMPLETE_SIZE = 10
+TAG_AUTOCOMPLETE_MAX_SIZE = 100
+# tags kept in per-user autocompletion tries per process, and for how long
+TAG_AUTOCOMPLETE_CACHE_SIZE = 200000
+TAG_AUTOCOMPLETE_CACHE_TTL = 300
+
+# rendered post detail documents kept per process, and for how long
+POST_DOCUMENT_CACHE_SIZE = 10000
+POST_DOCUMENT_CACHE_TTL = 300
+# alias in CACHES of a cache shared between processes, None to disable
+POST_DOCUMENT_SHARED_CACHE = os.environ.get('POST_DOCUMENT_SHARED_CACHE')
+
+
+# Post images
+
+# renditions rendered for every uploaded post image, fitting in size
+POST_IMAGE_RENDITIONS = {
+    'thumbnail': {'size': (200, 200), 'format': 'JPEG', 'quality': 80},
+    'medium': {'size': (800, 800), 'format': 'JPEG', 'quality': 85},
+    'webp': {'size': (1600, 1600), 'format': 'WEBP', 'quality': 80},
+}
+# processes rendering them, None for one per cpu
+POST_IMAGE_RENDITION_WORKERS = int(
+    os.environ.get('POST_IMAGE_RENDITION_WORKERS', 0)) or None
+
+# 'header' checks uploads from their image header alone, 'pillow' has
+# Pillow open and verify the whole file
+POST_IMAGE_VALIDATION = 'header'
+POST_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# largest upload in bytes, and in pixels once decoded
+POST_IMAGE_MAX_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+# most bytes read looking for an image header
+POST_IMAGE_HEADER_MAX_SIZE = 1024 * 1024
+# directory of partially received resumable uploads, on storage shared by
+# every worker, MEDIA_ROOT/partial when not set
+POST_IMAGE_UPLOAD_DIR = os.environ.get('POST_IMAGE_UPLOAD_DIR')
+# seconds an upload may go without receiving data before it is cleaned up
+POST_IMAGE_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# text search configuration post search documents are built with
+POST_SEARCH_CONFIG = os.environ.get('POST_SEARCH_CONFIG', 'english')
+
+
+# Instrumentation
+
+# share of requests, picked at random, timed and reported in Server-Timing
+# headers and core.timing log lines
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.environ.get('SERVER_TIMING_SAMPLE_RATE', 0.01))
+# runs the tests with no request sampled, whatever the rate above
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# url namespaces whose requests are counted and timed by route
+METRICS_NAMESPACES = ('post', 'user')
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# directory shared by the processes of a prefork server, each writing its
+# metrics there every METRICS_FLUSH_INTERVAL seconds for /metrics to sum
+# them, to be emptied when the server starts; None for one process
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1
+# clients /metrics answers: loopback, and the comma separated networks of
+# METRICS_ALLOWED_NETWORKS, e.g. the scraper's subnet. Clients are told
+# apart by REMOTE_ADDR, which behind a proxy is the proxy's address, so
+# the proxy must not forward /metrics
+METRICS_ALLOWED_NETWORKS = ('127.0.0.0/8', '::1/128') + tuple(
+    filter(None, os.environ.get('METRICS_ALLOWED_NETWORKS', '').split(',')))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -1,12 +1,19 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Q
 from django.utils.translation import gettext as _
 from core import models
+from core.pagination import EstimatedCountPaginator
 
 
 class UserAdmin(BaseUserAdmin):
+    paginator = EstimatedCountPaginator
     ordering = ['id']
     list_display = ['email', 'name']
+    list_filter = ['is_active', 'is_staff', 'is_superuser']
+    # prefix search, served by the upper(email) index
+    search_fields = ['^email']
+    show_full_result_count = False
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal Info'), {'fields': ('name',)}),
@@ -26,7 +33,60 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class HasImageFilter(admin.SimpleListFilter):
+    """Filter posts by whether an image was uploaded"""
+    title = _('image')
+    parameter_name = 'has_image'
+
+    def lookups(self, request, model_admin):
+        return (('yes', _('Yes')), ('no', _('No')))
+
+    def queryset(self, request, queryset):
+        no_image = Q(image__isnull=True) | Q(image='')
+        if self.value() == 'yes':
+            return queryset.exclude(no_image)
+        if self.value() == 'no':
+            return queryset.filter(no_image)
+        return queryset
+
+
+class TagAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    ordering = ['-id']
+    list_display = ['name', 'user']
+    list_select_related = ['user']
+    # prefix search, served by the upper(name) index
+    search_fields = ['^name']
+    autocomplete_fields = ['user']
+    show_full_result_count = False
+
+
+class ContentAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    ordering = ['-id']
+    list_display = ['title', 'user']
+    list_select_related = ['user']
+    # prefix search, served by the upper(title) index
+    search_fields = ['^title']
+    autocomplete_fields = ['user']
+    show_full_result_count = False
+
+
+class PostAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    ordering = ['-id']
+    list_display = ['__str__', 'user']
+    # Post.__str__ reads the user's name
+    list_select_related = ['user']
+    list_filter = [HasImageFilter]
+    # prefix search, served by the upper(post_title) index
+    search_fields = ['^post_title']
+    # only selected tags and contents are rendered, not whole tables
+    autocomplete_fields = ['user', 'tags', 'contents']
+    show_full_result_count = False
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Content)
-admin.site.register(models.Post)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Content, ContentAdmin)
+admin.site.register(models.Post, PostAdmin)
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+
+# token -> field values of (user, token) lookups, shared by every thread
+# of this process
+token_cache = LRUCache(
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+def _cache_key(key):
+    """Cache key for a token, hashed so raw tokens never leave the db"""
+    return 'auth-token-fields:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _field_values(instance):
+    """Return the (db, {attname: value}) a model instance was loaded with"""
+    return instance._state.db, {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    }
+
+
+def _from_field_values(model, db, values):
+    """Return a new instance of model, as loaded with values from db"""
+    return model.from_db(db, list(values), list(values.values()))
+
+
+def _shared_cache():
+    """Return the optional cache shared between processes"""
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def invalidate_token(key):
+    """Forget the cached lookup of a token"""
+    cache_key = _cache_key(key)
+    token_cache.delete(cache_key)
+
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(cache_key)
+
+
+def invalidate_user_tokens(user):
+    """Forget the cached lookups of every token of a user"""
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches token to user lookups
+
+    Lookups are kept in a bounded in-process LRU and, when
+    AUTH_TOKEN_SHARED_CACHE names a cache alias, in that cache too.
+    Entries are dropped when the token is deleted or its user is saved,
+    so deactivations and password changes apply to the next request in
+    this process. Other processes may keep their local entry until it
+    expires after AUTH_TOKEN_CACHE_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        cached = token_cache.get(cache_key)
+
+        if cached is None:
+            shared = _shared_cache()
+            if shared is not None:
+                cached = shared.get(cache_key)
+            if cached is None:
+                user, token = super().authenticate_credentials(key)
+                cached = (_field_values(user), _field_values(token))
+                if shared is not None:
+                    shared.set(
+                        cache_key, cached, settings.AUTH_TOKEN_CACHE_TTL)
+            token_cache.set(cache_key, cached)
+
+        # every request gets instances of its own, which it may modify
+        user = _from_field_values(get_user_model(), *cached[0])
+        token = _from_field_values(Token, *cached[1])
+        token.user = user
+        return (user, token)
@@ -0,0 +1,133 @@
+"""PostgreSQL backend checking connections out of a per-process pool
+
+Django opens a connection per request when CONN_MAX_AGE is 0, paying TCP
+and authentication setup each time. With this backend, closing the
+connection at the end of the request returns it to a pool shared by the
+threads of the process instead, and the next request on any thread
+checks it out. Under ASGI as under WSGI, each thread running views still
+holds at most one connection per database, only while a request runs.
+
+Configured by POOL in the DATABASES entry, all optional:
+
+    'POOL': {
+        'MIN_SIZE': 0,         # connections kept open however long idle
+        'MAX_SIZE': 10,        # connections open at once
+        'IDLE_TIMEOUT': 300,   # seconds before an idle connection closes
+        'CHECK_INTERVAL': 5,   # seconds idle before a checkout pings it
+        'TIMEOUT': 30,         # seconds a checkout waits when all are busy
+    }
+"""
+import os
+import threading
+
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.pool import ConnectionPool
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options):
+    """Return the pool of a database, creating it in a new process"""
+    key = (alias, tuple(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                connect=lambda: Database.connect(**conn_params),
+                close=lambda connection: connection.close(),
+                check=check_connection,
+                reset=reset_connection,
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                check_interval=options.get('CHECK_INTERVAL', 5),
+                timeout=options.get('TIMEOUT', 30),
+            )
+        return pool
+
+
+def close_pools():
+    """Close the pooled connections of this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Return the stats of this process' pools, by database alias"""
+    with _pools_lock:
+        pools = [(key[0], pool) for key, pool in _pools.items()
+                 if pool.pid == os.getpid()]
+    return {alias: pool.stats() for alias, pool in pools}
+
+
+def check_connection(connection):
+    """Tell whether the server still answers on a connection"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+    except Database.Error:
+        return False
+
+
+def reset_connection(connection):
+    """End any transaction left open, tell whether that worked"""
+    if connection.closed:
+        return False
+    try:
+        if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        return connection.get_transaction_status() == TRANSACTION_STATUS_IDLE
+    except Database.Error:
+        return False
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # pooled connections to the test database would block dropping it
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    pool = None
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(
+            self.alias, conn_params, self.settings_dict.get('POOL', {}))
+        connection = self.pool.acquire()
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # closed in a transaction, the connection stays referenced
+                # here until the next connect(), it cannot be lent out
+                self.pool.discard(self.connection)
+            else:
+                self.pool.release(self.connection)
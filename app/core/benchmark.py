@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+def timed(func, *args, **kwargs):
+    """Call func and return (seconds taken, result)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+class BenchmarkCommand(BaseCommand):
+    """Base for benchmark commands run against the configured database
+
+    Whatever the benchmark writes is rolled back at the end, so it can be
+    pointed at a development database without leaving data behind.
+    Benchmarks querying from other threads or processes, which cannot see
+    uncommitted rows, set `rollback` to False and clean up themselves.
+    """
+    rollback = True
+
+    def handle(self, *args, **options):
+        if not self.rollback:
+            self.benchmark(**options)
+            return
+        with transaction.atomic():
+            self.benchmark(**options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, **options):
+        raise NotImplementedError
+
+    def report(self, label, count, seconds, unit='ops'):
+        """Write one line of results"""
+        self.stdout.write(
+            f'{label:<32} {count:>8} {unit} in {seconds:8.3f}s '
+            f'{count / seconds:12.1f} {unit}/s'
+        )
+
+    def report_latencies(self, label, latencies):
+        """Write the median, p99 and worst of latencies, in milliseconds"""
+        latencies = sorted(latencies)
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+
+        self.stdout.write(
+            f'{label:<32} p50 {percentile(0.5) * 1000:8.3f}ms '
+            f'p99 {percentile(0.99) * 1000:8.3f}ms '
+            f'max {latencies[-1] * 1000:8.3f}ms'
+        )
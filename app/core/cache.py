@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+_missing = object()
+
+
+class LRUCache:
+    """Thread safe in-process cache bounded by size, with optional expiry
+
+    Once `max_size` entries are stored, setting a new key evicts the least
+    recently used one. Entries older than `ttl` seconds are treated as
+    missing and dropped when next read. Hits, misses and evictions are
+    counted for monitoring.
+
+    With `weigh` given, `max_size` bounds the sum of weigh(value) over the
+    stored values rather than their number. Values are weighed when set.
+    """
+
+    def __init__(self, max_size, ttl=None, weigh=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.weigh = weigh or (lambda value: 1)
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pop(self, key=_missing):
+        """Drop key, or the least recently used entry, holding the lock"""
+        if key is _missing:
+            _, entry = self._entries.popitem(last=False)
+        else:
+            entry = self._entries.pop(key)
+        self.weight -= entry[2]
+
+    def get(self, key, default=None):
+        """Return the value stored for key and mark it recently used"""
+        with self._lock:
+            value, expires, _ = self._entries.get(key, (_missing, None, 0))
+            if value is _missing:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= time.monotonic():
+                self._pop(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value for key, evicting the oldest entries when full"""
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        weight = self.weigh(value)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, expires, weight)
+            self.weight += weight
+            # a value heavier than max_size alone is not kept either
+            while self.weight > self.max_size:
+                self._pop()
+                self.evictions += 1
+
+    def delete(self, key):
+        """Drop key if present"""
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def stats(self):
+        """Return the cache's counters and current size"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+        }
+
+    def __len__(self):
+        return len(self._entries)
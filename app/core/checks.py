@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+# cache backends that keep their entries in the process using them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register()
+def check_read_your_writes_cache(app_configs, **kwargs):
+    """Require a cache shared between processes once reads use replicas
+
+    Writes are remembered in that cache, see core.replicas.wrote, so
+    the writer's next reads go to the primary whichever process of a
+    prefork server answers them.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return []
+
+    alias = settings.READ_YOUR_WRITES_SHARED_CACHE
+    if not alias or alias not in settings.CACHES:
+        return [Error(
+            'READ_YOUR_WRITES_SHARED_CACHE must name a cache in CACHES '
+            'when DATABASE_REPLICAS is set.',
+            hint='Configure a cache shared between processes, e.g. '
+                 'memcached, and name its alias.',
+            id='core.E001',
+        )]
+    if settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'The {alias!r} cache is local to each process, users could '
+            f'miss their writes reading from replicas.',
+            hint='Name a cache shared between processes in '
+                 'READ_YOUR_WRITES_SHARED_CACHE.',
+            id='core.E002',
+        )]
+    return []
@@ -0,0 +1,132 @@
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+
+
+def check_database(alias):
+    """Run a round trip to a database, raising DatabaseError on failure
+
+    Unlike looking the connection up, this opens it when needed and
+    waits for the server to answer.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def wait_for_database(alias, timeout, base_delay=0.1, max_delay=5.0,
+                      sleep=None, clock=None):
+    """Check a database until it answers, return the attempts it took
+
+    Attempts are spaced by exponential backoff with full jitter, random
+    delays up to base_delay doubled per attempt and capped at max_delay,
+    so containers started together do not retry in step. Raises the last
+    error once timeout seconds have passed. sleep and clock default to
+    time.sleep and time.monotonic, looked up when called.
+    """
+    sleep = sleep or time.sleep
+    clock = clock or time.monotonic
+    deadline = clock() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            check_database(alias)
+            return attempt
+        except DatabaseError:
+            # a failed connection must not be reused by the next attempt
+            connections[alias].close()
+            remaining = deadline - clock()
+            if remaining <= 0:
+                raise
+            delay = random.uniform(
+                0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            sleep(min(delay, remaining))
+
+
+class MigrationState:
+    """Tells whether the migrations on disk are all applied
+
+    Checking loads every migration, so once they are found applied the
+    answer is kept for the life of the process: a running process' code
+    does not gain migrations.
+    """
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+        self.applied = False
+
+    def pending(self):
+        """Return the names of unapplied migrations"""
+        if self.applied:
+            return []
+        executor = MigrationExecutor(connections[self.alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        pending = [str(migration) for migration, _ in plan]
+        self.applied = not pending
+        return pending
+
+
+migration_state = MigrationState()
+
+
+class HealthCheckMiddleware:
+    """Answer liveness and readiness probes ahead of the other middleware
+
+    /healthz answers as long as the process serves requests, without
+    touching its dependencies, so an outage of the database does not get
+    every container restarted. /readyz also checks every configured
+    database and that migrations are applied, answering 503 until then;
+    read replicas are reported but not waited for.
+
+    Probes skip host validation, sessions and authentication, so it must
+    come first in MIDDLEWARE.
+    """
+
+    liveness_path = '/healthz'
+    readiness_path = '/readyz'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == self.liveness_path:
+            return JsonResponse({'status': 'ok'})
+        if request.path == self.readiness_path:
+            return self.readiness()
+        return self.get_response(request)
+
+    def readiness(self):
+        """Check the databases and migrations, respond with the results"""
+        ready = True
+        databases = {}
+        for alias in connections:
+            try:
+                check_database(alias)
+                databases[alias] = 'ok'
+            except DatabaseError as error:
+                # the failed connection is closed once the request finishes
+                databases[alias] = type(error).__name__
+                # reads fall back to the primary while replicas are down
+                if alias not in settings.DATABASE_REPLICAS:
+                    ready = False
+
+        migrations = 'unknown'
+        if databases.get(migration_state.alias) == 'ok':
+            try:
+                pending = migration_state.pending()
+                migrations = 'pending' if pending else 'ok'
+            except DatabaseError as error:
+                migrations = type(error).__name__
+        ready = ready and migrations == 'ok'
+
+        return JsonResponse({
+            'status': 'ok' if ready else 'unavailable',
+            'databases': databases,
+            'migrations': migrations,
+        }, status=200 if ready else 503)
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import CachedTokenAuthentication, token_cache
+from core.benchmark import BenchmarkCommand, timed
+from user.views import ManageUserView
+
+
+class Command(BenchmarkCommand):
+    help = "Compare authenticated requests per second with and without " \
+           "the token cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+
+    def benchmark(self, requests, **options):
+        user = get_user_model().objects.create_user(
+            email='benchmark-auth@email.com',
+            password='demo1234'
+        )
+        token = Token.objects.create(user=user)
+        request = APIRequestFactory().get(
+            '/api/user/me/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        for label, auth_class in (
+            ('token auth, no cache', TokenAuthentication),
+            ('token auth, cached', CachedTokenAuthentication),
+        ):
+            token_cache.clear()
+            view = ManageUserView.as_view(
+                authentication_classes=(auth_class,))
+
+            def run():
+                for _ in range(requests):
+                    view(request).render()
+
+            seconds, _ = timed(run)
+            self.report(label, requests, seconds, unit='requests')
@@ -0,0 +1,40 @@
+from django.db import connections
+from django.db.utils import load_backend
+
+from core.backends.postgresql_pool.base import close_pools, pool_stats
+from core.benchmark import BenchmarkCommand, timed
+
+
+class Command(BenchmarkCommand):
+    help = "Compare the connection overhead of requests with and without " \
+           "the connection pool"
+    # nothing is written, and rolling back would hold a connection open
+    rollback = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def benchmark(self, requests, **options):
+        settings_dict = connections['default'].settings_dict
+        for label, engine in (
+            ('connection per request', 'django.db.backends.postgresql'),
+            ('pooled connections', 'core.backends.postgresql_pool'),
+        ):
+            connection = load_backend(engine).DatabaseWrapper(
+                {**settings_dict, 'ENGINE': engine, 'CONN_MAX_AGE': 0},
+                alias='benchmark'
+            )
+
+            def request():
+                # a request's first query connects, and finishing the
+                # request closes the connection once CONN_MAX_AGE is past
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                connection.close_if_unusable_or_obsolete()
+
+            latencies = [timed(request)[0] for _ in range(requests)]
+            self.report(label, requests, sum(latencies), unit='requests')
+            self.report_latencies(label, latencies)
+
+        self.stdout.write(f'pool: {pool_stats()["benchmark"]}')
+        close_pools()
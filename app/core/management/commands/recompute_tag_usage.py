@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Post
+
+
+def recount(queryset, field, actual, batch_size):
+    """Set field to actual on rows where they differ, a batch at a time
+
+    Returns the number of rows corrected.
+    """
+    corrected = 0
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list(
+            'pk', flat=True)[:batch_size])
+        if not ids:
+            return corrected
+        last_id = ids[-1]
+
+        # counting inside the UPDATE keeps changes made since the ids were
+        # read from being overwritten by a stale count
+        corrected += queryset.filter(pk__in=ids).annotate(
+            actual=actual
+        ).exclude(**{field: F('actual')}).update(**{field: actual})
+
+
+class Command(BaseCommand):
+    help = "Recompute tag post counts and user tag usage totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        links = Post.tags.through.objects.filter(
+            tag_id=OuterRef('pk')
+        ).order_by().values('tag_id').annotate(count=Count('id'))
+        tags = recount(
+            Tag.objects.all(),
+            'post_count',
+            Coalesce(Subquery(links.values('count')), 0),
+            batch_size
+        )
+        self.stdout.write(f'{tags} tag post counts corrected')
+
+        totals = Tag.objects.filter(
+            user_id=OuterRef('pk')
+        ).order_by().values('user_id').annotate(total=Sum('post_count'))
+        users = recount(
+            get_user_model().objects.all(),
+            'tag_usage_total',
+            Coalesce(Subquery(totals.values('total')), 0),
+            batch_size
+        )
+        self.stdout.write(f'{users} user tag usage totals corrected')
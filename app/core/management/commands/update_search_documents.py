@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Post, update_search_documents
+
+
+class Command(BaseCommand):
+    help = "Build the search documents of posts, by default only of posts" \
+           " created before searching was added"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', dest='update_all',
+            help="rebuild every document, e.g. after POST_SEARCH_CONFIG "
+                 "changed")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, update_all, batch_size, **options):
+        posts = Post.objects.all()
+        if not update_all:
+            posts = posts.filter(search_document=None)
+
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(posts.filter(pk__gt=last_id).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            update_search_documents(ids)
+            updated += len(ids)
+
+        self.stdout.write(f'{updated} post search documents updated')
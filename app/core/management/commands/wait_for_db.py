@@ -1,20 +1,65 @@
 import time
-from django.db import connections
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+from core.health import wait_for_database
 
 
 class Command(BaseCommand):
-    help = "Custom command to wait for database connection"
+    help = "Wait until every database but the read replicas answers a" \
+           " query, checking them in parallel with exponential backoff"
 
-    def handle(self, *args, **options):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help="alias of a database to wait for, can be repeated, every "
+                 "configured database but the read replicas by default")
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help="seconds to wait before failing")
+        parser.add_argument('--base-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5.0)
+
+    def handle(self, *args, databases, timeout, base_delay, max_delay,
+               **options):
+        # reads fall back to the primary while replicas are down
+        aliases = databases or [
+            alias for alias in settings.DATABASES
+            if alias not in settings.DATABASE_REPLICAS
+        ]
         self.stdout.write("Waiting for db...")
-        db_conn = None
-        while not db_conn:
+
+        def wait(alias):
+            start = time.monotonic()
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write(
-                    "Database is unavaliable, waiting for 1 sec...")
-                time.sleep(1)
+                attempts = wait_for_database(
+                    alias, timeout, base_delay, max_delay)
+            finally:
+                # this thread is not a request's, nothing else closes it
+                connections[alias].close()
+            return attempts, time.monotonic() - start
+
+        with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+            futures = [(alias, executor.submit(wait, alias))
+                       for alias in aliases]
+
+        failed = []
+        for alias, future in futures:
+            try:
+                attempts, seconds = future.result()
+            except DatabaseError as error:
+                failed.append(alias)
+                self.stderr.write(f"Database {alias!r} is unavailable: "
+                                  f"{str(error) or type(error).__name__}")
+                continue
+            self.stdout.write(
+                f"Database {alias!r} answered after {attempts} attempts "
+                f"in {seconds:.1f}s")
+
+        if failed:
+            raise CommandError(
+                f"Gave up waiting for {', '.join(failed)} after {timeout}s")
         self.stdout.write(self.style.SUCCESS('Database is available!'))
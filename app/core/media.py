@@ -0,0 +1,133 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Return the [start, stop) bytes a Range header asks for, or None
+
+    None asks for the whole file: no header, a malformed one or several
+    ranges, which may all be answered in full. Raises ValueError when the
+    range lies past the end of the file.
+    """
+    match = RANGE.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 is the last 500 bytes
+        start, stop = max(size - int(last), 0), size
+    else:
+        start = int(first)
+        stop = min(int(last) + 1, size) if last else size
+    if start >= size or start >= stop:
+        raise ValueError(header)
+    return start, stop
+
+
+def read_span(path, start, length):
+    """Yield length bytes of a file from start, a chunk at a time"""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def stream_file(request, path, size, content_type, etag):
+    """Respond with the file, or the byte range the request asks for"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    try:
+        span = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if span is None or (if_range and if_range != etag):
+        # served through wsgi.file_wrapper, i.e. sendfile, when available
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, stop = span
+        response = StreamingHttpResponse(
+            read_span(path, start, stop - start),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = stop - start
+        response['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def send_file(request, name, path, size, content_type, etag):
+    """Respond with a file's content or hand it to the front-end server"""
+    if settings.MEDIA_SERVING == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(
+            settings.MEDIA_ACCEL_REDIRECT_LOCATION + name)
+    elif settings.MEDIA_SERVING == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = stream_file(request, path, size, content_type, etag)
+    return response
+
+
+def serve_file(request, storage, name, immutable=False):
+    """Respond with a stored file, the way MEDIA_SERVING says
+
+    Files whose name changes with their content are immutable, clients may
+    keep them for MEDIA_IMMUTABLE_MAX_AGE seconds and their name gives the
+    ETag. Other files are revalidated on every use. Access must have been
+    checked by the caller.
+    """
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404(name)
+
+    if immutable:
+        etag = quote_etag(os.path.splitext(os.path.basename(name))[0])
+    else:
+        etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = send_file(
+            request, name, path, stat.st_size, content_type, etag)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # only ever served to the owner, shared caches must not keep it
+    if immutable:
+        patch_cache_control(
+            response, private=True, immutable=True,
+            max_age=settings.MEDIA_IMMUTABLE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,285 @@
+import atexit
+import bisect
+import ipaddress
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseNotFound
+
+from core.timing import RequestTimer
+
+
+def _escape(value):
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """A value per label set that only goes up"""
+    type = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        """Add amount to the value of a label set"""
+        with self.registry.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self):
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        return total + value
+
+    def expose(self, samples):
+        for labels, value in samples:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {value}'
+
+
+class Histogram:
+    """Observations per label set, counted in buckets of upper bounds"""
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label set -> (count per bucket then past the last, sum)
+        self.values = {}
+
+    def observe(self, labels, value):
+        """Count an observation of a label set"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            counts, total = self.values.get(
+                labels, ([0] * (len(self.buckets) + 1), 0))
+            counts[index] += 1
+            self.values[labels] = (counts, total + value)
+
+    def snapshot(self):
+        return [[list(labels), [list(counts), total]]
+                for labels, (counts, total) in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        return [[a + b for a, b in zip(total[0], value[0])],
+                total[1] + value[1]]
+
+    def expose(self, samples):
+        for labels, (counts, total) in samples:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield (f'{self.name}_bucket'
+                       f'{_labels(self.labelnames, labels, [("le", bound)])}'
+                       f' {cumulative}')
+            label_text = _labels(self.labelnames, labels)
+            yield f'{self.name}_sum{label_text} {total}'
+            yield f'{self.name}_count{label_text} {cumulative}'
+
+
+class Registry:
+    """Thread safe metrics of this process, exposed in Prometheus format
+
+    With `directory` set, on storage shared by the processes of a prefork
+    server, each process writes its metrics to a file of its own there,
+    at most every `flush_interval` seconds and when it exits, and
+    collecting sums every file. Files of exited processes are kept, so
+    counters never go down; the directory should be emptied when the
+    server starts.
+    """
+
+    def __init__(self, directory=None, flush_interval=1):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._flushed = 0
+        self._flush_lock = threading.Lock()
+        self._path = None
+        self._pid = None
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(
+            Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=()):
+        return self._register(
+            Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """Return the metrics of this process, as JSON compatible data"""
+        with self.lock:
+            return {name: metric.snapshot()
+                    for name, metric in self.metrics.items()}
+
+    def flush(self, force=False):
+        """Write this process' file, unless written less than a while ago"""
+        if self.directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        with self._flush_lock:
+            self._flushed = now
+            if self._pid != os.getpid():
+                # a forked process starts a file of its own, pids get reused
+                self._pid = os.getpid()
+                self._path = os.path.join(
+                    self.directory,
+                    f'metrics-{self._pid}-{uuid.uuid4().hex}.json'
+                )
+            temporary = f'{self._path}.tmp'
+            with open(temporary, 'w') as file:
+                json.dump(self.snapshot(), file)
+            # readers see the previous file or this one, never part of it
+            os.replace(temporary, self._path)
+
+    def collect(self):
+        """Return the metrics of every process, by metric name"""
+        if self.directory is None:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            snapshots = []
+            for name in os.listdir(self.directory):
+                if not (name.startswith('metrics-')
+                        and name.endswith('.json')):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as file:
+                        snapshots.append(json.load(file))
+                except FileNotFoundError:
+                    # the directory was emptied meanwhile
+                    continue
+
+        collected = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                if name not in self.metrics:
+                    continue
+                merge = self.metrics[name].merge
+                values = collected[name]
+                for labels, value in samples:
+                    labels = tuple(labels)
+                    values[labels] = (merge(values[labels], value)
+                                      if labels in values else value)
+        return collected
+
+    def expose(self):
+        """Return every metric in the Prometheus text format"""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.expose(sorted(values.items())))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(
+    directory=settings.METRICS_DIR,
+    flush_interval=settings.METRICS_FLUSH_INTERVAL
+)
+atexit.register(registry.flush, force=True)
+
+LABELS = ('route', 'method')
+# methods recorded by name, others share the 'other' label so clients
+# cannot add label sets at will
+METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE',
+    'CONNECT',
+))
+requests_total = registry.counter(
+    'http_requests_total', 'Requests answered', LABELS + ('status',))
+request_duration = registry.histogram(
+    'http_request_duration_seconds', 'Time taken answering requests',
+    LABELS, buckets=settings.METRICS_LATENCY_BUCKETS)
+db_queries_total = registry.counter(
+    'db_queries_total', 'Database queries run answering requests', LABELS)
+db_query_duration = registry.counter(
+    'db_query_duration_seconds_total',
+    'Time spent on database queries answering requests', LABELS)
+
+
+class MetricsMiddleware:
+    """Record request and query metrics by route, serve them at /metrics
+
+    Routes are named by their view name, e.g. post:post-list, for views
+    of the url namespaces in METRICS_NAMESPACES; other requests are not
+    recorded. /metrics answers clients from METRICS_ALLOWED_NETWORKS ahead
+    of host validation and authentication, the others get a 404. Clients
+    are told apart by REMOTE_ADDR, so a proxy in front of the server must
+    not forward /metrics, or every client shares the proxy's address.
+    """
+
+    path = '/metrics'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == self.path:
+            return self.metrics(request)
+
+        counter = RequestTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        if (match is not None
+                and match.namespace in settings.METRICS_NAMESPACES):
+            method = request.method
+            labels = (match.view_name,
+                      method if method in METHODS else 'other')
+            requests_total.inc(labels + (str(response.status_code),))
+            request_duration.observe(labels, duration)
+            db_queries_total.inc(labels, counter.queries)
+            db_query_duration.inc(labels, counter.query_seconds)
+            registry.flush()
+        return response
+
+    def metrics(self, request):
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR'))
+        except ValueError:
+            return HttpResponseNotFound()
+        networks = map(ipaddress.ip_network, settings.METRICS_ALLOWED_NETWORKS)
+        if not any(network.version == address.version and address in network
+                   for network in networks):
+            return HttpResponseNotFound()
+        return HttpResponse(
+            registry.expose(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
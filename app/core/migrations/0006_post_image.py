@@ -0,0 +1,19 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:30
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_auto_20200509_0647'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(null=True, upload_to=core.models.file_path),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:29
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # indexes are built without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_post_image'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='content',
+            index=models.Index(fields=['user', 'title', 'id'], name='core_content_user_title_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['user', 'id'], name='core_post_user_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name', 'id'], name='core_tag_user_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def upper_prefix_index(name, table, column):
+    """Index serving Django's case insensitive prefix and exact lookups"""
+    return migrations.RunSQL(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+        f'ON {table} (UPPER({column}::text) text_pattern_ops)',
+        f'DROP INDEX CONCURRENTLY IF EXISTS {name}',
+    )
+
+
+class Migration(migrations.Migration):
+    # indexes are built without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        upper_prefix_index('core_user_email_upper_idx', 'core_user', 'email'),
+        upper_prefix_index('core_tag_name_upper_idx', 'core_tag', 'name'),
+        upper_prefix_index(
+            'core_content_title_upper_idx', 'core_content', 'title'),
+        upper_prefix_index(
+            'core_post_title_upper_idx', 'core_post', 'post_title'),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:45
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the index is built without locking writes on large tables, existing
+    # tags are counted afterwards by the recompute_tag_usage command
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_user_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='post_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='tag_usage_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(fields=['user', 'post_count', 'id'], name='core_tag_user_usage_id_idx'),
+        ),
+    ]
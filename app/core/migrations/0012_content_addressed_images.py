@@ -0,0 +1,28 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:53
+
+import core.models
+import core.storage
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the index is built without locking writes on large tables, existing
+    # uploads are moved by the migrate_post_images command
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_post_image_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.file_path),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=models.Index(fields=['image'], name='core_post_image_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.0.14 on 2026-10-18 02:06
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the index is built without locking writes on large tables, existing
+    # posts are indexed afterwards by the update_search_documents command
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_image_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='core_post_search_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+
+def link_index(name, table, column):
+    """Index finding the posts linked to given rows, from the index alone
+
+    It replaces the index Django created on the column alone, which it
+    makes redundant.
+    """
+    def drop_column_index(apps, schema_editor):
+        connection = schema_editor.connection
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, table)
+        for index, constraint in constraints.items():
+            if constraint['index'] and not constraint['unique'] and \
+                    constraint['columns'] == [column]:
+                schema_editor.execute(
+                    f'DROP INDEX CONCURRENTLY IF EXISTS '
+                    f'{schema_editor.quote_name(index)}'
+                )
+
+    def create_column_index(apps, schema_editor):
+        index = schema_editor._create_index_name(table, [column])
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            f'{schema_editor.quote_name(index)} ON {table} ({column})'
+        )
+
+    return [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON {table} ({column}, post_id)',
+            f'DROP INDEX CONCURRENTLY IF EXISTS {name}',
+        ),
+        migrations.RunPython(drop_column_index, create_column_index),
+    ]
+
+
+class Migration(migrations.Migration):
+    # indexes are built without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_post_search'),
+    ]
+
+    operations = [
+        *link_index(
+            'core_post_tags_tag_post_idx', 'core_post_tags', 'tag_id'),
+        *link_index(
+            'core_post_contents_content_post_idx',
+            'core_post_contents',
+            'content_id'
+        ),
+    ]
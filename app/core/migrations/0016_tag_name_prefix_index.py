@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the index is built without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0015_post_link_indexes'),
+    ]
+
+    operations = [
+        # a user's tags by case insensitive name prefix, see
+        # post.autocomplete; the C collation lets LIKE 'prefix%' read one
+        # range of the index, in order
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'core_tag_user_name_prefix_idx ON core_tag '
+            '(user_id, (UPPER(name::text) COLLATE "C"), id)',
+            'DROP INDEX CONCURRENTLY IF EXISTS core_tag_user_name_prefix_idx',
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 1000
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Merge the tags of a user whose names only differ in case
+
+    The oldest tag of each group is kept, the posts tagged with the others
+    are tagged with it instead. Groups are merged a batch per transaction,
+    so locks are held briefly on large tables. Tag post counts and user
+    totals are recounted for the kept tags.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT ARRAY_AGG(id ORDER BY id) FROM core_tag '
+            'GROUP BY user_id, LOWER(name) HAVING COUNT(*) > 1'
+        )
+        groups = [ids for ids, in cursor.fetchall()]
+
+    for start in range(0, len(groups), BATCH_SIZE):
+        batch = groups[start:start + BATCH_SIZE]
+        duplicates = [tag_id for ids in batch for tag_id in ids[1:]]
+        kept = [ids[0] for ids in batch for _ in ids[1:]]
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO core_post_tags (post_id, tag_id) '
+                'SELECT link.post_id, merged.kept_id FROM core_post_tags link '
+                'JOIN UNNEST(%s::int[], %s::int[]) '
+                'AS merged (duplicate_id, kept_id) '
+                'ON link.tag_id = merged.duplicate_id '
+                'ON CONFLICT DO NOTHING',
+                [duplicates, kept]
+            )
+            cursor.execute(
+                'DELETE FROM core_post_tags WHERE tag_id = ANY(%s)',
+                [duplicates]
+            )
+            cursor.execute(
+                'DELETE FROM core_tag WHERE id = ANY(%s)', [duplicates])
+            cursor.execute(
+                'UPDATE core_tag SET post_count = ('
+                'SELECT COUNT(*) FROM core_post_tags '
+                'WHERE core_post_tags.tag_id = core_tag.id'
+                ') WHERE id = ANY(%s)',
+                [kept]
+            )
+            # a new data version makes clients' cached tag lists stale
+            cursor.execute(
+                'UPDATE core_user SET tag_usage_total = ('
+                'SELECT COALESCE(SUM(post_count), 0) FROM core_tag '
+                'WHERE core_tag.user_id = core_user.id'
+                '), data_version = data_version + 1, data_modified = NOW() '
+                'WHERE id IN (SELECT user_id FROM core_tag WHERE id = ANY(%s))',
+                [kept]
+            )
+
+
+def drop_invalid_index(apps, schema_editor):
+    """Drop the unique index left invalid by a failed build"""
+    schema_editor.execute(
+        'DO $$ BEGIN IF EXISTS ('
+        'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = indexrelid '
+        "WHERE relname = 'core_tag_user_name_lower_uniq' "
+        'AND NOT indisvalid'
+        ') THEN DROP INDEX core_tag_user_name_lower_uniq; END IF; END $$'
+    )
+
+
+class Migration(migrations.Migration):
+    # duplicates are merged in batches and the index is built without
+    # locking writes; duplicates created meanwhile fail the index build,
+    # running the migration again merges them
+    atomic = False
+
+    dependencies = [
+        ('core', '0016_tag_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.RunPython(drop_invalid_index, migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS '
+            'core_tag_user_name_lower_uniq ON core_tag (user_id, LOWER(name))',
+            'DROP INDEX CONCURRENTLY IF EXISTS core_tag_user_name_lower_uniq',
+        ),
+    ]
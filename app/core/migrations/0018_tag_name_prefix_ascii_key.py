@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # the index is rebuilt without locking writes on large tables
+    atomic = False
+
+    dependencies = [
+        ('core', '0017_tag_unique_names'),
+    ]
+
+    operations = [
+        # the prefix index keys names with their ASCII letters upper
+        # cased, as post.autocomplete's tries do in python, instead of by
+        # UPPER(), which depends on the database's locale
+        migrations.RunSQL(
+            'DROP INDEX CONCURRENTLY IF EXISTS core_tag_user_name_prefix_idx',
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'core_tag_user_name_prefix_idx ON core_tag '
+            '(user_id, (UPPER(name::text) COLLATE "C"), id)',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+            'core_tag_user_name_prefix_idx ON core_tag '
+            '(user_id, (TRANSLATE(name::text, '
+            '\'abcdefghijklmnopqrstuvwxyz\', '
+            '\'ABCDEFGHIJKLMNOPQRSTUVWXYZ\') COLLATE "C"), id)',
+            'DROP INDEX CONCURRENTLY IF EXISTS core_tag_user_name_prefix_idx',
+        ),
+    ]
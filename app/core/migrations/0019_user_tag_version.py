@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_tag_name_prefix_ascii_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='tag_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import (
 
     AbstractBaseUser,
@@ -6,9 +6,18 @@ from django.contrib.auth.models import (
     PermissionsMixin
 )
 from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
 
+from core.signals import post_bulk_create
+from core.storage import ContentAddressedStorage
+
+from collections import Counter, defaultdict
 import uuid
 import os
 
@@ -53,11 +62,145 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # bumped on every write to the user's tags, contents and posts
+    data_version = models.BigIntegerField(default=0)
+    data_modified = models.DateTimeField(null=True)
+    # bumped once per tag of the user created, renamed or deleted
+    tag_version = models.BigIntegerField(default=0)
+    # how many times the user's posts are tagged, the sum of tag post counts
+    tag_usage_total = models.BigIntegerField(default=0)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    # only ever moved by queryset updates, see touch_user_data,
+    # touch_user_tags and count_tag_usage, and left out of saves, which
+    # would write back the values the user was loaded with over the
+    # writes made since
+    COUNTER_FIELDS = (
+        'data_version', 'data_modified', 'tag_version', 'tag_usage_total')
+
+    def save(self, *args, **kwargs):
+        if not (self._state.adding or kwargs.get('force_insert')
+                or kwargs.get('update_fields') is not None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def touch_user_data(user_id):
+    """bumps the data version of a user without saving the user"""
+    User.objects.filter(pk=user_id).update(
+        data_version=F('data_version') + 1,
+        data_modified=timezone.now()
+    )
+
+
+def touch_user_tags(user_id, changes=1):
+    """bumps the tag version of a user by changes, returns the new one
+
+    Returns None when the user is gone.
+    """
+    with connections[router.db_for_write(User)].cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {User._meta.db_table} '
+            f'SET tag_version = tag_version + %s WHERE id = %s '
+            f'RETURNING tag_version',
+            [changes, user_id]
+        )
+        row = cursor.fetchone()
+    return row and row[0]
+
+
+class SignalingQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk creates objs and sends post_bulk_create for them"""
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            post_bulk_create.send(
+                sender=self.model, instances=objs, using=self.db)
+        return objs
+
+
+class TagQuerySet(SignalingQuerySet):
+
+    def get_or_create_by_names(self, user, names):
+        """returns user's tags with the given names, creating missing ones
+
+        Names match case insensitively, like the unique index on
+        (user, LOWER(name)) compares them. Runs one INSERT ... ON CONFLICT
+        DO NOTHING and one SELECT however many names are given, so callers
+        racing to create a tag all get the same one.
+        """
+        names = list(names)
+        if not names:
+            return []
+
+        # names are folded by the database only, Python's lower() does
+        # not agree with LOWER() for every name and collation
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, name, post_count) '
+                f'SELECT DISTINCT ON (LOWER(name)) %s, name, 0 '
+                f'FROM UNNEST(%s::varchar[]) WITH ORDINALITY '
+                f'AS names(name, position) '
+                f'ORDER BY LOWER(name), position '
+                f'ON CONFLICT DO NOTHING RETURNING id, name',
+                [user.pk, names]
+            )
+            created = [
+                self.model(id=tag_id, user=user, name=name)
+                for tag_id, name in cursor.fetchall()
+            ]
+        if created:
+            post_bulk_create.send(
+                sender=self.model, instances=created, using=self.db)
+
+        # each tag once, in the order its name first comes
+        return list(self.raw(
+            f'SELECT {table}.* FROM UNNEST(%s::varchar[]) WITH ORDINALITY '
+            f'AS names(name, position) JOIN {table} '
+            f'ON {table}.user_id = %s '
+            f'AND LOWER({table}.name) = LOWER(names.name) '
+            f'GROUP BY {table}.id ORDER BY MIN(names.position)',
+            [names, user.pk], using=self.db
+        ))
+
+    def taken_names(self, user, names):
+        """returns the positions of names already taken, in order
+
+        A name is taken by a tag of the user or by an earlier name in
+        names, compared with LOWER() like the unique index on
+        (user, LOWER(name)). One query however many names are given.
+        """
+        names = list(names)
+        if not names:
+            return []
+
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT position - 1 FROM ('
+                f'SELECT name, position, ROW_NUMBER() OVER ('
+                f'PARTITION BY LOWER(name) ORDER BY position) AS rank '
+                f'FROM UNNEST(%s::varchar[]) WITH ORDINALITY '
+                f'AS names(name, position)) AS names '
+                f'WHERE rank > 1 OR EXISTS (SELECT 1 FROM {table} '
+                f'WHERE {table}.user_id = %s '
+                f'AND LOWER({table}.name) = LOWER(names.name)) '
+                f'ORDER BY position',
+                [names, user.pk]
+            )
+            return [position for position, in cursor.fetchall()]
+
 
 class Tag(models.Model):
     """Tag model for posts"""
@@ -67,6 +210,26 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    # number of posts tagged with the tag, see count_tag_usage
+    post_count = models.IntegerField(default=0)
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        # names are also unique per user ignoring case, enforced by the
+        # core_tag_user_name_lower_uniq index on (user, LOWER(name))
+        indexes = [
+            # keyset pagination of a user's tags by name
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_id_idx'
+            ),
+            # a user's most used tags
+            models.Index(
+                fields=['user', 'post_count', 'id'],
+                name='core_tag_user_usage_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -82,10 +245,35 @@ class Content(models.Model):
     title = models.CharField(max_length=255)
     text = models.TextField()
 
+    objects = SignalingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's contents by title
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_content_user_title_id_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        content = super().from_db(db, field_names, values)
+        # the text in its posts' search documents, reindexed once it changes
+        content._indexed_text = (
+            content.__dict__.get('title'), content.__dict__.get('text'))
+        return content
+
     def __str__(self):
         return self.title
 
 
+class ImageStatus(models.TextChoices):
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+
+
 class Post(models.Model):
     """Main post model"""
     user = models.ForeignKey(
@@ -95,7 +283,129 @@ class Post(models.Model):
     post_title = models.CharField(max_length=255)
     tags = models.ManyToManyField('Tag')
     contents = models.ManyToManyField('Content')
-    image = models.ImageField(null=True, upload_to=file_path)
+    # stored by content hash, posts with identical images share the file
+    image = models.ImageField(
+        null=True,
+        upload_to=file_path,
+        storage=ContentAddressedStorage()
+    )
+    # whether the renditions of image are rendered, see post.renditions
+    image_status = models.CharField(
+        max_length=16,
+        blank=True,
+        choices=ImageStatus.choices
+    )
+    # post title and content text, see update_search_documents
+    search_document = SearchVectorField(null=True, editable=False)
+
+    objects = SignalingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a user's posts, newest first
+            models.Index(fields=['user', 'id'], name='core_post_user_id_idx'),
+            # posts sharing a stored image, see post.renditions.release_image
+            models.Index(fields=['image'], name='core_post_image_idx'),
+            # full text search of posts
+            GinIndex(fields=['search_document'], name='core_post_search_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # the stored image, released once the post shows another one
+        image = post.__dict__.get('image')
+        post._stored_image = getattr(image, 'name', image)
+        # the title in the search document, reindexed once it changes
+        post._indexed_title = post.__dict__.get('post_title')
+        return post
+
+    def save(self, *args, **kwargs):
+        # the stored image stays locked until the post referring to it
+        # commits, see core.storage.lock_name
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f'"{self.post_title}" by {self.user.name}'
+
+
+def post_search_vector():
+    """Return the search document of a post as an expression on Post
+
+    The post title weighs most, then the titles of its contents, then
+    their text.
+    """
+    config = settings.POST_SEARCH_CONFIG
+    contents = Content.objects.filter(
+        post=OuterRef('pk')).order_by().values('post')
+
+    def joined(field):
+        return Subquery(
+            contents.annotate(joined=StringAgg(field, ' ')).values('joined'),
+            output_field=models.TextField()
+        )
+
+    return (
+        SearchVector('post_title', weight='A', config=config) +
+        SearchVector(joined('title'), weight='B', config=config) +
+        SearchVector(joined('text'), weight='C', config=config)
+    )
+
+
+def update_search_documents(post_ids):
+    """Recompute the search documents of posts in one statement"""
+    post_ids = list(post_ids)
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(
+            search_document=post_search_vector())
+
+
+def count_tag_usage(user_id, tag_ids, delta):
+    """adds delta to tag post counts and to their owner's usage total
+
+    tag_ids has one entry per post gaining or losing the tag, so a tag
+    repeated n times moves by n * delta. Tags moving by the same amount
+    are updated together.
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+
+    tags_by_change = defaultdict(list)
+    for tag_id, times in Counter(tag_ids).items():
+        tags_by_change[times * delta].append(tag_id)
+    for change, ids in tags_by_change.items():
+        Tag.objects.filter(pk__in=ids).update(
+            post_count=F('post_count') + change)
+
+    User.objects.filter(pk=user_id).update(
+        tag_usage_total=F('tag_usage_total') + len(tag_ids) * delta)
+
+
+class ImageUpload(models.Model):
+    """Resumable upload of a post image, received in chunks"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey('Post', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    # bytes announced, and bytes received so far
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # abandoned uploads, see clean_image_uploads
+            models.Index(
+                fields=['updated'],
+                name='core_imageupload_updated_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
@@ -0,0 +1,62 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Return PostgreSQL's estimate of the rows in queryset
+
+    Unfiltered querysets read the table's pg_class.reltuples, anything
+    else asks the planner through EXPLAIN. Returns None when no estimate
+    is available, e.g. on other databases or never analyzed tables.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    query = queryset.order_by().query
+    with connection.cursor() as cursor:
+        if not (query.where or query.distinct or query.is_sliced
+                or query.group_by):
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # reltuples is negative or zero until the table is analyzed
+            return int(row[0]) if row and row[0] > 0 else None
+
+        sql, params = query.get_compiler(using=queryset.db).as_sql()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the planner's row estimate on large tables
+
+    When the estimate is at least ESTIMATED_COUNT_THRESHOLD rows it is
+    used as the count and `count_is_approximate` is set, below that the
+    exact COUNT(*) is cheap enough to run.
+    """
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        estimate = None
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+
+        threshold = settings.ESTIMATED_COUNT_THRESHOLD
+        if estimate is None or estimate < threshold:
+            return super().count
+
+        self.count_is_approximate = True
+        return estimate
@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+_timed_out = object()
+
+
+class PoolTimeout(OperationalError):
+    """No connection was released before the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread safe pool of open database connections, bounded in size
+
+    Up to `max_size` connections are open at once, checking one out waits
+    up to `timeout` seconds for another to be released past that. Released
+    connections are reused last in first out, so the connections busy
+    traffic needs stay warm and the others sit idle until closed after
+    `idle_timeout` seconds, down to `min_size` connections kept open.
+
+    The pool is driven by callables: `connect()` opens a connection,
+    `check(connection)` tells whether it still works and is called at
+    checkout once it sat idle `check_interval` seconds, `reset(connection)`
+    readies it for reuse on release and tells whether that worked, and
+    `close(connection)` closes it. Connections failing either are closed
+    instead of being handed out again.
+
+    Connections belong to the process that opened them: a pool inherited
+    by a forked process is abandoned rather than used or closed, as that
+    would break the parent's sessions sharing the sockets.
+    """
+
+    def __init__(self, connect, close, check=None, reset=None, min_size=0,
+                 max_size=10, idle_timeout=300, check_interval=5, timeout=30,
+                 clock=time.monotonic):
+        self.connect = connect
+        self.close_connection = close
+        self.check = check or (lambda connection: True)
+        self.reset = reset or (lambda connection: True)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.clock = clock
+        self.pid = os.getpid()
+        self.size = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.closed = False
+        # (connection, time released), most recently released last
+        self._idle = deque()
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Check a connection out, opening one when none is idle"""
+        deadline = self.clock() + self.timeout
+        while True:
+            with self._condition:
+                expired = self._expire()
+                while not self._idle and self.size >= self.max_size:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._idle:
+                    connection, released = self._idle.pop()
+                elif self.size < self.max_size:
+                    connection, released = None, None
+                    self.size += 1
+                else:
+                    connection = released = _timed_out
+            for stale in expired:
+                self._close(stale)
+
+            if connection is _timed_out:
+                raise PoolTimeout(
+                    f'No database connection free after {self.timeout}s, '
+                    f'{self.max_size} in use')
+            if connection is None:
+                return self._open()
+            if (self.clock() - released < self.check_interval
+                    or self.check(connection)):
+                with self._condition:
+                    self.reused += 1
+                return connection
+            self.discard(connection)
+
+    def release(self, connection):
+        """Return a checked out connection, to be reused if it works"""
+        if self.pid != os.getpid():
+            return
+        if self.reset(connection):
+            with self._condition:
+                if not self.closed:
+                    self._idle.append((connection, self.clock()))
+                    self._condition.notify()
+                    return
+        self.discard(connection)
+
+    def discard(self, connection):
+        """Close a checked out connection instead of returning it"""
+        with self._condition:
+            self.size -= 1
+            self.discarded += 1
+            self._condition.notify()
+        self._close(connection)
+
+    def close(self):
+        """Close the idle connections, and the others once released"""
+        with self._condition:
+            self.closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self.size -= len(idle)
+        if self.pid == os.getpid():
+            for connection in idle:
+                self._close(connection)
+
+    def stats(self):
+        """Return connection counts and counters"""
+        with self._condition:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'discarded': self.discarded,
+            }
+
+    def _expire(self):
+        """Take connections idle for too long out, holding the lock"""
+        expired = []
+        limit = self.clock() - self.idle_timeout
+        while (self._idle and self.size > self.min_size
+               and self._idle[0][1] <= limit):
+            expired.append(self._idle.popleft()[0])
+            self.size -= 1
+            self.discarded += 1
+        return expired
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.created += 1
+        return connection
+
+    def _close(self, connection):
+        try:
+            self.close_connection(connection)
+        except Exception:
+            # a broken connection may fail closing, it is gone either way
+            pass
@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token, invalidate_user_tokens
+from core.models import (
+    Tag,
+    Content,
+    Post,
+    count_tag_usage,
+    touch_user_data,
+    update_search_documents
+)
+from core.signals import post_bulk_create
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, **kwargs):
+    """Reload a user whose activity, password or profile changed"""
+    invalidate_user_tokens(instance)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Content)
+@receiver([post_save, post_delete], sender=Post)
+def user_data_changed(sender, instance, **kwargs):
+    """Bump the data version of the owner of a changed object"""
+    touch_user_data(instance.user_id)
+
+
+@receiver(post_bulk_create, sender=Tag)
+@receiver(post_bulk_create, sender=Content)
+@receiver(post_bulk_create, sender=Post)
+def user_data_bulk_created(sender, instances, **kwargs):
+    """Bump the data version of the owners of bulk created objects"""
+    for user_id in {instance.user_id for instance in instances}:
+        touch_user_data(user_id)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Post.contents.through)
+def post_relations_changed(sender, instance, action, **kwargs):
+    """Bump the data version when a post's tags or contents change"""
+    # posts, tags and contents linked together share an owner, so from
+    # either side the instance's owner is the one to bump
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        touch_user_data(instance.user_id)
+
+
+def tag_links(instance, reverse, pk_set=None):
+    """Return the tag id of each post-tag link of a post or tag
+
+    reverse tells instance is a tag, pk_set limits the links to the given
+    tags of a post or posts of a tag.
+    """
+    links = Post.tags.through.objects.all()
+    if reverse:
+        links = links.filter(tag_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(post_id__in=pk_set)
+    else:
+        links = links.filter(post_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(tag_id__in=pk_set)
+    return list(links.values_list('tag_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count posts gaining and losing tags"""
+    if action == 'post_add':
+        # pk_set only holds the links that did not exist yet
+        if reverse:
+            tag_ids = [instance.pk] * len(pk_set)
+        else:
+            tag_ids = pk_set
+        count_tag_usage(instance.user_id, tag_ids, 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        # pk_set holds every id passed to remove(), linked or not
+        instance._removed_tag_links = tag_links(instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        count_tag_usage(instance.user_id, instance._removed_tag_links, -1)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Post)
+def tagging_deleting(sender, instance, **kwargs):
+    """Remember the links of a post or tag before they are cascaded"""
+    instance._removed_tag_links = tag_links(instance, sender is Tag)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Post)
+def tagging_deleted(sender, instance, **kwargs):
+    """Uncount the links of a deleted post or tag"""
+    count_tag_usage(instance.user_id, instance._removed_tag_links, -1)
+
+
+def content_post_ids(content):
+    """Return ids of the posts a content is attached to"""
+    return list(Post.contents.through.objects.filter(
+        content_id=content.pk).values_list('post_id', flat=True))
+
+
+@receiver(post_save, sender=Post)
+def post_search_saved(sender, instance, created, update_fields, **kwargs):
+    """Index the title of a saved post, unless it is already indexed"""
+    if update_fields is not None and 'post_title' not in update_fields:
+        return
+    if not created and instance.post_title == getattr(
+            instance, '_indexed_title', None):
+        return
+    update_search_documents([instance.pk])
+    instance._indexed_title = instance.post_title
+
+
+@receiver(post_bulk_create, sender=Post)
+def post_search_bulk_created(sender, instances, **kwargs):
+    """Index the titles of bulk created posts"""
+    update_search_documents(instance.pk for instance in instances)
+
+
+@receiver(post_save, sender=Content)
+def content_search_saved(sender, instance, created, update_fields,
+                         **kwargs):
+    """Reindex the posts showing a content whose text changed"""
+    if update_fields is not None and not {'title', 'text'} & set(
+            update_fields):
+        return
+    indexed_text = (instance.title, instance.text)
+    if not created and indexed_text != getattr(
+            instance, '_indexed_text', None):
+        update_search_documents(content_post_ids(instance))
+    instance._indexed_text = indexed_text
+
+
+@receiver(pre_delete, sender=Content)
+def content_search_deleting(sender, instance, **kwargs):
+    """Remember the posts of a content before its links are cascaded"""
+    instance._searched_post_ids = content_post_ids(instance)
+
+
+@receiver(post_delete, sender=Content)
+def content_search_deleted(sender, instance, **kwargs):
+    """Reindex the posts a deleted content was in"""
+    update_search_documents(instance._searched_post_ids)
+
+
+@receiver(m2m_changed, sender=Post.contents.through)
+def post_contents_changed(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Reindex posts whose contents changed"""
+    if not reverse:
+        # instance is the post
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            update_search_documents([instance.pk])
+    elif action == 'pre_clear':
+        # instance is a content, pk_set is not given on clear
+        instance._searched_post_ids = content_post_ids(instance)
+    elif action == 'post_clear':
+        update_search_documents(instance._searched_post_ids)
+    elif action in ('post_add', 'post_remove'):
+        update_search_documents(pk_set)
@@ -0,0 +1,158 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from core.cache import LRUCache
+
+
+# the replica reads of the current request go to, None for the primary
+_read_database = ContextVar('read_database', default=None)
+
+# ids of the users who wrote in the last READ_YOUR_WRITES_WINDOW seconds
+recent_writers = LRUCache(
+    max_size=settings.READ_YOUR_WRITES_CACHE_SIZE,
+    ttl=settings.READ_YOUR_WRITES_WINDOW
+)
+
+
+def _shared_cache():
+    """Return the cache shared between processes, see core.checks"""
+    alias = settings.READ_YOUR_WRITES_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+def _writer_key(user_id):
+    return f'recent-writer:{user_id}'
+
+
+def wrote(user_id):
+    """Send the reads of a user to the primary for a while"""
+    recent_writers.set(user_id, True)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(
+            _writer_key(user_id), True, settings.READ_YOUR_WRITES_WINDOW)
+
+
+def wrote_recently(user_id):
+    """Tell whether a user wrote within READ_YOUR_WRITES_WINDOW seconds"""
+    if recent_writers.get(user_id):
+        return True
+    shared = _shared_cache()
+    return shared is not None and bool(shared.get(_writer_key(user_id)))
+
+
+class ReplicaSet:
+    """Weighted choice among the read replicas that answer
+
+    Replicas are the aliases in DATABASE_REPLICAS, picked at random in
+    proportion to their weight. A replica failing to connect is left out
+    for REPLICA_RETRY_AFTER seconds, reads fall back to the primary while
+    none is left.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        # alias -> time it may be tried again
+        self._down = {}
+        self._lock = threading.Lock()
+
+    def choose(self, exclude=()):
+        """Return the alias of a replica believed up, or None"""
+        now = self.clock()
+        with self._lock:
+            candidates = [
+                (alias, weight)
+                for alias, weight in settings.DATABASE_REPLICAS.items()
+                if weight > 0 and alias not in exclude
+                and self._down.get(alias, 0) <= now
+            ]
+        if not candidates:
+            return None
+        aliases, weights = zip(*candidates)
+        return random.choices(aliases, weights)[0]
+
+    def connect(self):
+        """Return the alias of a replica connected to, or None"""
+        tried = set()
+        while True:
+            alias = self.choose(exclude=tried)
+            if alias is None:
+                return None
+            try:
+                connections[alias].ensure_connection()
+                return alias
+            except DatabaseError:
+                self.mark_down(alias)
+                tried.add(alias)
+
+    def mark_down(self, alias):
+        """Leave a replica out for REPLICA_RETRY_AFTER seconds"""
+        with self._lock:
+            self._down[alias] = self.clock() + settings.REPLICA_RETRY_AFTER
+
+    def healthy(self):
+        """Return the aliases of the replicas believed up"""
+        now = self.clock()
+        with self._lock:
+            return [alias for alias in settings.DATABASE_REPLICAS
+                    if self._down.get(alias, 0) <= now]
+
+
+replicas = ReplicaSet()
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request
+
+    Requests only read from a replica inside views using ReplicaReadMixin,
+    everything else, and every write, goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """Serve the safe-method requests of an API view from a read replica
+
+    The replica is picked once the user is authenticated against the
+    primary, so a token created a moment ago is found. Users who sent
+    a write within READ_YOUR_WRITES_WINDOW seconds read from the primary,
+    so they see their writes even while the replicas lag behind.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # reset however the request ends, a 500 included, so the thread's
+        # next requests do not read from this one's replica
+        token = _read_database.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_database.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            # before writing, so reads running alongside see it too
+            wrote(request.user.pk)
+        elif not wrote_recently(request.user.pk):
+            alias = replicas.connect()
+            if alias is not None:
+                _read_database.set(alias)
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# sent with the created `instances` after a bulk_create, which skips
+# post_save for each of them
+post_bulk_create = Signal()
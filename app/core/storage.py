@@ -0,0 +1,64 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deconstruct import deconstructible
+
+
+# <directory>/ab/cd/<sha256>.<ext>, usable in database regex lookups too
+CONTENT_ADDRESSED_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[^/.]+$')
+
+
+def lock_name(name, using=DEFAULT_DB_ALIAS):
+    """Hold the lock of a stored name until the transaction ends
+
+    Whoever saves a shared file and whoever deletes it once unreferenced
+    take it, so a file is never deleted between being found stored and
+    the row referring to it being committed.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [name])
+
+
+def content_hash(content):
+    """Return the sha256 hex digest of a file, read a chunk at a time"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files after the sha256 of their content
+
+    A file given the name <directory>/<anything>.<ext>, e.g. by upload_to,
+    is stored as <directory>/ab/cd/<sha256>.<ext>, fanning files out over
+    65536 directories. Saving content that is already stored writes
+    nothing and returns the existing name, so callers sharing a file must
+    only delete it once nothing refers to it, holding lock_name(), and
+    save it and what refers to it in one transaction.
+    """
+
+    def content_name(self, name, content):
+        """Return the content addressed name of content saved as name"""
+        directory, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest[2:4], digest + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.content_name(name, content)
+        lock_name(name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
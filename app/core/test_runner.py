@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Run the tests with request timing sampled off
+
+    Requests picked at random would add Server-Timing headers and log
+    lines to some test runs and not others; tests of the sampling turn
+    it on with override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.unsampled = override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+        self.unsampled.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.unsampled.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,12 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.contrib.admin.sites import site
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
+from core.models import Post, Tag, Content
+
 
 class AdminTests(TestCase):
 
@@ -47,3 +52,107 @@ class AdminTests(TestCase):
         url = reverse("admin:core_user_add")
         res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
+
+
+class LargeTableAdminTests(TestCase):
+    """Tests admin pages stay cheap as tables grow"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email="superuser@email.com",
+            password="qwer1234"
+        )
+        self.client.force_login(self.admin_user)
+
+    def seed(self, count):
+        """Bulk create count users each owning a tag, content and post"""
+        start = get_user_model().objects.count()
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'user{i}@email.com', name=f'user {i}')
+            for i in range(start, start + count)
+        )
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'seeded tag {user.id}') for user in users)
+        Content.objects.bulk_create(
+            Content(user=user, title=f'seeded content {user.id}', text='')
+            for user in users
+        )
+        Post.objects.bulk_create(
+            Post(user=user, post_title=f'seeded post {user.id}')
+            for user in users
+        )
+
+    def count_queries(self, url):
+        """Request url and return the number of queries it ran"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def test_changelists_queries_constant(self):
+        """Test change lists do not query per row"""
+        for model in ('post', 'tag', 'content', 'user'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:core_{model}_changelist')
+                self.seed(1)
+                small = self.count_queries(url)
+                self.seed(100)
+                large = self.count_queries(url)
+                self.assertEqual(small, large)
+
+    def test_post_change_form_renders_only_selected_relations(self):
+        """Test the post form does not render every tag and content"""
+        self.seed(1)
+        post = Post.objects.get()
+        tag = Tag.objects.get()
+        content = Content.objects.get()
+        post.tags.add(tag)
+        post.contents.add(content)
+        url = reverse('admin:core_post_change', args=[post.id])
+        # warm per-process caches such as content types
+        self.client.get(url)
+
+        small = self.count_queries(url)
+        self.seed(300)
+        large = self.count_queries(url)
+        res = self.client.get(url)
+
+        self.assertEqual(small, large)
+        self.assertContains(res, tag.name)
+        self.assertContains(res, content.title)
+        other = Tag.objects.exclude(id=tag.id).first()
+        self.assertNotContains(res, other.name)
+
+    def test_post_changelist_filtered_by_image(self):
+        """Test filtering posts with and without an image"""
+        self.seed(2)
+        with_image, without_image = Post.objects.order_by('id')
+        with_image.image = 'uploads/post/image.jpg'
+        with_image.save()
+
+        url = reverse('admin:core_post_changelist')
+        res = self.client.get(url, {'has_image': 'yes'})
+
+        self.assertContains(res, with_image.post_title)
+        self.assertNotContains(res, without_image.post_title)
+
+    def test_search_uses_index(self):
+        """Test admin searches can be served by the prefix indexes"""
+        request = RequestFactory().get('/')
+        request.user = self.admin_user
+        cases = (
+            (Post, 'core_post_title_upper_idx'),
+            (Tag, 'core_tag_name_upper_idx'),
+            (Content, 'core_content_title_upper_idx'),
+            (get_user_model(), 'core_user_email_upper_idx'),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for model, index in cases:
+            with self.subTest(model=model.__name__):
+                model_admin = site._registry[model]
+                queryset, _ = model_admin.get_search_results(
+                    request, model.objects.all(), 'seeded')
+                self.assertIn(index, queryset.explain())
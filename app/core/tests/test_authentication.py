@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CachedTokenAuthentication, token_cache
+from user.serializers import UserSerializer
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_lookup_cached(self):
+        """Test a token is only looked up in the db once"""
+        with self.assertNumQueries(1):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            cached_user, _ = self.auth.authenticate_credentials(
+                self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+        self.assertEqual(cached_user, self.user)
+
+    def test_cached_user_is_copied(self):
+        """Test changes to an authenticated user do not leak to others"""
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        user.name = 'Changed'
+
+        cached_user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(cached_user.name, 'Test User')
+
+    def test_cached_instances_not_shared(self):
+        """Test each request gets a user and token loaded for it alone"""
+        self.auth.authenticate_credentials(self.token.key)
+        user, token = self.auth.authenticate_credentials(self.token.key)
+        other_user, other_token = self.auth.authenticate_credentials(
+            self.token.key)
+
+        self.assertIs(token.user, user)
+        self.assertIsNot(user._state, other_user._state)
+        self.assertIsNot(
+            user._state.fields_cache, other_user._state.fields_cache)
+        self.assertFalse(user._state.adding)
+        self.assertEqual(user, other_user)
+        self.assertEqual(token.pk, other_token.pk)
+
+    def test_invalid_token_rejected(self):
+        """Test authenticating with an unknown token fails"""
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('unknown')
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token stops authenticating"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_invalidated(self):
+        """Test a deactivated user stops authenticating"""
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_password_change_invalidated(self):
+        """Test changing password through the serializer reloads the user"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        serializer = UserSerializer(
+            self.user, data={'password': 'newpass123'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        with self.assertNumQueries(1):
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertTrue(user.check_password('newpass123'))
+
+    @override_settings(
+        AUTH_TOKEN_SHARED_CACHE='default',
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+    )
+    def test_shared_cache_tier(self):
+        """Test lookups are shared through, and invalidated in, the cache"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate_credentials(key)
+        self.assertEqual(user, self.user)
+
+        self.token.delete()
+        token_cache.clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+        caches['default'].clear()
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+
+    def test_get_missing_returns_default(self):
+        """Test reading a missing key returns the default"""
+        cache = LRUCache(max_size=2)
+
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {
+            'hits': 3, 'misses': 1, 'evictions': 1, 'size': 2})
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire_after_ttl(self, monotonic):
+        """Test entries are dropped once older than the ttl"""
+        cache = LRUCache(max_size=2, ttl=10)
+        monotonic.return_value = 100
+        cache.set('a', 1)
+
+        monotonic.return_value = 109
+        self.assertEqual(cache.get('a'), 1)
+
+        monotonic.return_value = 110
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_delete_and_clear(self):
+        """Test deleting one entry and clearing all of them"""
+        cache = LRUCache(max_size=3)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertIsNone(cache.get('a'))
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_bounded_by_weight(self):
+        """Test max_size bounds the total weight of values when weighed"""
+        cache = LRUCache(max_size=5, weigh=len)
+        cache.set('a', 'xx')
+        cache.set('b', 'xxx')
+        cache.set('a', 'x')
+        self.assertEqual(cache.weight, 4)
+
+        cache.set('c', 'xx')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.weight, 3)
+
+        cache.set('d', 'x' * 6)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.weight, 0)
@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+
+
+class HealthCheckTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def test_liveness(self):
+        """Test liveness is answered without querying"""
+        with self.assertNumQueries(0):
+            res = self.client.get('/healthz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_probe_skips_host_validation(self):
+        """Test probes addressed to the container's own address answer"""
+        res = self.client.get('/healthz', HTTP_HOST='10.0.0.5:8000')
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_readiness(self):
+        """Test ready once databases answer and migrations are applied"""
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {
+            'status': 'ok',
+            'databases': {'default': 'ok', 'replica': 'ok'},
+            'migrations': 'ok',
+        })
+        with self.assertNumQueries(1):
+            self.client.get('/readyz')
+
+    @patch('core.health.check_database', side_effect=OperationalError)
+    def test_readiness_database_unavailable(self, check_database):
+        """Test not ready while a database does not answer"""
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {
+            'status': 'unavailable',
+            'databases': {
+                'default': 'OperationalError',
+                'replica': 'OperationalError',
+            },
+            'migrations': 'unknown',
+        })
+
+    @patch('core.health.migration_state.pending',
+           return_value=['core.9999_pending'])
+    def test_readiness_migrations_pending(self, pending):
+        """Test not ready while migrations are not applied"""
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['migrations'], 'pending')
+
+    @override_settings(DATABASE_REPLICAS={'replica': 1})
+    def test_readiness_replica_unavailable(self):
+        """Test ready while only a replica does not answer"""
+        def check_database(alias):
+            if alias == 'replica':
+                raise OperationalError
+
+        with patch('core.health.check_database', check_database):
+            res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['databases'], {
+            'default': 'ok',
+            'replica': 'OperationalError',
+        })
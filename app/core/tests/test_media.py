@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from core.media import parse_range
+
+
+class ParseRangeTests(SimpleTestCase):
+    """Tests Range headers are read as byte spans"""
+
+    def test_ranges(self):
+        """Test single ranges are returned as [start, stop)"""
+        for header, span in (
+            ('bytes=0-99', (0, 100)),
+            ('bytes=100-', (100, 1000)),
+            ('bytes=-100', (900, 1000)),
+            ('bytes=900-5000', (900, 1000)),
+            ('bytes=-5000', (0, 1000)),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 1000), span)
+
+    def test_whole_file(self):
+        """Test missing, malformed and multiple ranges ask for everything"""
+        for header in (None, '', 'bytes=-', 'items=0-1', 'bytes=0-1,5-9'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable(self):
+        """Test ranges past the end of the file are refused"""
+        for header in ('bytes=1000-', 'bytes=5-1'):
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    parse_range(header, 1000)
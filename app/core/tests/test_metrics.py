@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import (
+    Registry,
+    db_queries_total,
+    request_duration,
+    requests_total
+)
+
+
+TAGS_URL = reverse('post:tag-list')
+
+
+class RegistryTests(SimpleTestCase):
+
+    def registry(self, directory=None):
+        registry = Registry(directory=directory)
+        registry.counter('jobs_total', 'Jobs run', ('queue',))
+        registry.histogram(
+            'job_duration_seconds', 'Job durations', ('queue',),
+            buckets=(0.1, 1))
+        return registry
+
+    def test_expose(self):
+        """Test metrics are exposed in the Prometheus text format"""
+        registry = self.registry()
+        registry.metrics['jobs_total'].inc(('a"b',), 2)
+        histogram = registry.metrics['job_duration_seconds']
+        for duration in (0.05, 0.5, 0.5, 3):
+            histogram.observe(('a',), duration)
+
+        self.assertEqual(registry.expose(), '\n'.join([
+            '# HELP jobs_total Jobs run',
+            '# TYPE jobs_total counter',
+            'jobs_total{queue="a\\"b"} 2',
+            '# HELP job_duration_seconds Job durations',
+            '# TYPE job_duration_seconds histogram',
+            'job_duration_seconds_bucket{queue="a",le="0.1"} 1',
+            'job_duration_seconds_bucket{queue="a",le="1"} 3',
+            'job_duration_seconds_bucket{queue="a",le="+Inf"} 4',
+            'job_duration_seconds_sum{queue="a"} 4.05',
+            'job_duration_seconds_count{queue="a"} 4',
+        ]) + '\n')
+
+    def test_threads(self):
+        """Test increments from many threads are all counted"""
+        registry = self.registry()
+        counter = registry.metrics['jobs_total']
+
+        def work():
+            for _ in range(1000):
+                counter.inc(('a',))
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(counter.values[('a',)], 8000)
+
+    def test_shared_directory(self):
+        """Test processes sharing a directory expose their sum"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        first, second = self.registry(directory), self.registry(directory)
+        first.metrics['jobs_total'].inc(('a',), 2)
+        first.metrics['job_duration_seconds'].observe(('a',), 0.5)
+        second.metrics['jobs_total'].inc(('a',), 3)
+        second.metrics['jobs_total'].inc(('b',))
+        second.metrics['job_duration_seconds'].observe(('a',), 2)
+        first.flush(force=True)
+
+        collected = second.collect()
+
+        self.assertEqual(
+            collected['jobs_total'], {('a',): 5, ('b',): 1})
+        self.assertEqual(
+            collected['job_duration_seconds'], {('a',): [[0, 1, 1], 2.5]})
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_forked_process_file(self):
+        """Test a forked process writes a file of its own"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registry = self.registry(directory)
+        registry.metrics['jobs_total'].inc(('a',))
+        registry.flush(force=True)
+
+        with patch('os.getpid', return_value=os.getpid() + 1):
+            registry.flush(force=True)
+
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_route_recorded(self):
+        """Test requests are counted and timed by route"""
+        labels = ('post:tag-list', 'GET')
+        requests = requests_total.values.get(labels + ('200',), 0)
+        queries = db_queries_total.values.get(labels, 0)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            requests_total.values[labels + ('200',)], requests + 1)
+        self.assertGreater(db_queries_total.values[labels], queries)
+        self.assertIn(labels, request_duration.values)
+
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(
+            'http_requests_total{route="post:tag-list",method="GET",'
+            f'status="200"}} {requests + 1}',
+            res.content.decode()
+        )
+
+    def test_unknown_methods_grouped(self):
+        """Test methods outside HTTP's share one label"""
+        self.client.generic('BREW', TAGS_URL)
+        self.client.generic('X-RANDOM-123', TAGS_URL)
+
+        methods = {labels[1] for labels in requests_total.values
+                   if labels[0] == 'post:tag-list'}
+        self.assertIn('other', methods)
+        self.assertFalse(methods & {'BREW', 'X-RANDOM-123'})
+
+    def test_other_routes_not_recorded(self):
+        """Test requests outside the api are left out"""
+        self.client.get('/admin/login/')
+
+        self.assertFalse(any(
+            labels[0].startswith('admin') for labels in requests_total.values))
+
+    def test_internal_only(self):
+        """Test metrics are hidden from public addresses"""
+        res = self.client.get('/metrics', REMOTE_ADDR='203.0.113.5')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_private_networks_opt_in(self):
+        """Test private addresses are answered only once allowed"""
+        res = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(res.status_code, 404)
+
+        with override_settings(METRICS_ALLOWED_NETWORKS=(
+                '127.0.0.0/8', '::1/128', '10.0.0.0/8')):
+            res = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(res.status_code, 200)
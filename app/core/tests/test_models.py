@@ -2,6 +2,7 @@ from unittest.mock import patch
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 
 from core import models
 
@@ -46,6 +47,21 @@ class UserModelTests(TestCase):
         self.assertTrue(superuser.is_superuser)
         self.assertTrue(superuser.is_staff)
 
+    def test_save_keeps_counters(self):
+        """Test saving a user leaves the counters moved meanwhile alone"""
+        user = create_sample_user()
+        models.touch_user_data(user.pk)
+        post = models.Post.objects.create(user=user, post_title='Post')
+        post.tags.add(models.Tag.objects.create(user=user, name='Tag'))
+        user.name = 'Renamed'
+        user.save()
+
+        user.refresh_from_db()
+        self.assertEqual(user.name, 'Renamed')
+        self.assertGreater(user.data_version, 0)
+        self.assertIsNotNone(user.data_modified)
+        self.assertEqual(user.tag_usage_total, 1)
+
 
 class TagModelTests(TestCase):
 
@@ -57,6 +73,56 @@ class TagModelTests(TestCase):
         )
         self.assertEqual(tag.name, str(tag))
 
+    def test_get_or_create_tags_by_names(self):
+        """Test tags are fetched or created by name in constant queries"""
+        user = create_sample_user()
+        existing = models.Tag.objects.create(user=user, name='existing')
+
+        # select, insert and the owner's data and tag version bumps
+        with self.assertNumQueries(4):
+            tags = models.Tag.objects.get_or_create_by_names(
+                user, ['new', 'existing', 'new'])
+
+        self.assertEqual([t.name for t in tags], ['new', 'existing'])
+        self.assertEqual(tags[1], existing)
+        self.assertIsNotNone(tags[0].id)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_get_or_create_tags_ignores_case(self):
+        """Test names differing in case resolve to the existing tag"""
+        user = create_sample_user()
+        existing = models.Tag.objects.create(user=user, name='Vegan')
+
+        tags = models.Tag.objects.get_or_create_by_names(
+            user, ['VEGAN', 'quick', 'Quick'])
+
+        self.assertEqual(tags[0], existing)
+        self.assertEqual([t.name for t in tags], ['Vegan', 'quick'])
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_get_or_create_tags_non_ascii(self):
+        """Test non-ASCII names are matched as the database folds them"""
+        user = create_sample_user()
+        existing = models.Tag.objects.create(user=user, name='Éclair')
+        names = ['Éclair', 'éclair', 'İstanbul', 'istanbul', 'straße']
+
+        tags = models.Tag.objects.get_or_create_by_names(user, names)
+
+        self.assertEqual(tags[0], existing)
+        self.assertEqual(len(set(tags)), len(tags))
+        self.assertEqual(
+            models.Tag.objects.filter(user=user).count(), len(tags))
+        self.assertEqual(
+            models.Tag.objects.get_or_create_by_names(user, names), tags)
+
+    def test_tag_names_unique_per_user(self):
+        """Test a user cannot have two tags named alike"""
+        user = create_sample_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name='vegan')
+
 
 class ContentModelTests(TestCase):
 
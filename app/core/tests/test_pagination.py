@@ -0,0 +1,59 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.models import Tag
+from core.pagination import EstimatedCountPaginator, estimate_count
+from core.tests.test_models import create_sample_user
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        self.user = create_sample_user()
+        Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'tag{i}') for i in range(30))
+
+    def test_filtered_estimate_from_planner(self):
+        """Test filtered querysets are estimated with EXPLAIN"""
+        estimate = estimate_count(Tag.objects.filter(user=self.user))
+
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 1)
+
+    def test_unfiltered_estimate_from_table_stats(self):
+        """Test whole tables are estimated from pg_class"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_tag')
+
+        with self.assertNumQueries(1):
+            estimate = estimate_count(Tag.objects.all())
+
+        self.assertEqual(estimate, 30)
+
+    def test_exact_count_below_threshold(self):
+        """Test small results are counted exactly"""
+        paginator = EstimatedCountPaginator(
+            Tag.objects.filter(user=self.user).order_by('id'), 10)
+
+        self.assertEqual(paginator.count, 30)
+        self.assertFalse(paginator.count_is_approximate)
+        self.assertEqual(paginator.num_pages, 3)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_estimate_above_threshold(self):
+        """Test large results use the estimate and say so"""
+        queryset = Tag.objects.filter(user=self.user).order_by('id')
+        paginator = EstimatedCountPaginator(queryset, 10)
+
+        with self.assertNumQueries(1):
+            count = paginator.count
+
+        self.assertEqual(count, estimate_count(queryset))
+        self.assertTrue(paginator.count_is_approximate)
+
+    def test_lists_are_counted_exactly(self):
+        """Test plain lists are counted without the database"""
+        paginator = EstimatedCountPaginator(list(range(5)), 2)
+
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.count_is_approximate)
@@ -0,0 +1,188 @@
+import threading
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase
+
+from core.backends.postgresql_pool.base import close_pools
+from core.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self, number):
+        self.number = number
+        self.usable = True
+        self.closed = False
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.opened = []
+
+    def pool(self, **kwargs):
+        def connect():
+            self.opened.append(FakeConnection(len(self.opened)))
+            return self.opened[-1]
+
+        def close(connection):
+            connection.closed = True
+
+        return ConnectionPool(
+            connect=connect, close=close,
+            check=lambda connection: connection.usable,
+            reset=lambda connection: connection.usable,
+            clock=lambda: self.now, **kwargs
+        )
+
+    def test_released_connection_reused(self):
+        """Test a released connection is handed out again"""
+        pool = self.pool()
+        first = pool.acquire()
+        pool.release(first)
+
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_most_recently_released_reused(self):
+        """Test the connections left idle are the least recently used"""
+        pool = self.pool()
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        self.assertIs(pool.acquire(), second)
+
+    def test_max_size(self):
+        """Test checkouts past the maximum wait, then time out"""
+        pool = self.pool(max_size=1, timeout=0)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_waits_for_release(self):
+        """Test a checkout past the maximum gets the next released"""
+        pool = ConnectionPool(
+            connect=object, close=lambda connection: None,
+            max_size=1, timeout=5)
+        first = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [first])
+        timer.start()
+
+        self.assertIs(pool.acquire(), first)
+        timer.join()
+
+    def test_idle_timeout(self):
+        """Test connections idle too long are closed, down to min size"""
+        pool = self.pool(min_size=1, idle_timeout=10)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.now = 10
+
+        self.assertIs(pool.acquire(), second)
+        self.assertTrue(first.closed)
+        pool.release(second)
+        self.now = 20
+
+        self.assertIs(pool.acquire(), second)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_checked_when_idle(self):
+        """Test broken idle connections are replaced at checkout"""
+        pool = self.pool(check_interval=5)
+        first = pool.acquire()
+        pool.release(first)
+        first.usable = False
+
+        self.now = 4
+        self.assertIs(pool.acquire(), first)
+        pool.release(first)
+        first.usable = False
+        self.now = 10
+        replacement = pool.acquire()
+
+        self.assertIsNot(replacement, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_unresettable_connection_closed(self):
+        """Test connections that cannot be reset are not reused"""
+        pool = self.pool()
+        first = pool.acquire()
+        first.usable = False
+        pool.release(first)
+
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_failed_connect(self):
+        """Test a failed connection attempt frees its slot"""
+        pool = ConnectionPool(
+            connect=lambda: 1 / 0, close=lambda connection: None,
+            max_size=1, timeout=0)
+
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_forked_process(self):
+        """Test a forked process leaves its parent's connections alone"""
+        pool = self.pool()
+        first = pool.acquire()
+
+        with patch('os.getpid', return_value=pool.pid + 1):
+            pool.release(first)
+            pool.close()
+
+        self.assertFalse(first.closed)
+        self.assertEqual(pool.stats()['idle'], 0)
+
+
+class PooledBackendTests(TestCase):
+
+    def setUp(self):
+        engine = 'core.backends.postgresql_pool'
+        self.pooled = load_backend(engine).DatabaseWrapper(
+            {**connection.settings_dict, 'ENGINE': engine,
+             'POOL': {'CHECK_INTERVAL': 0}},
+            alias='pool_test'
+        )
+        self.addCleanup(close_pools)
+        self.addCleanup(self.pooled.close)
+
+    def query(self):
+        with self.pooled.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_reused(self):
+        """Test closing the connection returns it to the pool"""
+        pid = self.query()
+        self.pooled.close()
+
+        self.assertEqual(self.query(), pid)
+
+    def test_transaction_rolled_back(self):
+        """Test transactions left open are rolled back on release"""
+        self.pooled.set_autocommit(False)
+        self.query()
+        self.pooled.close()
+
+        self.query()
+        self.assertTrue(self.pooled.get_autocommit())
+        self.assertFalse(self.pooled.connection.get_transaction_status())
+
+    def test_terminated_connection_replaced(self):
+        """Test connections the server terminated are replaced"""
+        pid = self.query()
+        self.pooled.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        self.assertNotEqual(self.query(), pid)
@@ -0,0 +1,183 @@
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.checks import check_read_your_writes_cache
+from core.models import Tag
+from core.replicas import (
+    ReplicaRouter, ReplicaSet, recent_writers, replicas
+)
+from post.views import TagViewSet
+
+
+TAGS_URL = reverse('post:tag-list')
+ME_URL = reverse('user:me')
+
+
+class ReplicaSetTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.replicas = ReplicaSet(clock=lambda: self.now)
+
+    @override_settings(DATABASE_REPLICAS={'a': 3, 'b': 1, 'c': 0})
+    @patch('random.choices', side_effect=lambda population, weights: [
+        population[weights.index(max(weights))]])
+    def test_weighted(self, choices):
+        """Test replicas are chosen by weight, never when weighing 0"""
+        self.assertEqual(self.replicas.choose(), 'a')
+        choices.assert_called_once_with(('a', 'b'), (3, 1))
+
+    @override_settings(DATABASE_REPLICAS={'a': 1, 'b': 1},
+                       REPLICA_RETRY_AFTER=30)
+    def test_down_replica_left_out(self):
+        """Test a replica marked down is retried after a while"""
+        self.replicas.mark_down('a')
+
+        self.assertEqual({self.replicas.choose() for _ in range(20)}, {'b'})
+        self.assertEqual(self.replicas.healthy(), ['b'])
+        self.now = 30
+        self.assertEqual(self.replicas.healthy(), ['a', 'b'])
+
+    @override_settings(DATABASE_REPLICAS={'a': 1, 'b': 1})
+    def test_connect_skips_failing(self):
+        """Test replicas failing to connect are skipped and marked down"""
+        handler = {'a': MagicMock(), 'b': MagicMock()}
+        handler['a'].ensure_connection.side_effect = OperationalError
+
+        with patch('core.replicas.connections', handler):
+            for _ in range(10):
+                self.assertEqual(self.replicas.connect(), 'b')
+            handler['b'].ensure_connection.side_effect = OperationalError
+            self.assertIsNone(self.replicas.connect())
+        self.assertEqual(self.replicas.healthy(), [])
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_no_replicas(self):
+        """Test reads stay on the primary without replicas"""
+        self.assertIsNone(self.replicas.connect())
+
+
+@override_settings(DATABASE_REPLICAS={'replica': 1})
+class ReplicaRoutingTests(TransactionTestCase):
+    # the replica connection only sees committed rows
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        recent_writers.clear()
+        replicas._down.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        Tag.objects.create(user=self.user, name='Tag')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get(self, url):
+        """GET url, return the number of queries run on each database"""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_from_replica(self):
+        """Test safe-method requests read from the replica"""
+        primary, replica = self.get(TAGS_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_to_primary(self):
+        """Test writes and the writer's next reads use the primary"""
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.post(TAGS_URL, {'name': 'Other'})
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(len(replica), 0)
+
+        primary, replica = self.get(TAGS_URL)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        recent_writers.clear()
+        primary, replica = self.get(TAGS_URL)
+        self.assertEqual(primary, 0)
+
+    def test_user_update_sticks_to_primary(self):
+        """Test updating the user counts as a write"""
+        res = self.client.patch(ME_URL, {'name': 'New Name'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(recent_writers.get(self.user.pk))
+
+    def test_replica_reset_after_error(self):
+        """Test a view failing with a 500 leaves reads on the primary"""
+        with patch.object(TagViewSet, 'list', side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(ReplicaRouter().db_for_read(Tag), DEFAULT_DB_ALIAS)
+
+    def test_replica_down(self):
+        """Test reads fall back to the primary while the replica is down"""
+        replica = connections['replica']
+        replica.close()
+        with patch.object(replica, 'connect', side_effect=OperationalError), \
+                CaptureQueriesContext(connection) as primary:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(len(primary), 0)
+        self.assertIsNone(replica.connection)
+        self.assertEqual(replicas.healthy(), [])
+
+
+class ReadYourWritesCacheCheckTests(SimpleTestCase):
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_not_required_without_replicas(self):
+        """Test no shared cache is needed while reads use the primary"""
+        self.assertEqual(check_read_your_writes_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS={'replica': 1},
+                       READ_YOUR_WRITES_SHARED_CACHE=None)
+    def test_required_with_replicas(self):
+        """Test replicas without a shared cache are an error"""
+        errors = check_read_your_writes_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(
+        DATABASE_REPLICAS={'replica': 1},
+        READ_YOUR_WRITES_SHARED_CACHE='default',
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    )
+    def test_process_local_cache_rejected(self):
+        """Test a cache each process keeps for itself is an error"""
+        errors = check_read_your_writes_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E002'])
+
+    @override_settings(
+        DATABASE_REPLICAS={'replica': 1},
+        READ_YOUR_WRITES_SHARED_CACHE='shared',
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'cache'},
+        }
+    )
+    def test_shared_cache_accepted(self):
+        """Test a cache shared between processes passes"""
+        self.assertEqual(check_read_your_writes_cache(None), [])
@@ -0,0 +1,99 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.postgres.search import SearchQuery
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Content, Post
+from core.tests.test_models import create_sample_user
+
+
+class SearchDocumentTests(TestCase):
+    """Tests post search documents follow titles and contents"""
+
+    def setUp(self):
+        self.user = create_sample_user()
+        self.post = Post.objects.create(user=self.user, post_title='Pancakes')
+        self.content = Content.objects.create(
+            user=self.user, title='Batter', text='Whisk the eggs')
+
+    def assertFound(self, term, found=True):
+        """Assert whether searching term finds the post"""
+        posts = Post.objects.filter(search_document=SearchQuery(
+            term, config='english'))
+        self.assertEqual(posts.filter(pk=self.post.pk).exists(), found)
+
+    def test_title_indexed(self):
+        """Test created and renamed posts are found by title"""
+        self.assertFound('pancake')
+
+        self.post.post_title = 'Waffles'
+        self.post.save()
+        self.assertFound('pancake', False)
+        self.assertFound('waffle')
+
+    def test_bulk_created_indexed(self):
+        """Test bulk created posts are found by title"""
+        post, = Post.objects.bulk_create([
+            Post(user=self.user, post_title='Omelette')])
+
+        self.assertTrue(Post.objects.filter(
+            pk=post.pk, search_document=SearchQuery('omelette')).exists())
+
+    def test_contents_indexed(self):
+        """Test contents added to and removed from a post are searched"""
+        self.post.contents.add(self.content)
+        self.assertFound('batter')
+        self.assertFound('whisk egg')
+
+        self.post.contents.remove(self.content)
+        self.assertFound('batter', False)
+
+        self.content.post_set.add(self.post)
+        self.assertFound('batter')
+        self.content.post_set.clear()
+        self.assertFound('batter', False)
+
+    def test_content_changes_indexed(self):
+        """Test posts follow edits and deletes of their contents"""
+        self.post.contents.add(self.content)
+
+        self.content.text = 'Melt the butter'
+        self.content.save()
+        self.assertFound('butter')
+        self.assertFound('egg', False)
+
+        self.content.delete()
+        self.assertFound('butter', False)
+        self.assertFound('pancake')
+
+    def test_unchanged_title_not_reindexed(self):
+        """Test saving a post without renaming it skips the reindex"""
+        post = Post.objects.get(pk=self.post.pk)
+        with patch('core.receivers.update_search_documents') as update:
+            post.save()
+            post.save(update_fields=['image_status'])
+
+        update.assert_not_called()
+
+    def test_unchanged_content_not_reindexed(self):
+        """Test saving a content without editing its text skips reindexes"""
+        self.post.contents.add(self.content)
+        content = Content.objects.get(pk=self.content.pk)
+
+        with patch('core.receivers.update_search_documents') as update:
+            content.save()
+        update.assert_not_called()
+
+        content.title = 'Dough'
+        content.save()
+        self.assertFound('dough')
+
+    def test_update_search_documents_command(self):
+        """Test posts without a document are indexed by the command"""
+        Post.objects.filter(pk=self.post.pk).update(search_document=None)
+
+        call_command('update_search_documents', stdout=StringIO())
+
+        self.assertFound('pancake')
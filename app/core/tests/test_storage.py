@@ -0,0 +1,41 @@
+import hashlib
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.storage import CONTENT_ADDRESSED_NAME, ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Tests files are named and shared by content"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_name_fanned_out_by_hash(self):
+        """Test files are stored under directories from their hash"""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('uploads/a.JPG', ContentFile(b'content'))
+
+        self.assertEqual(
+            name, f'uploads/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        self.assertRegex(name, CONTENT_ADDRESSED_NAME)
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'content')
+
+    def test_duplicates_stored_once(self):
+        """Test saving identical content returns the existing file"""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'content'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'content'))
+        other = self.storage.save('uploads/c.jpg', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = self.storage.path(first).rsplit('/', 1)[0]
+        self.assertEqual(len(self.storage.listdir(directory)[1]), 1)
@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Tag, Post
+from core.tests.test_models import create_sample_user
+
+
+class TagUsageTests(TestCase):
+    """Tests tag post counts and user totals follow the post tags"""
+
+    def setUp(self):
+        self.user = create_sample_user()
+        self.tag = Tag.objects.create(user=self.user, name='Tag')
+        self.other = Tag.objects.create(user=self.user, name='Other')
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+
+    def assertUsage(self, tag_count, other_count):
+        """Assert both tags' post counts and the user's total"""
+        self.tag.refresh_from_db()
+        self.other.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.tag.post_count, tag_count)
+        self.assertEqual(self.other.post_count, other_count)
+        self.assertEqual(self.user.tag_usage_total, tag_count + other_count)
+
+    def test_add_and_remove_from_post(self):
+        """Test tags added to and removed from a post are counted"""
+        self.post.tags.add(self.tag, self.other)
+        self.post.tags.add(self.tag)
+        self.assertUsage(1, 1)
+
+        self.post.tags.remove(self.tag)
+        self.post.tags.remove(self.tag)
+        self.assertUsage(0, 1)
+
+        self.post.tags.clear()
+        self.assertUsage(0, 0)
+
+    def test_add_and_remove_from_tag(self):
+        """Test posts added to and removed from a tag are counted"""
+        second = Post.objects.create(user=self.user, post_title='Second')
+        self.tag.post_set.add(self.post, second)
+        self.assertUsage(2, 0)
+
+        self.tag.post_set.remove(second)
+        self.assertUsage(1, 0)
+
+        self.tag.post_set.clear()
+        self.assertUsage(0, 0)
+
+    def test_deletes_uncounted(self):
+        """Test deleting a post or a tag uncounts its links"""
+        self.post.tags.add(self.tag, self.other)
+        second = Post.objects.create(user=self.user, post_title='Second')
+        second.tags.add(self.tag)
+
+        self.post.delete()
+        self.assertUsage(1, 0)
+
+        self.tag.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tag_usage_total, 0)
+
+    def test_recompute_repairs_drift(self):
+        """Test the recompute command corrects counts changed behind it"""
+        self.post.tags.add(self.tag)
+        # links written without signals are not counted
+        Post.tags.through.objects.create(post=self.post, tag=self.other)
+        Tag.objects.filter(pk=self.tag.pk).update(post_count=5)
+
+        out = StringIO()
+        call_command('recompute_tag_usage', batch_size=1, stdout=out)
+
+        self.assertUsage(1, 1)
+        self.assertIn('2 tag post counts corrected', out.getvalue())
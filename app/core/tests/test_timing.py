@@ -0,0 +1,82 @@
+import re
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Post
+from core.timing import RequestTimer
+
+
+POSTS_URL = reverse('post:post-list')
+
+
+class RequestTimerTests(SimpleTestCase):
+
+    def test_queries_excluded(self):
+        """Test queries run in a phase can be left out of its time"""
+        timer = RequestTimer()
+
+        def execute(sql, params, many, context):
+            timer.query_seconds += 1
+
+        with timer.phase('serialize', exclude_queries=True):
+            timer(execute, 'SELECT 1', (), False, {})
+
+        self.assertEqual(timer.queries, 1)
+        self.assertLess(timer.phases['serialize'], 0)
+
+    def test_header(self):
+        """Test the header lists database time and phases"""
+        timer = RequestTimer()
+        timer.queries = 2
+        timer.query_seconds = 0.004
+        timer.phases['auth'] = 0.001
+
+        self.assertEqual(
+            timer.header(0.01),
+            'total;dur=10.000, db;desc="2 queries";dur=4.000, auth;dur=1.000'
+        )
+
+
+class ServerTimingTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        Post.objects.create(user=self.user, post_title='Post')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        """Test sampled requests report their timings"""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        names = re.findall(r'(\w+);', res['Server-Timing'])
+        self.assertEqual(
+            names, ['total', 'db', 'auth', 'serialize', 'render'])
+        self.assertRegex(res['Server-Timing'], r'db;desc="[1-9]\d* queries"')
+
+        timing = logs.records[0].timing
+        self.assertEqual(timing['path'], POSTS_URL)
+        self.assertEqual(timing['status'], 200)
+        self.assertGreater(timing['queries'], 0)
+        self.assertGreater(timing['total_ms'], timing['render_ms'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """Test other requests are left alone"""
+        with patch('core.timing.logger') as logger:
+            res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('Server-Timing', res)
+        logger.info.assert_not_called()
@@ -1,23 +1,93 @@
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.conf import settings
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.health import check_database, wait_for_database
 
 
 class CommandsTest(TestCase):
 
     @patch('time.sleep', return_value=True)
-    @patch('django.db.utils.ConnectionHandler.__getitem__')
-    def test_wait_for_db(self, getitem, ts):
-        getitem.side_effect = [OperationalError] * 5 + [True]
-        call_command('wait_for_db')
-        self.assertEqual(getitem.call_count, 6)
+    @patch('core.health.check_database')
+    def test_wait_for_db(self, check_database, ts):
+        check_database.side_effect = [OperationalError] * 5 + [None]
+        call_command('wait_for_db', databases=['default'])
+        self.assertEqual(check_database.call_count, 6)
+        self.assertEqual(ts.call_count, 5)
 
-    @patch('django.db.utils.ConnectionHandler.__getitem__')
-    def test_wait_for_db_ready(self, getitem):
+    @patch('core.health.check_database')
+    def test_wait_for_db_ready(self, check_database):
         """Test waiting for db when db is available"""
+        call_command('wait_for_db', databases=['default'])
+        check_database.assert_called_once_with('default')
 
-        getitem.return_value = True
+    @patch('core.health.check_database')
+    def test_wait_for_every_db(self, check_database):
+        """Test every configured database is waited for by default"""
         call_command('wait_for_db')
-        self.assertEqual(getitem.call_count, 1)
+        self.assertCountEqual(
+            [call[0][0] for call in check_database.call_args_list],
+            settings.DATABASES)
+
+    @override_settings(DATABASE_REPLICAS={'replica': 1})
+    @patch('core.health.check_database')
+    def test_replicas_not_waited_for(self, check_database):
+        """Test read replicas are only waited for when named"""
+        call_command('wait_for_db')
+        check_database.assert_called_once_with('default')
+
+    def test_check_database_round_trip(self):
+        """Test checking a database queries it"""
+        with self.assertNumQueries(1):
+            check_database('default')
+
+    @patch('time.sleep', return_value=True)
+    @patch('core.health.check_database', side_effect=OperationalError)
+    def test_wait_for_db_timeout(self, check_database, ts):
+        """Test the command fails once the timeout passed"""
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', databases=['default'], timeout=0)
+        self.assertEqual(check_database.call_count, 1)
+
+
+class WaitForDatabaseTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.delays = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.delays.append(delay)
+        self.now += delay
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('core.health.check_database')
+    def test_exponential_backoff(self, check_database, uniform):
+        """Test delays double up to the maximum and stop at the timeout"""
+        check_database.side_effect = OperationalError
+
+        with self.assertRaises(OperationalError):
+            wait_for_database('default', timeout=3, base_delay=0.25,
+                              max_delay=1, sleep=self.sleep, clock=self.clock)
+
+        self.assertEqual(self.delays, [0.25, 0.5, 1, 1, 0.25])
+        self.assertEqual(check_database.call_count, 6)
+
+    @patch('core.health.check_database')
+    def test_jitter(self, check_database):
+        """Test delays are random up to the backoff"""
+        check_database.side_effect = [OperationalError] * 20 + [None]
+
+        attempts = wait_for_database(
+            'default', timeout=60, base_delay=1, max_delay=1,
+            sleep=self.sleep, clock=self.clock)
+
+        self.assertEqual(attempts, 21)
+        self.assertTrue(all(0 <= delay <= 1 for delay in self.delays))
+        self.assertGreater(len(set(self.delays)), 1)
@@ -0,0 +1,162 @@
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+
+
+logger = logging.getLogger(__name__)
+
+# the timer of the current request, None when it is not sampled
+_current_timer = ContextVar('request_timer', default=None)
+
+
+class RequestTimer:
+    """Time spent by one request, by phase, and on database queries
+
+    Used as an execute wrapper (see connection.execute_wrapper), it counts
+    and times every query the request runs.
+    """
+
+    def __init__(self):
+        # phase name -> seconds, in the order phases first ran
+        self.phases = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+
+    @contextmanager
+    def phase(self, name, exclude_queries=False):
+        """Add the time spent in the block to a phase
+
+        With exclude_queries, the time of queries run meanwhile is left
+        out, as it is already counted as database time.
+        """
+        start = time.perf_counter()
+        query_seconds = self.query_seconds
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if exclude_queries:
+                seconds -= self.query_seconds - query_seconds
+            self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def metrics(self, total):
+        """Return the timings in milliseconds, by metric name"""
+        return {
+            'total': total * 1000,
+            'db': self.query_seconds * 1000,
+            **{name: seconds * 1000 for name, seconds in self.phases.items()},
+        }
+
+    def header(self, total):
+        """Return the value of a Server-Timing header"""
+        metrics = self.metrics(total)
+        return ', '.join(
+            f'{name};dur={duration:.3f}' if name != 'db' else
+            f'db;desc="{self.queries} queries";dur={duration:.3f}'
+            for name, duration in metrics.items()
+        )
+
+
+def timed_phase(name, exclude_queries=False):
+    """Time a block as a phase of the current request, if sampled"""
+    timer = _current_timer.get()
+    if timer is None:
+        return nullcontext()
+    return timer.phase(name, exclude_queries)
+
+
+class ServerTimingMiddleware:
+    """Time a sample of requests, reporting where their time went
+
+    SERVER_TIMING_SAMPLE_RATE of requests, picked at random, have their
+    total time, database queries and phases timed by ServerTimingMixin
+    reported in a Server-Timing header and logged to core.timing. The
+    others pay for one random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        total = time.perf_counter() - start
+
+        response['Server-Timing'] = timer.header(total)
+        metrics = timer.metrics(total)
+        logger.info(
+            'request timing method=%s path=%s status=%s queries=%d %s',
+            request.method, request.path, response.status_code,
+            timer.queries,
+            ' '.join(f'{name}_ms={duration:.3f}'
+                     for name, duration in metrics.items()),
+            extra={'timing': {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timer.queries,
+                **{f'{name}_ms': duration
+                   for name, duration in metrics.items()},
+            }}
+        )
+        return response
+
+
+class ServerTimingMixin:
+    """Time the phases of API view requests sampled for Server-Timing
+
+    Authentication, the serializer's to_representation, queries run by it
+    left out, and rendering the response are timed separately. Rendering
+    then happens here rather than once the view returned.
+    """
+
+    def perform_authentication(self, request):
+        with timed_phase('auth'):
+            super().perform_authentication(request)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if _current_timer.get() is not None:
+            to_representation = serializer.to_representation
+
+            def timed_to_representation(instance):
+                with timed_phase('serialize', exclude_queries=True):
+                    return to_representation(instance)
+
+            serializer.to_representation = timed_to_representation
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if (_current_timer.get() is not None
+                and isinstance(response, Response)
+                and not response.is_rendered):
+            with timed_phase('render'):
+                response.render()
+        return response
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PostConfig(AppConfig):
     name = 'post'
+
+    def ready(self):
+        from post import receivers  # noqa: F401
@@ -0,0 +1,231 @@
+import bisect
+import string
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import CharField
+from django.db.models.expressions import RawSQL
+
+from core.cache import LRUCache
+from core.models import Tag
+
+
+# ASCII letters only are folded, the same way by python and the database
+# whatever its locale, where UPPER() and str.upper() disagree beyond ASCII
+ASCII_UPPER = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+# the expression core_tag_user_name_prefix_idx indexes, byte ordered like
+# python strings so both ways of answering return tags in the same order
+NAME_KEY = RawSQL(
+    f'TRANSLATE("core_tag"."name"::text, '
+    f"'{string.ascii_lowercase}', '{string.ascii_uppercase}') COLLATE \"C\"",
+    (), output_field=CharField()
+)
+
+
+# code points python strings may hold but text encoded to UTF-8 may not
+SURROGATES = (0xD800, 0xDFFF)
+
+
+def name_key(name):
+    """Return the key tags are matched and ordered by"""
+    return name.translate(ASCII_UPPER)
+
+
+def prefix_query(queryset, prefix):
+    """Filter tags to those whose name starts with prefix, in key order
+
+    Served by the (user, name key, id) index: the matching tags are the
+    range of keys from the prefix up to, excluding, the first string past
+    every string starting with it, read in order. Surrogates, which no
+    stored name holds, are stepped over.
+    """
+    queryset = queryset.annotate(name_key=NAME_KEY).order_by('name_key', 'id')
+    prefix = name_key(prefix)
+    while prefix:
+        queryset = queryset.filter(name_key__gte=prefix)
+        if ord(prefix[-1]) < sys.maxunicode:
+            following = ord(prefix[-1]) + 1
+            if SURROGATES[0] <= following <= SURROGATES[1]:
+                following = SURROGATES[1] + 1
+            return queryset.filter(
+                name_key__lt=prefix[:-1] + chr(following))
+        prefix = prefix[:-1]
+    return queryset
+
+
+class TagTrie:
+    """The tags of one user, looked up by name prefix ignoring ASCII case
+
+    Keys are kept sorted, so the tags under a prefix, the subtree a trie
+    would walk down to, are one contiguous run found by bisection, at a
+    fraction of the memory of a node per character.
+    """
+
+    def __init__(self, tags, version=None):
+        # the owner's tag version the tags were read at, or after
+        self.version = version
+        self.names = dict(tags)
+        self.keys = sorted(
+            (name_key(name), tag_id) for tag_id, name in self.names.items())
+        self._lock = threading.Lock()
+
+    def search(self, prefix, limit):
+        """Return (id, name) of the first limit tags starting with prefix"""
+        prefix = name_key(prefix)
+        tags = []
+        with self._lock:
+            start = bisect.bisect_left(self.keys, (prefix,))
+            for key, tag_id in self.keys[start:start + limit]:
+                if not key.startswith(prefix):
+                    break
+                tags.append((tag_id, self.names[tag_id]))
+        return tags
+
+    def add(self, tag_id, name):
+        """Add a tag, or rename it"""
+        with self._lock:
+            self._remove(tag_id)
+            self.names[tag_id] = name
+            bisect.insort(self.keys, (name_key(name), tag_id))
+
+    def remove(self, tag_id):
+        """Remove a tag if present"""
+        with self._lock:
+            self._remove(tag_id)
+
+    def _remove(self, tag_id):
+        name = self.names.pop(tag_id, None)
+        if name is not None:
+            key = (name_key(name), tag_id)
+            del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class TagAutocomplete:
+    """Per-user tag tries of this process, kept in a bounded LRU
+
+    The LRU holds about TAG_AUTOCOMPLETE_CACHE_SIZE tags across users,
+    counted when each trie is loaded, evicting the tries of users who have
+    not looked anything up for the longest. A user without a trie is
+    answered from the database while their trie loads in the background.
+
+    Tag writes reach the tries of this process through signals (see
+    post.receivers), which move each trie to the owner's tag version
+    after the write. A trie missing a write another process handled is
+    left behind that version, and lookups at a later version are
+    answered from the database while it reloads.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.tries = LRUCache(max_size=max_size, ttl=ttl, weigh=len)
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='tag-autocomplete')
+
+    def get(self, user_id, version=None):
+        """Return the trie of a user, or None when not loaded
+
+        With version, a trie behind that tag version is not returned
+        either.
+        """
+        trie = self.tries.get(user_id)
+        if trie is not None and version is not None and (
+                trie.version is None or trie.version < version):
+            return None
+        return trie
+
+    def warm(self, user_id):
+        """Load the trie of a user in the background, unless loading"""
+        with self._lock:
+            if user_id in self._loading:
+                return
+            self._loading[user_id] = 0
+        self._executor.submit(self._load_in_background, user_id)
+
+    def _load_in_background(self, user_id):
+        try:
+            self.load(user_id)
+        finally:
+            # this thread is not a request's, nothing else closes them
+            connections.close_all()
+
+    def load(self, user_id):
+        """Load the trie of a user from the database
+
+        A trie read while the user's tags changed may miss the change, it
+        is thrown away and loaded again on a later lookup.
+        """
+        with self._lock:
+            self._loading.setdefault(user_id, 0)
+        trie = None
+        try:
+            # read first, the tags are at least as recent
+            version = get_user_model().objects.filter(
+                pk=user_id).values_list('tag_version', flat=True).get()
+            trie = TagTrie(
+                Tag.objects.filter(
+                    user_id=user_id).values_list('id', 'name'),
+                version
+            )
+        finally:
+            # a failed load is tried again by the next warm()
+            with self._lock:
+                if self._loading.pop(user_id) == 0 and trie is not None:
+                    self.tries.set(user_id, trie)
+        return trie
+
+    def changed(self, user_id, update, version=None, changes=1):
+        """Apply update to a user's trie if loaded
+
+        version is the user's tag version once the changes update makes
+        were written. The trie moves to it only when those were the
+        only changes it was missing.
+        """
+        with self._lock:
+            if user_id in self._loading:
+                self._loading[user_id] += 1
+        trie = self.tries.get(user_id)
+        if trie is not None:
+            update(trie)
+            with self._lock:
+                if (version is not None and trie.version is not None
+                        and trie.version == version - changes):
+                    trie.version = version
+
+    def saved(self, user_id, tag_id, name, version=None):
+        """Add or rename a tag in its owner's trie"""
+        self.changed(
+            user_id, lambda trie: trie.add(tag_id, name), version)
+
+    def bulk_saved(self, user_id, tags, version=None):
+        """Add (id, name) of tags created together to their owner's trie"""
+        def add(trie):
+            for tag_id, name in tags:
+                trie.add(tag_id, name)
+        self.changed(user_id, add, version, len(tags))
+
+    def deleted(self, user_id, tag_id, version=None):
+        """Remove a tag from its owner's trie"""
+        self.changed(user_id, lambda trie: trie.remove(tag_id), version)
+
+    def clear(self):
+        """Drop this process' tries"""
+        self.tries.clear()
+
+    def stats(self):
+        """Return hit, miss and eviction counters"""
+        return self.tries.stats()
+
+
+tag_autocomplete = TagAutocomplete(
+    max_size=settings.TAG_AUTOCOMPLETE_CACHE_SIZE,
+    ttl=settings.TAG_AUTOCOMPLETE_CACHE_TTL
+)
@@ -0,0 +1,105 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core.cache import LRUCache
+
+
+class PostDocumentCache:
+    """Cache of rendered post detail documents
+
+    Documents are kept in a bounded in-process LRU in front of the cache
+    named by POST_DOCUMENT_SHARED_CACHE, if any. Each document is stored
+    with its owner's id and data version, and the scheme and host its
+    absolute URLs were built for, and only returned to that user at that
+    version through that origin.
+
+    Invalidation is driven by signals (see post.receivers). It reaches the
+    shared cache and this process' LRU; other processes' LRU entries are
+    missed once the write bumped the owner's data version, and expire
+    after POST_DOCUMENT_CACHE_TTL seconds.
+    """
+
+    key_prefix = 'post-doc:'
+
+    def __init__(self, max_size, ttl):
+        self.ttl = ttl
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        alias = settings.POST_DOCUMENT_SHARED_CACHE
+        return caches[alias] if alias else None
+
+    def get(self, post_id, user_id, version, origin):
+        """Return the document of a post owned by user at version, or None
+
+        origin is the scheme and host the document's URLs are built for.
+        """
+        key = f'{self.key_prefix}{post_id}'
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry)
+
+        hit = entry is not None and entry[:3] == (user_id, version, origin)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[3] if hit else None
+
+    def set(self, post_id, user_id, version, origin, document):
+        """Store the document of a post rendered at its owner's version"""
+        key = f'{self.key_prefix}{post_id}'
+        entry = (user_id, version, origin, document)
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry, self.ttl)
+
+    def delete_many(self, post_ids):
+        """Drop the documents of posts"""
+        keys = [f'{self.key_prefix}{post_id}' for post_id in post_ids]
+        for key in keys:
+            self.local.delete(key)
+        if keys and self.shared is not None:
+            self.shared.delete_many(keys)
+
+    def invalidate(self, post_ids):
+        """Drop the documents of posts now and once the write commits
+
+        The second pass removes documents rendered by readers that ran
+        while the writing transaction was still open.
+        """
+        post_ids = list(post_ids)
+        if post_ids:
+            self.delete_many(post_ids)
+            transaction.on_commit(lambda: self.delete_many(post_ids))
+
+    def clear(self):
+        """Drop this process' documents"""
+        self.local.clear()
+
+    def stats(self):
+        """Return hit, miss and eviction counters"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': self.local.evictions,
+            'size': len(self.local),
+        }
+
+
+post_documents = PostDocumentCache(
+    max_size=settings.POST_DOCUMENT_CACHE_SIZE,
+    ttl=settings.POST_DOCUMENT_CACHE_TTL
+)
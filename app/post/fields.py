@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from PIL import Image
+
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from core.models import ImageStatus
+from post import imaging
+from post.renditions import image_storage, rendition_name
+
+
+class UserScopedManyRelatedField(serializers.ManyRelatedField):
+    """List of primary keys resolved together in a single query"""
+
+    default_error_messages = {
+        'does_not_exist': _('Invalid pks "{pk_values}" - '
+                            'objects do not exist.'),
+    }
+
+    def to_pk(self, pk_field, item):
+        """Convert one submitted item to a primary key value"""
+        if isinstance(item, bool):
+            self.child_relation.fail('incorrect_type', data_type='bool')
+        try:
+            return pk_field.to_python(item)
+        except DjangoValidationError:
+            self.child_relation.fail(
+                'incorrect_type', data_type=type(item).__name__)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        # duplicates are dropped, submission order is kept
+        pks = list(dict.fromkeys(self.to_pk(pk_field, item) for item in data))
+        objects = queryset.in_bulk(pks)
+
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist',
+                pk_values=', '.join(str(pk) for pk in missing)
+            )
+        return [objects[pk] for pk in pks]
+
+
+class UserScopedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key relation limited to objects of the requesting user
+
+    With many=True the submitted ids are looked up in one IN query and
+    every unknown or foreign id is reported in the same error.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserScopedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of a post image's renditions, null until they are ready"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, post):
+        if not post.image or post.image_status != ImageStatus.READY:
+            return None
+
+        storage = image_storage()
+        request = self.context.get('request')
+        urls = {}
+        for rendition in settings.POST_IMAGE_RENDITIONS:
+            url = storage.url(rendition_name(post.image.name, rendition))
+            urls[rendition] = request.build_absolute_uri(url) if request \
+                else url
+        return urls
+
+
+class ImageUploadField(serializers.ImageField):
+    """Image upload checked from its header, without decoding the image
+
+    The format and pixel dimensions are read from the first bytes of the
+    file, so validating costs the same for any file size and decompression
+    bombs are refused before anything allocates their pixels. With
+    POST_IMAGE_VALIDATION set to 'pillow' Pillow verifies the whole file,
+    as ImageField does.
+    """
+
+    default_error_messages = {
+        'too_large': _('Ensure this file has no more than {max_size} bytes.'),
+        'too_many_pixels': _('Ensure this image has no more than '
+                             '{max_pixels} pixels.'),
+        'invalid_format': _('Upload an image in one of the formats '
+                            '{formats}.'),
+    }
+
+    def to_internal_value(self, data):
+        file = serializers.FileField.to_internal_value(self, data)
+        if file.size > settings.POST_IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=settings.POST_IMAGE_MAX_SIZE)
+        if settings.POST_IMAGE_VALIDATION == 'pillow':
+            return super().to_internal_value(data)
+
+        max_pixels = settings.POST_IMAGE_MAX_PIXELS
+        try:
+            header = imaging.read_header(
+                file, settings.POST_IMAGE_HEADER_MAX_SIZE)
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=max_pixels)
+        if header is None:
+            self.fail('invalid_image')
+
+        image_format, (width, height) = header
+        if image_format not in settings.POST_IMAGE_FORMATS:
+            self.fail(
+                'invalid_format',
+                formats=', '.join(settings.POST_IMAGE_FORMATS)
+            )
+        if width * height > max_pixels:
+            self.fail('too_many_pixels', max_pixels=max_pixels)
+        return file
@@ -0,0 +1,73 @@
+from django.db.models import Count, Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from core.models import Post
+
+
+def id_list(query_params, param):
+    """Return the distinct ids of a comma separated ?param=1,2,3"""
+    value = query_params.get(param)
+    if not value:
+        return []
+    try:
+        return list(dict.fromkeys(int(pk) for pk in value.split(',')))
+    except ValueError:
+        raise serializers.ValidationError(
+            {param: [_('Enter a comma separated list of ids.')]})
+
+
+def match_all(query_params, param):
+    """Tell whether ?param= asks for posts linked to all the given ids"""
+    value = query_params.get(param, 'any')
+    if value not in ('any', 'all'):
+        raise serializers.ValidationError(
+            {param: [_('Enter "any" or "all".')]})
+    return value == 'all'
+
+
+def linked_to(queryset, through, column, ids, all_ids):
+    """Filter posts linked to any, or all, of ids through a m2m table
+
+    Either way the posts are selected with one semi-join on the through
+    table, served by its (column, post_id) index, so posts appear once
+    however many of ids they are linked to. Requiring all ids groups the
+    matching links by post and keeps posts having one per id.
+    """
+    links = through.objects.filter(**{f'{column}__in': ids})
+    if all_ids:
+        links = links.values('post_id').annotate(
+            linked=Count(column)).filter(linked=len(ids))
+    return queryset.filter(pk__in=links.values('post_id'))
+
+
+def filter_posts(queryset, query_params):
+    """Apply the ?tags=, ?contents= and ?has_image= filters of a request
+
+    ?tags_match=all and ?contents_match=all ask for posts linked to every
+    given id rather than to any of them.
+    """
+    tag_ids = id_list(query_params, 'tags')
+    if tag_ids:
+        queryset = linked_to(
+            queryset, Post.tags.through, 'tag_id', tag_ids,
+            match_all(query_params, 'tags_match'))
+
+    content_ids = id_list(query_params, 'contents')
+    if content_ids:
+        queryset = linked_to(
+            queryset, Post.contents.through, 'content_id', content_ids,
+            match_all(query_params, 'contents_match'))
+
+    has_image = query_params.get('has_image')
+    if has_image is not None:
+        if has_image not in ('true', 'false', '1', '0'):
+            raise serializers.ValidationError(
+                {'has_image': [_('Enter "true" or "false".')]})
+        without_image = Q(image='') | Q(image=None)
+        if has_image in ('true', '1'):
+            queryset = queryset.exclude(without_image)
+        else:
+            queryset = queryset.filter(without_image)
+
+    return queryset
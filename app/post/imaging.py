@@ -0,0 +1,68 @@
+"""Image rendering run in worker processes
+
+Kept free of Django imports so spawned workers start quickly and never
+touch the database.
+"""
+import io
+import os
+
+from PIL import Image, ImageOps
+
+
+def render(source, targets):
+    """Render the image at source into every target, return their paths
+
+    Each target is a (path, (width, height), format, quality) tuple, the
+    image is scaled down to fit in width x height. Files are written under
+    a temporary name and renamed, so a rendition is never seen half done.
+    """
+    with Image.open(source) as original:
+        # JPEGs are decoded straight at a reduced scale when the largest
+        # target allows it, which is most of the decoding cost
+        sizes = [size for _, size, _, _ in targets]
+        original.draft('RGB', (
+            max(width for width, _ in sizes),
+            max(height for _, height in sizes),
+        ))
+        original = ImageOps.exif_transpose(original)
+
+        for path, size, image_format, quality in targets:
+            image = original.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            image.save(temp_path, image_format, quality=quality)
+            os.replace(temp_path, path)
+
+    return [path for path, _, _, _ in targets]
+
+
+def read_header(file, max_size, chunk_size=16 * 1024):
+    """Return the (format, (width, height)) of an image file, or None
+
+    The file is read a chunk at a time until Pillow identifies the image
+    from its header, which allocates no pixel data. None is returned when
+    no image header is found within max_size bytes. Pillow raises
+    DecompressionBombError for images far past Image.MAX_IMAGE_PIXELS.
+    The file is left at its start.
+    """
+    data = b''
+    file.seek(0)
+    try:
+        while len(data) < max_size:
+            chunk = file.read(min(chunk_size, max_size - len(data)))
+            if not chunk:
+                break
+            data += chunk
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    return image.format, image.size
+            except (OSError, SyntaxError, ValueError):
+                # not an image, or not enough of it yet; grow the chunks
+                # so a long header is only parsed a few times
+                chunk_size *= 2
+    finally:
+        file.seek(0)
+    return None
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmark import BenchmarkCommand, timed
+from post.views import TagViewSet, ContentViewSet
+
+
+class Command(BenchmarkCommand):
+    help = "Compare creating tags and contents one per request against " \
+           "bulk requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=10000)
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.POST_BULK_CREATE_MAX_SIZE)
+
+    def benchmark(self, objects, batch_size, **options):
+        user = get_user_model().objects.create_user(
+            email='benchmark-bulk@email.com',
+            password='demo1234'
+        )
+        factory = APIRequestFactory()
+
+        def create(viewset, prefix, payload):
+            url = f'/api/post/{prefix}/'
+            request = factory.post(url, payload, format='json')
+            force_authenticate(request, user=user)
+            view = viewset.as_view({'post': 'create'})
+            response = view(request)
+            assert response.status_code == 201, response.data
+
+        for prefix, viewset, item in (
+            ('tags', TagViewSet, lambda i: {'name': f'tag {i}'}),
+            ('contents', ContentViewSet,
+             lambda i: {'title': f'content {i}', 'text': 'text'}),
+        ):
+
+            def single():
+                for i in range(objects):
+                    create(viewset, prefix, item(i))
+
+            def batched():
+                for start in range(0, objects, batch_size):
+                    stop = min(start + batch_size, objects)
+                    create(viewset, prefix, [
+                        item(i) for i in range(start, stop)])
+
+            seconds, _ = timed(single)
+            self.report(f'{prefix}, single creates', objects, seconds)
+            seconds, _ = timed(batched)
+            self.report(f'{prefix}, batches of {batch_size}', objects, seconds)
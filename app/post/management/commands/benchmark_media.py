@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmark import BenchmarkCommand, timed
+from core.models import Post
+from post.views import PostMediaView
+
+
+class Command(BenchmarkCommand):
+    help = "Compare concurrent post image downloads served by django " \
+           "against handing them to the front-end server"
+    # downloads run in threads with their own database connections
+    rollback = False
+
+    def add_arguments(self, parser):
+        parser.add_argument('--downloads', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--size', type=int, default=2 * 1024 * 1024)
+
+    def benchmark(self, downloads, concurrency, size, **options):
+        user = get_user_model().objects.create_user(
+            email='benchmark-media@email.com',
+            password='demo1234'
+        )
+        post = Post.objects.create(user=user, post_title='benchmark')
+        post.image.save('benchmark.jpg', ContentFile(os.urandom(size)))
+        name = post.image.name
+
+        factory = APIRequestFactory()
+        view = PostMediaView.as_view()
+
+        def download(headers):
+            request = factory.get(f'/media/{name}', **headers)
+            force_authenticate(request, user=user)
+            response = view(request, name=name)
+            received = 0
+            for chunk in response:
+                received += len(chunk)
+            response.close()
+            return received
+
+        try:
+            for label, serving, headers in (
+                ('django, whole file', 'django', {}),
+                ('django, 64KiB ranges', 'django',
+                 {'HTTP_RANGE': 'bytes=0-65535'}),
+                ('django, not modified', 'django',
+                 {'HTTP_IF_NONE_MATCH': f'"{os.path.basename(name)[:64]}"'}),
+                ('x-accel-redirect', 'x-accel-redirect', {}),
+            ):
+                with override_settings(MEDIA_SERVING=serving), \
+                        ThreadPoolExecutor(concurrency) as pool:
+                    seconds, received = timed(lambda: sum(pool.map(
+                        download, [headers] * downloads)))
+
+                self.report(label, downloads, seconds, unit='downloads')
+                self.stdout.write(
+                    f'{"":<32} {received / seconds / 2 ** 20:8.1f} MiB/s')
+        finally:
+            # releases the image once its post is gone
+            user.delete()
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmark import BenchmarkCommand, timed
+from core.models import Post, Tag, Content
+from post.cache import post_documents
+from post.views import PostViewSet
+
+
+class Command(BenchmarkCommand):
+    help = "Compare post detail reads with and without the document cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100)
+        parser.add_argument('--reads', type=int, default=5000)
+        parser.add_argument('--related', type=int, default=5)
+
+    def benchmark(self, posts, reads, related, **options):
+        user = get_user_model().objects.create_user(
+            email='benchmark-post-cache@email.com',
+            password='demo1234'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(related))
+        contents = Content.objects.bulk_create(
+            Content(user=user, title=f'content {i}', text='text')
+            for i in range(related)
+        )
+        post_ids = [post.id for post in Post.objects.bulk_create(
+            Post(user=user, post_title=f'post {i}') for i in range(posts))]
+        Post.tags.through.objects.bulk_create(
+            Post.tags.through(post_id=post_id, tag_id=tag.id)
+            for post_id in post_ids for tag in tags
+        )
+        Post.contents.through.objects.bulk_create(
+            Post.contents.through(post_id=post_id, content_id=content.id)
+            for post_id in post_ids for content in contents
+        )
+
+        factory = APIRequestFactory()
+        requests = []
+        for post_id in post_ids:
+            request = factory.get(f'/api/post/posts/{post_id}/')
+            force_authenticate(request, user=user)
+            requests.append((request, post_id))
+
+        class UncachedPostViewSet(PostViewSet):
+            def retrieve(self, request, *args, **kwargs):
+                return self.conditional_response(
+                    super(PostViewSet, self).retrieve,
+                    request, *args, **kwargs)
+
+        for label, viewset in (
+            ('post detail, no cache', UncachedPostViewSet),
+            ('post detail, cached', PostViewSet),
+        ):
+            post_documents.clear()
+            view = viewset.as_view({'get': 'retrieve'})
+
+            def run():
+                for i in range(reads):
+                    request, post_id = requests[i % len(requests)]
+                    view(request, pk=str(post_id)).render()
+
+            seconds, _ = timed(run)
+            self.report(label, reads, seconds, unit='requests')
+
+        self.stdout.write(f'cache stats: {post_documents.stats()}')
@@ -0,0 +1,96 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+from core.benchmark import BenchmarkCommand, timed
+from core.models import Content, Post, update_search_documents
+from post.views import PostViewSet
+
+
+SYLLABLES = ('ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu',
+             'ra', 'se', 'ti', 'vo', 'zu')
+
+
+def words(count, rng):
+    """Return count distinct made up words"""
+    vocabulary = set()
+    while len(vocabulary) < count:
+        vocabulary.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(vocabulary)
+
+
+class Command(BenchmarkCommand):
+    help = "Compare searching posts with icontains scans against the " \
+           "full text search document, over a seeded corpus"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--contents', type=int, default=1000000)
+        parser.add_argument('--contents-per-post', type=int, default=2)
+        parser.add_argument('--searches', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def benchmark(self, contents, contents_per_post, searches, batch_size,
+                  **options):
+        rng = random.Random(0)
+        vocabulary = words(5000, rng)
+        user = get_user_model().objects.create_user(
+            email='benchmark-search@email.com',
+            password='demo1234'
+        )
+
+        def text(length):
+            return ' '.join(rng.choices(vocabulary, k=length))
+
+        def seed():
+            for start in range(0, contents, batch_size):
+                size = min(batch_size, contents - start)
+                created = Content.objects.bulk_create(
+                    Content(user=user, title=text(3), text=text(40))
+                    for _ in range(size)
+                )
+                posts = Post.objects.bulk_create(
+                    Post(user=user, post_title=text(5))
+                    for _ in range(0, size, contents_per_post)
+                )
+                Post.contents.through.objects.bulk_create(
+                    Post.contents.through(
+                        post_id=posts[i // contents_per_post].id,
+                        content_id=content.id
+                    )
+                    for i, content in enumerate(created)
+                )
+                update_search_documents(post.id for post in posts)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_post')
+                cursor.execute('ANALYZE core_content')
+                cursor.execute('ANALYZE core_post_contents')
+
+        seconds, _ = timed(seed)
+        self.report('seed and index contents', contents, seconds, 'rows')
+
+        terms = rng.choices(vocabulary, k=searches)
+        posts = Post.objects.filter(user=user)
+
+        def scan():
+            for term in terms:
+                list(posts.filter(
+                    Q(post_title__icontains=term) |
+                    Q(contents__title__icontains=term) |
+                    Q(contents__text__icontains=term)
+                ).distinct().order_by('-id').values_list(
+                    'id', flat=True)[:50])
+
+        def search():
+            view = PostViewSet()
+            for term in terms:
+                list(view.search(posts, term).values_list(
+                    'id', flat=True)[:50])
+
+        for label, run in (
+            ('icontains scan', scan),
+            ('ranked search', search),
+        ):
+            seconds, _ = timed(run)
+            self.report(label, searches, seconds, 'searches')
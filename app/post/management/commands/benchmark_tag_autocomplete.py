@@ -0,0 +1,62 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmark import BenchmarkCommand, timed
+from core.models import Tag
+from post.autocomplete import prefix_query, tag_autocomplete
+from post.views import TagViewSet
+
+
+class Command(BenchmarkCommand):
+    help = "Measure tag autocompletion latency from the prefix index and " \
+           "from the in-process trie, for a user with many tags"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=50000)
+        parser.add_argument('--lookups', type=int, default=2000)
+
+    def benchmark(self, tags, lookups, **options):
+        rng = random.Random(0)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        user = get_user_model().objects.create_user(
+            email='benchmark-autocomplete@email.com',
+            password='demo1234'
+        )
+        names = set()
+        while len(names) < tags:
+            names.add(''.join(rng.choices(letters, k=8)))
+        Tag.objects.bulk_create(Tag(user=user, name=name) for name in names)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_tag')
+        # prefixes as typed, one to four keystrokes into a tag name
+        names = sorted(names)
+        prefixes = [
+            rng.choice(names)[:rng.randint(1, 4)] for _ in range(lookups)]
+
+        def measure(label, lookup):
+            latencies = [timed(lookup, prefix)[0] for prefix in prefixes]
+            self.report(label, lookups, sum(latencies), 'lookups')
+            self.report_latencies(label, latencies)
+
+        tag_autocomplete.clear()
+        queryset = Tag.objects.filter(user=user)
+        measure('prefix index', lambda prefix: list(prefix_query(
+            queryset, prefix).values_list('id', 'name')[:10]))
+
+        seconds, trie = timed(tag_autocomplete.load, user.pk)
+        self.report('trie load', len(trie), seconds, 'tags')
+        measure('trie', lambda prefix: trie.search(prefix, 10))
+
+        factory = APIRequestFactory()
+        view = TagViewSet.as_view({'get': 'list'})
+
+        def request(prefix):
+            request = factory.get('/api/post/tags/', {'prefix': prefix})
+            force_authenticate(request, user=user)
+            view(request).render()
+
+        measure('autocomplete request', request)
+        tag_autocomplete.clear()
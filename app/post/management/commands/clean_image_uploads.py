@@ -0,0 +1,55 @@
+import os
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ImageUpload
+from post.uploads import remove_part, upload_dir
+
+
+class Command(BaseCommand):
+    help = "Delete resumable image uploads that received nothing for " \
+           "POST_IMAGE_UPLOAD_EXPIRY seconds, along with their files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        expiry = settings.POST_IMAGE_UPLOAD_EXPIRY
+        uploads = ImageUpload.objects.filter(
+            updated__lt=timezone.now() - timedelta(seconds=expiry))
+
+        deleted = 0
+        while True:
+            batch = list(uploads.values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            deleted += ImageUpload.objects.filter(pk__in=batch).delete()[0]
+            for upload_id in batch:
+                remove_part(upload_id)
+
+        # files left behind by uploads deleted with their post or user
+        orphans = 0
+        cutoff = time.time() - expiry
+        try:
+            entries = list(os.scandir(upload_dir()))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            upload_id, ext = os.path.splitext(entry.name)
+            if ext != '.part' or entry.stat().st_mtime >= cutoff:
+                continue
+            try:
+                uuid.UUID(upload_id)
+            except ValueError:
+                continue
+            if not ImageUpload.objects.filter(pk=upload_id).exists():
+                remove_part(upload_id)
+                orphans += 1
+
+        self.stdout.write(
+            f'{deleted} expired uploads deleted, {orphans} orphaned files')
@@ -0,0 +1,69 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Post, touch_user_data
+from core.storage import CONTENT_ADDRESSED_NAME
+from post.cache import post_documents
+from post.renditions import image_storage, release_image, rendition_name
+
+
+class Command(BaseCommand):
+    help = "Move post images stored before content addressing to their " \
+           "content addressed names, sharing the files of duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        storage = image_storage()
+        posts = Post.objects.exclude(image='').exclude(image=None).exclude(
+            image__regex=CONTENT_ADDRESSED_NAME.pattern)
+
+        moved = 0
+        missing = 0
+        last_id = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_id).order_by(
+                'pk').values_list('pk', 'user_id', 'image')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            renamed = {}
+            # new names stay locked until the posts refer to them
+            with transaction.atomic():
+                for post_id, _, name in batch:
+                    if name in renamed:
+                        continue
+                    if not storage.exists(name):
+                        missing += 1
+                        self.stderr.write(
+                            f'post {post_id}: {name} is missing')
+                        continue
+                    with storage.open(name) as content:
+                        renamed[name] = storage.save(name, content)
+                    self.move_renditions(name, renamed[name])
+
+                for old, new in renamed.items():
+                    moved += Post.objects.filter(image=old).update(image=new)
+                # queryset updates send no signals, the image urls changed
+                for user_id in {user_id for _, user_id, _ in batch}:
+                    touch_user_data(user_id)
+                post_documents.invalidate(
+                    post_id for post_id, _, _ in batch)
+            for old in renamed:
+                release_image(old)
+
+        self.stdout.write(f'{moved} post images moved, {missing} missing')
+
+    def move_renditions(self, old, new):
+        """Move the renditions of an image along with it"""
+        storage = image_storage()
+        for rendition in settings.POST_IMAGE_RENDITIONS:
+            source = rendition_name(old, rendition)
+            target = rendition_name(new, rendition)
+            if storage.exists(source) and not storage.exists(target):
+                os.replace(storage.path(source), storage.path(target))
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+
+from core.models import ImageStatus, Post
+from post.renditions import rendition_pool
+
+
+class Command(BaseCommand):
+    help = "Render the renditions of post images that are not ready, " \
+           "e.g. after jobs were lost on restart or the renditions changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', dest='render_all',
+            help="render every post image, including ready ones")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, render_all, batch_size, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None)
+        if not render_all:
+            posts = posts.exclude(image_status=ImageStatus.READY)
+
+        rendered = 0
+        failed = 0
+        last_id = 0
+        start = time.perf_counter()
+        while True:
+            batch = list(posts.filter(pk__gt=last_id).order_by(
+                'pk').values_list('pk', 'image')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            futures = [
+                rendition_pool.submit(post_id, image_name)
+                for post_id, image_name in batch
+            ]
+            wait(futures)
+            for future in futures:
+                if future.exception() is None:
+                    rendered += 1
+                else:
+                    failed += 1
+
+        seconds = time.perf_counter() - start
+        rendition_pool.shutdown()
+        self.stdout.write(
+            f'{rendered} images rendered, {failed} failed in {seconds:.3f}s'
+            f' ({rendered / seconds if seconds else 0:.1f} images/s)'
+        )
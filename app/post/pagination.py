@@ -0,0 +1,196 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination, PageNumberPagination
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core.pagination import EstimatedCountPaginator
+
+
+def seek(queryset, fields, operator, values):
+    """Filter queryset to rows whose fields compare to values as a row
+
+    (a, id) < (%s, %s) is one range of a matching (a, id) index, where
+    the equivalent OR of column comparisons is not.
+    """
+    opts = queryset.model._meta
+    quote_name = connections[queryset.db].ops.quote_name
+    columns = ', '.join(
+        f'{quote_name(opts.db_table)}.'
+        f'{quote_name(opts.get_field(field).column)}'
+        for field in fields
+    )
+    placeholders = ', '.join(['%s'] * len(values))
+    return queryset.filter(RawSQL(
+        f'({columns}) {operator} ({placeholders})', values,
+        output_field=BooleanField()
+    ))
+
+
+class KeysetPagination(CursorPagination):
+    """Opaque cursor pagination for a user's objects
+
+    Cursors hold every ordering field of the row a page ends at, and the
+    next page seeks past it with one row comparison, so with a matching
+    (user, ordering..., id) index every page costs the same no matter how
+    deep the client is, and rows sharing a value are neither skipped nor
+    repeated however many there are. Orderings must end with a unique
+    field and go the same direction on every field.
+
+    Pages carry no total unless asked for with ?with_count=true, then the
+    count is estimated on large tables and flagged as approximate.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    count_query_param = 'with_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            paginator = EstimatedCountPaginator(queryset, per_page=1)
+            self.count = paginator.count
+            self.count_is_approximate = paginator.count_is_approximate
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        descending = self.ordering[0].startswith('-')
+
+        position, reverse = (self.decode_cursor(request, queryset.model)
+                             or (None, False))
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}'
+                        for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = seek(queryset, self.fields,
+                            '<' if descending != reverse else '>', position)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def position(self, instance):
+        return [getattr(instance, field) for field in self.fields]
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor((self.position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor((self.position(self.page[0]), True))
+
+    def encode_cursor(self, cursor):
+        position, reverse = cursor
+        data = json.dumps({'p': position, 'r': int(reverse)})
+        encoded = b64encode(data.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        """Return the (position, reverse) of the requested cursor, or None"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(b64decode(encoded.encode()).decode())
+            position, reverse = data['p'], bool(data['r'])
+            if not (isinstance(position, list)
+                    and len(position) == len(self.fields)):
+                raise ValueError(position)
+            # values of the wrong type would fail in the database
+            position = [model._meta.get_field(field).to_python(value)
+                        for field, value in zip(self.fields, position)]
+            if None in position:
+                raise ValueError(position)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_paginated_response(self, data):
+        if self.count is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'count_is_approximate': self.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class SearchPagination(PageNumberPagination):
+    """Paginate search results by page number
+
+    Many posts share a rank and ranks move as posts are edited, so
+    results are paged by offset rather than seeking past a rank. Counts
+    are exact, an estimate could cut the last pages off.
+    """
+    page_size = KeysetPagination.page_size
+    page_size_query_param = KeysetPagination.page_size_query_param
+    max_page_size = KeysetPagination.max_page_size
+
+
+class PostPagination(KeysetPagination):
+    """Paginate posts newest first, or by relevance with ?search=
+
+    Search results are paged by number, see SearchPagination.
+    """
+    ordering = ('-id',)
+    search_ordering = ('-rank', '-id')
+    search_query_param = 'search'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.search_pagination = None
+        if request.query_params.get(self.search_query_param):
+            self.search_pagination = SearchPagination()
+            return self.search_pagination.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.search_pagination is not None:
+            return self.search_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TagPagination(KeysetPagination):
+    """Paginate tags by name, or by usage with ?sort=usage
+
+    id breaks ties either way.
+    """
+    ordering = ('-name', '-id')
+    usage_ordering = ('-post_count', '-id')
+    sort_query_param = 'sort'
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get(self.sort_query_param) == 'usage':
+            return self.usage_ordering
+        return self.ordering
+
+
+class ContentPagination(KeysetPagination):
+    """Paginate contents by title, id breaking ties"""
+    ordering = ('-title', '-id')
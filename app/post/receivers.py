@@ -0,0 +1,130 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db.models.signals import (
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed
+)
+from django.db import transaction
+from django.dispatch import receiver
+
+from core.models import Tag, Content, Post, touch_user_tags
+from core.signals import post_bulk_create
+from post.autocomplete import tag_autocomplete
+from post.cache import post_documents
+from post.renditions import release_image
+
+
+def linked_post_ids(instance):
+    """Return ids of the posts a tag or content is attached to"""
+    if isinstance(instance, Tag):
+        links = Post.tags.through.objects.filter(tag_id=instance.pk)
+    else:
+        links = Post.contents.through.objects.filter(content_id=instance.pk)
+    return list(links.values_list('post_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """Drop the document of a saved or deleted post"""
+    post_documents.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Content)
+def related_saved(sender, instance, created, **kwargs):
+    """Drop the documents of every post nesting a changed tag or content"""
+    if not created:
+        post_documents.invalidate(linked_post_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Content)
+def related_deleting(sender, instance, **kwargs):
+    """Remember the posts of a tag or content before its links are gone"""
+    instance._linked_post_ids = linked_post_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Content)
+def related_deleted(sender, instance, **kwargs):
+    """Drop the documents of every post a deleted tag or content was in"""
+    post_documents.invalidate(getattr(instance, '_linked_post_ids', ()))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+@receiver(m2m_changed, sender=Post.contents.through)
+def post_relations_changed(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Drop the documents of posts whose tags or contents changed"""
+    if not reverse:
+        # instance is the post
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            post_documents.invalidate([instance.pk])
+    elif action == 'pre_clear':
+        # instance is a tag or content, pk_set is not given on clear
+        instance._linked_post_ids = linked_post_ids(instance)
+    elif action == 'post_clear':
+        post_documents.invalidate(getattr(instance, '_linked_post_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        post_documents.invalidate(pk_set)
+
+
+def release_on_commit(image_name):
+    """Release a stored image once the transaction dropping it commits"""
+    if image_name:
+        transaction.on_commit(lambda: release_image(image_name))
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, **kwargs):
+    """Release the image a post showed before its image was replaced"""
+    if 'image' not in instance.__dict__:
+        # deferred, so not saved either
+        return
+
+    stored = getattr(instance, '_stored_image', None)
+    instance._stored_image = instance.image.name
+    if stored != instance.image.name:
+        release_on_commit(stored)
+
+
+@receiver(post_delete, sender=Post)
+def post_image_deleted(sender, instance, **kwargs):
+    """Release the image of a deleted post"""
+    if 'image' in instance.__dict__:
+        release_on_commit(instance.image.name)
+    else:
+        release_on_commit(getattr(instance, '_stored_image', None))
+
+
+@receiver(post_save, sender=Tag)
+def tag_autocomplete_saved(sender, instance, **kwargs):
+    """Add a created or renamed tag to its owner's trie on commit"""
+    user_id, tag_id, name = instance.user_id, instance.pk, instance.name
+    version = touch_user_tags(user_id)
+    transaction.on_commit(
+        lambda: tag_autocomplete.saved(user_id, tag_id, name, version))
+
+
+@receiver(post_bulk_create, sender=Tag)
+def tag_autocomplete_bulk_created(sender, instances, **kwargs):
+    """Add bulk created tags to their owners' tries on commit"""
+    tags_by_user = defaultdict(list)
+    for tag in instances:
+        tags_by_user[tag.user_id].append((tag.pk, tag.name))
+    for user_id, tags in tags_by_user.items():
+        version = touch_user_tags(user_id, len(tags))
+        transaction.on_commit(partial(
+            tag_autocomplete.bulk_saved, user_id, tags, version))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_autocomplete_deleted(sender, instance, **kwargs):
+    """Remove a deleted tag from its owner's trie on commit"""
+    user_id, tag_id = instance.user_id, instance.pk
+    version = touch_user_tags(user_id)
+    transaction.on_commit(
+        lambda: tag_autocomplete.deleted(user_id, tag_id, version))
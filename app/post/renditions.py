@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from core.models import ImageStatus, Post, touch_user_data
+from core.storage import lock_name
+from post import imaging
+from post.cache import post_documents
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def image_storage():
+    """Return the storage post images are kept in"""
+    return Post._meta.get_field('image').storage
+
+
+def rendition_name(image_name, rendition):
+    """Return the name of a rendition, stored next to its original"""
+    spec = settings.POST_IMAGE_RENDITIONS[rendition]
+    root, _ = os.path.splitext(image_name)
+    return f'{root}.{rendition}.{EXTENSIONS[spec["format"]]}'
+
+
+def rendition_targets(image_name):
+    """Return the targets imaging.render writes an image's renditions to"""
+    storage = image_storage()
+    return [
+        (
+            storage.path(rendition_name(image_name, rendition)),
+            tuple(spec['size']),
+            spec['format'],
+            spec.get('quality', 85),
+        )
+        for rendition, spec in settings.POST_IMAGE_RENDITIONS.items()
+    ]
+
+
+def original_names(name):
+    """Return the names of the stored images name is or is a rendition of
+
+    Originals keep the extension they were uploaded with, so the ones a
+    rendition may belong to are found next to it.
+    """
+    root, _ = os.path.splitext(name)
+    root, rendition = os.path.splitext(root)
+    if rendition[1:] not in settings.POST_IMAGE_RENDITIONS:
+        return [name]
+
+    directory, basename = os.path.split(root)
+    try:
+        files = image_storage().listdir(directory)[1]
+    except FileNotFoundError:
+        files = []
+    return [name] + [
+        os.path.join(directory, file) for file in files
+        if os.path.splitext(file)[0] == basename
+    ]
+
+
+def renditions_exist(image_name):
+    """Tell whether every rendition of an image is already stored"""
+    storage = image_storage()
+    return all(
+        storage.exists(rendition_name(image_name, rendition))
+        for rendition in settings.POST_IMAGE_RENDITIONS
+    )
+
+
+def release_image(image_name):
+    """Delete a stored image and its renditions unless a post shows it
+
+    Identical uploads share one stored file, the posts referring to it
+    are its reference count. It is counted and deleted under the name's
+    lock, so a post being saved with the same content keeps its file.
+    """
+    if not image_name:
+        return
+
+    with transaction.atomic():
+        lock_name(image_name)
+        if Post.objects.filter(image=image_name).exists():
+            return
+        storage = image_storage()
+        storage.delete(image_name)
+        for rendition in settings.POST_IMAGE_RENDITIONS:
+            storage.delete(rendition_name(image_name, rendition))
+
+
+def mark_renditions(post_id, image_name, status):
+    """Record the rendition status of a post still showing image_name
+
+    Posts whose image was replaced meanwhile are left alone, the newer
+    image's own job reports for them.
+    """
+    posts = Post.objects.filter(pk=post_id, image=image_name)
+    user_id = posts.values_list('user_id', flat=True).first()
+    if user_id is not None and posts.update(image_status=status):
+        # queryset updates send no signals, refresh what post_save would
+        touch_user_data(user_id)
+        post_documents.invalidate([post_id])
+
+
+class RenditionPool:
+    """Process pool rendering post images off the request path
+
+    Workers are spawned rather than forked, so they inherit neither the
+    parent's database connections nor its threads. The pool is started on
+    first use and holds POST_IMAGE_RENDITION_WORKERS processes.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.POST_IMAGE_RENDITION_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def submit(self, post_id, image_name):
+        """Render an image's renditions, return the job's future"""
+        future = self.executor.submit(
+            imaging.render,
+            image_storage().path(image_name),
+            rendition_targets(image_name)
+        )
+        future.add_done_callback(
+            lambda future: self.finished(post_id, image_name, future))
+        return future
+
+    def finished(self, post_id, image_name, future):
+        """Record the outcome of a job, run in the pool's result thread"""
+        status = ImageStatus.READY
+        if future.exception() is not None:
+            logger.error(
+                'Rendering image %s of post %s failed',
+                image_name, post_id, exc_info=future.exception()
+            )
+            status = ImageStatus.FAILED
+
+        try:
+            mark_renditions(post_id, image_name, status)
+        finally:
+            # this thread is not a request's, nothing else closes them
+            connections.close_all()
+
+    def shutdown(self, wait=True):
+        """Stop the workers, by default after finishing queued jobs"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+rendition_pool = RenditionPool()
+
+
+def schedule_renditions(post):
+    """Render a post's image once the transaction saving it commits"""
+    post_id, image_name = post.pk, post.image.name
+    transaction.on_commit(lambda: rendition_pool.submit(post_id, image_name))
@@ -1,6 +1,73 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-
-from core.models import Tag, Content, Post
+from rest_framework.settings import api_settings
+
+from core.models import ImageStatus, ImageUpload, Tag, Content, Post
+from post.fields import (
+    ImageUploadField,
+    RenditionsField,
+    UserScopedPrimaryKeyRelatedField
+)
+from post.renditions import (
+    mark_renditions,
+    renditions_exist,
+    schedule_renditions
+)
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """Serializer creating a list of objects with one bulk insert"""
+
+    default_error_messages = {
+        'too_many': _('Ensure this list has no more than {max_size} items.'),
+    }
+
+    def to_internal_value(self, data):
+        """Reject oversized batches before validating their items"""
+        max_size = settings.POST_BULK_CREATE_MAX_SIZE
+        if isinstance(data, list) and len(data) > max_size:
+            message = self.error_messages['too_many'].format(
+                max_size=max_size)
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            }, code='too_many')
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        """Insert every object in a single statement and transaction"""
+        model = self.child.Meta.model
+        return model.objects.bulk_create(
+            model(**attrs) for attrs in validated_data
+        )
+
+
+class TagListSerializer(BulkCreateListSerializer):
+    """Serializer creating a list of tags, each named unlike the others"""
+
+    default_error_messages = {
+        'unique': _('A tag with this name already exists.'),
+    }
+
+    def to_internal_value(self, data):
+        """Report names the user's tags or earlier items take per item"""
+        validated_data = super().to_internal_value(data)
+        self.check_unique_names(validated_data)
+        return validated_data
+
+    def check_unique_names(self, validated_data):
+        """Raise the error of each item whose name is already taken"""
+        taken = set(Tag.objects.taken_names(
+            self.context['request'].user,
+            [attrs['name'] for attrs in validated_data]
+        ))
+        if taken:
+            raise serializers.ValidationError([
+                {'name': [self.error_messages['unique']]}
+                if position in taken else {}
+                for position in range(len(validated_data))
+            ], code='unique')
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -10,6 +77,16 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name',)
         read_only_fields = ('id',)
+        list_serializer_class = TagListSerializer
+
+
+class TagUsageSerializer(serializers.ModelSerializer):
+    """Serializer for a tag and the number of posts using it"""
+
+    class Meta():
+        model = Tag
+        fields = ('id', 'name', 'post_count',)
+        read_only_fields = fields
 
 
 class ContentSerializer(serializers.ModelSerializer):
@@ -19,25 +96,82 @@ class ContentSerializer(serializers.ModelSerializer):
         model = Content
         fields = ('id', 'title', 'text',)
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
 
 
 class PostSerializer(serializers.ModelSerializer):
     """Serializer for post"""
 
-    contents = serializers.PrimaryKeyRelatedField(
+    contents = UserScopedPrimaryKeyRelatedField(
         many=True,
+        required=False,
         queryset=Content.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserScopedPrimaryKeyRelatedField(
         many=True,
+        required=False,
         queryset=Tag.objects.all()
     )
 
+    # tags looked up, or created, by name
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        required=False,
+        write_only=True
+    )
+
+    # contents created along with the post
+    new_contents = ContentSerializer(
+        many=True,
+        required=False,
+        write_only=True
+    )
+
+    renditions = RenditionsField()
+
     class Meta():
         model = Post
-        fields = ('id', 'post_title', 'contents', 'tags')
-        read_only_fields = ('id',)
+        fields = (
+            'id', 'post_title', 'contents', 'tags',
+            'tag_names', 'new_contents', 'image_status', 'renditions',
+        )
+        read_only_fields = ('id', 'image_status',)
+
+    def create_inline(self, user, validated_data):
+        """Create the tags and contents given inline, return them"""
+        tags = Tag.objects.get_or_create_by_names(
+            user, validated_data.pop('tag_names', []))
+        contents = Content.objects.bulk_create(
+            Content(user=user, **attrs)
+            for attrs in validated_data.pop('new_contents', [])
+        )
+        return tags, contents
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create a post with its tags and contents in constant queries"""
+        tags = validated_data.pop('tags', [])
+        contents = validated_data.pop('contents', [])
+        new_tags, new_contents = self.create_inline(
+            validated_data['user'], validated_data)
+
+        post = Post.objects.create(**validated_data)
+        # one bulk insert into each through table
+        post.tags.add(*tags, *new_tags)
+        post.contents.add(*contents, *new_contents)
+        return post
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Update a post, adding the tags and contents given inline"""
+        new_tags, new_contents = self.create_inline(
+            instance.user, validated_data)
+
+        post = super().update(instance, validated_data)
+        post.tags.add(*new_tags)
+        post.contents.add(*new_contents)
+        return post
 
 
 class PostDetailSerializer(PostSerializer):
@@ -50,7 +184,40 @@ class PostDetailSerializer(PostSerializer):
 class PostImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images"""
 
+    image = ImageUploadField()
+    renditions = RenditionsField()
+
     class Meta():
         model = Post
-        fields = ('id', 'image',)
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'renditions',)
+        read_only_fields = ('id', 'image_status',)
+
+    def update(self, instance, validated_data):
+        """Save the upload and queue rendering its renditions"""
+        instance.image_status = ImageStatus.PENDING
+        post = super().update(instance, validated_data)
+        # identical images are stored once, along with their renditions
+        if renditions_exist(post.image.name):
+            mark_renditions(post.pk, post.image.name, ImageStatus.READY)
+            post.image_status = ImageStatus.READY
+        else:
+            schedule_renditions(post)
+        return post
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable image uploads"""
+
+    class Meta():
+        model = ImageUpload
+        fields = ('id', 'filename', 'size', 'offset', 'created', 'updated',)
+        read_only_fields = ('id', 'offset', 'created', 'updated',)
+
+    def validate_size(self, size):
+        """Refuse uploads that could not be attached once complete"""
+        max_size = settings.POST_IMAGE_MAX_SIZE
+        if size <= 0 or size > max_size:
+            raise serializers.ValidationError(
+                _('Ensure this value is between 1 and {max_size}.').format(
+                    max_size=max_size))
+        return size
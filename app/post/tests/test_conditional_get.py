@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag, Content
+
+
+POST_URL = reverse('post:post-list')
+TAGS_URL = reverse('post:tag-list')
+CONTENT_URL = reverse('post:content-list')
+
+
+def post_detail_url(post_id):
+    """return detail url for a post"""
+    return reverse('post:post-detail', args=[post_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Tests ETag and Last-Modified handling of the post api"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+
+    def test_validators_returned(self):
+        """Test list and detail responses carry ETag and Last-Modified"""
+        for url in (POST_URL, TAGS_URL, CONTENT_URL,
+                    post_detail_url(self.post.id)):
+            with self.subTest(url=url):
+                res = self.client.get(url)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertTrue(res['ETag'].startswith('"'))
+                self.assertIn('Last-Modified', res)
+
+    def test_user_saves_keep_data_version(self):
+        """Test saving the user does not take its data version back"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            data_version=1)
+        etag = self.client.get(POST_URL)['ETag']
+
+        self.client.patch(reverse('user:me'), {'name': 'New Name'})
+        # as the admin would, from a user loaded before the version moved
+        self.user.name = 'Admin Name'
+        self.user.save()
+        self.client.patch(
+            post_detail_url(self.post.id), {'post_title': 'Edited'})
+
+        res = self.client.get(POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['results'][0]['post_title'], 'Edited')
+
+    def test_unchanged_list_not_modified(self):
+        """Test an unchanged list is answered without fetching posts"""
+        etag = self.client.get(POST_URL)['ETag']
+
+        # only the data version lookup runs
+        with self.assertNumQueries(1):
+            res = self.client.get(POST_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_unchanged_detail_not_modified_since(self):
+        """Test If-Modified-Since is honoured when no ETag is sent"""
+        url = post_detail_url(self.post.id)
+        last_modified = self.client.get(url)['Last-Modified']
+
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_etag(self):
+        """Test every kind of write invalidates the user's ETags"""
+        tag = Tag.objects.create(user=self.user, name='tag')
+        content = Content.objects.create(
+            user=self.user, title='title', text='text')
+        writes = (
+            lambda: Tag.objects.create(user=self.user, name='new'),
+            lambda: Content.objects.bulk_create([
+                Content(user=self.user, title='new', text='text')]),
+            lambda: self.post.tags.add(tag),
+            lambda: self.post.contents.add(content),
+            lambda: self.post.tags.remove(tag),
+            lambda: content.delete(),
+            lambda: Post.objects.filter(pk=self.post.pk).get().save(),
+        )
+
+        url = post_detail_url(self.post.id)
+        for write in writes:
+            etag = self.client.get(url)['ETag']
+            write()
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(res['ETag'], etag)
+
+    def test_etag_depends_on_request(self):
+        """Test different pages, users and urls get different ETags"""
+        first = self.client.get(POST_URL)['ETag']
+        paged = self.client.get(POST_URL, {'page_size': 1})['ETag']
+        tags = self.client.get(TAGS_URL)['ETag']
+
+        user2 = get_user_model().objects.create_user(
+            email='test2@email.com',
+            password='demo1234'
+        )
+        self.client.force_authenticate(user=user2)
+        res = self.client.get(POST_URL, HTTP_IF_NONE_MATCH=first)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len({first, paged, tags, res['ETag']}), 4)
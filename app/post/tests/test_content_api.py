@@ -62,7 +62,7 @@ class PrivateContentApiTests(TestCase):
         res = self.client.get(CONTENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retreive_content_limited_to_user(self):
         """Test retrieving contents belong to the specific user"""
@@ -88,8 +88,65 @@ class PrivateContentApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['title'], content1.title)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(
+            res.data['results'][0]['title'], content1.title)
+
+    def test_retrieve_content_paginated_with_same_titles(self):
+        """Test paging through contents sharing a title skips none"""
+
+        contents = [
+            create_content(user=self.user, title=title, text='text')
+            for title in ('a', 'b', 'b', 'b', 'c')
+        ]
+
+        ids = []
+        url = f'{CONTENT_URL}?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(content['id'] for content in res.data['results'])
+            url = res.data['next']
+
+        expected = Content.objects.filter(
+            id__in=[c.id for c in contents]).order_by('-title', '-id')
+        self.assertEqual(ids, [c.id for c in expected])
+
+    def test_retrieve_content_paginated_many_same_titles(self):
+        """Test pages of a title shared past a page seek by title and id"""
+
+        contents = [
+            create_content(user=self.user, title='same', text='text')
+            for _ in range(7)
+        ]
+        expected = sorted((c.id for c in contents), reverse=True)
+
+        ids, pages = [], []
+        url = f'{CONTENT_URL}?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([content['id'] for content in res.data['results']])
+            ids.extend(pages[-1])
+            url = res.data['next']
+        self.assertEqual(ids, expected)
+
+        # and back again, from the last page
+        previous = []
+        while res.data['previous']:
+            res = self.client.get(res.data['previous'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            previous.append(
+                [content['id'] for content in res.data['results']])
+        self.assertEqual(
+            previous, [expected[4:6], expected[2:4], expected[:2]])
+
+    def test_retrieve_content_invalid_cursor(self):
+        """Test a cursor not made by the API is not found"""
+
+        res = self.client.get(CONTENT_URL, {'cursor': 'bm90IGpzb24='})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_create_content_successful(self):
         """Test creating a content successfully"""
@@ -117,3 +174,27 @@ class PrivateContentApiTests(TestCase):
         res = self.client.post(CONTENT_URL, params)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_contents(self):
+        """Test creating a list of contents in one insert"""
+
+        params = [{'title': f'title{i}', 'text': 'text'} for i in range(3)]
+
+        # insert and the owner's data version bump
+        with self.assertNumQueries(2):
+            res = self.client.post(CONTENT_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Content.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_create_contents_invalid_item(self):
+        """Test an invalid content fails the whole batch"""
+
+        params = [{'title': 'title', 'text': 'text'}, {'title': 'title'}]
+
+        res = self.client.post(CONTENT_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('text', res.data[1])
+        self.assertFalse(Content.objects.filter(user=self.user).exists())
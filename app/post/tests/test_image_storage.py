@@ -0,0 +1,149 @@
+import os
+import threading
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.models import Post, file_path
+from core.storage import CONTENT_ADDRESSED_NAME
+from post.renditions import image_storage, release_image, rendition_name
+
+
+RENDITIONS = {'thumbnail': {'size': (20, 20), 'format': 'JPEG'}}
+
+
+@override_settings(POST_IMAGE_RENDITIONS=RENDITIONS)
+class ImageStorageTests(TestCase):
+    """Tests post images shared by content and released when unused"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.storage = image_storage()
+        self.names = []
+
+    def tearDown(self):
+        for name in self.names:
+            self.storage.delete(name)
+            self.storage.delete(rendition_name(name, 'thumbnail'))
+
+    def create_post(self, content):
+        """Create a post with an image of the given content"""
+        post = Post.objects.create(user=self.user, post_title='Post')
+        post.image.save('image.jpg', ContentFile(content))
+        self.names.append(post.image.name)
+        return post
+
+    def test_identical_images_shared(self):
+        """Test posts with identical images share the stored file"""
+        first = self.create_post(b'image')
+        second = self.create_post(b'image')
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, CONTENT_ADDRESSED_NAME)
+
+    def test_release_while_referenced(self):
+        """Test a shared image is only deleted with its last reference"""
+        first = self.create_post(b'image')
+        second = self.create_post(b'image')
+        name = first.image.name
+        # renditions are written in place, not content addressed
+        with open(self.storage.path(rendition_name(name, 'thumbnail')),
+                  'wb') as thumbnail:
+            thumbnail.write(b'thumbnail')
+
+        first.delete()
+        release_image(name)
+        self.assertTrue(self.storage.exists(name))
+
+        second.delete()
+        release_image(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(
+            self.storage.exists(rendition_name(name, 'thumbnail')))
+
+    def test_migrate_post_images(self):
+        """Test legacy uploads are moved to content addressed names"""
+        legacy = []
+        for i in range(3):
+            name = f'uploads/post/legacy-{i}.jpg'
+            path = self.storage.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as image:
+                image.write(b'legacy' if i < 2 else b'other')
+            legacy.append(name)
+        Post.objects.bulk_create(
+            Post(user=self.user, post_title='Post', image=name)
+            for name in legacy
+        )
+
+        out = StringIO()
+        call_command('migrate_post_images', batch_size=2, stdout=out)
+
+        names = list(Post.objects.order_by('pk').values_list(
+            'image', flat=True))
+        self.names.extend(names)
+        for name in names:
+            self.assertRegex(name, CONTENT_ADDRESSED_NAME)
+        self.assertEqual(names[0], names[1])
+        self.assertNotEqual(names[1], names[2])
+        for name in legacy:
+            self.assertFalse(self.storage.exists(name))
+        self.assertIn('3 post images moved', out.getvalue())
+
+
+@override_settings(POST_IMAGE_RENDITIONS=RENDITIONS)
+class ImageReleaseRaceTests(TransactionTestCase):
+    """Tests releasing an image waits for posts being saved with it"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com', password='demo1234')
+        self.storage = image_storage()
+
+    def test_release_waits_for_saving_post(self):
+        """Test a file found stored by a saving post is not deleted"""
+        post = Post.objects.create(user=self.user, post_title='Post')
+        post.image.save('image.jpg', ContentFile(b'race'))
+        name = post.image.name
+        self.addCleanup(self.storage.delete, name)
+        Post.objects.filter(pk=post.pk).delete()
+        found, go = threading.Event(), threading.Event()
+
+        def save():
+            try:
+                with transaction.atomic():
+                    saved = self.storage.save(
+                        file_path(None, 'image.jpg'), ContentFile(b'race'))
+                    found.set()
+                    go.wait(5)
+                    Post.objects.create(
+                        user=self.user, post_title='Post', image=saved)
+            finally:
+                connections.close_all()
+
+        def release():
+            try:
+                release_image(name)
+            finally:
+                connections.close_all()
+
+        saver = threading.Thread(target=save)
+        saver.start()
+        found.wait(5)
+        releaser = threading.Thread(target=release)
+        releaser.start()
+        # the release is blocked until the saving post commits
+        releaser.join(0.2)
+        go.set()
+        saver.join()
+        releaser.join()
+
+        self.assertTrue(self.storage.exists(name))
@@ -0,0 +1,136 @@
+import io
+import struct
+import tracemalloc
+import zlib
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory, \
+    force_authenticate
+
+from core.models import Post
+from post.views import PostViewSet
+
+
+def image_upload_url(post_id):
+    """return url for image upload"""
+    return reverse('post:post-upload-image', args=[post_id])
+
+
+def sample_image(size=(10, 10), image_format='JPEG', padding=0):
+    """Return an uploadable image, optionally padded to a larger file"""
+    data = io.BytesIO()
+    Image.new('RGB', size).save(data, format=image_format)
+    data.write(b'\0' * padding)
+    return ContentFile(data.getvalue(), name=f'image.{image_format.lower()}')
+
+
+def png_chunk(chunk_type, data):
+    """Return a PNG chunk"""
+    chunk = chunk_type + data
+    return struct.pack('>I', len(data)) + chunk + \
+        struct.pack('>I', zlib.crc32(chunk))
+
+
+def png_header(width, height):
+    """Return the start of a PNG claiming the given dimensions"""
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', ihdr) + \
+        png_chunk(b'IDAT', b'')
+
+
+class ImageValidationTests(TestCase):
+    """Tests post image uploads are checked from their header"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+
+    def tearDown(self):
+        self.post.refresh_from_db()
+        self.post.image.delete()
+
+    def upload(self, image):
+        """Upload image to the post"""
+        return self.client.post(
+            image_upload_url(self.post.id), {'image': image},
+            format='multipart'
+        )
+
+    def test_valid_image(self):
+        """Test an image within the limits is accepted"""
+        res = self.upload(sample_image())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(POST_IMAGE_MAX_SIZE=100 * 1024)
+    def test_file_too_large(self):
+        """Test uploads past the size limit are stopped"""
+        res = self.upload(sample_image(padding=200 * 1024))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('102400 bytes', res.data['image'][0])
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=99)
+    def test_too_many_pixels(self):
+        """Test images past the pixel limit are refused"""
+        res = self.upload(sample_image(size=(10, 10)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('99 pixels', res.data['image'][0])
+
+    def test_decompression_bomb(self):
+        """Test an image claiming huge dimensions is refused undecoded"""
+        bomb = ContentFile(png_header(100000, 100000), name='bomb.png')
+
+        res = self.upload(bomb)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', res.data['image'][0])
+
+    def test_format_not_allowed(self):
+        """Test images in other formats are refused"""
+        res = self.upload(sample_image(image_format='BMP'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('formats', res.data['image'][0])
+
+    def test_not_an_image(self):
+        """Test files without an image header are refused"""
+        res = self.upload(ContentFile(b'text' * 1000, name='image.jpg'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_memory_bounded(self):
+        """Test a request holds a small part of its upload in memory"""
+        # small enough for Django to otherwise keep in memory
+        size = 2 * 1024 * 1024
+        request = APIRequestFactory().post(
+            image_upload_url(self.post.id),
+            {'image': sample_image(size=(100, 100), padding=size)},
+            format='multipart'
+        )
+        force_authenticate(request, user=self.user)
+        view = PostViewSet.as_view({'post': 'upload_image'})
+
+        tracemalloc.start()
+        try:
+            res = view(request, pk=self.post.id)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            request.close()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLess(peak, 1024 * 1024, f'peak {peak} bytes')
@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post
+from post.renditions import image_storage, rendition_name
+
+
+CONTENT = bytes(range(256)) * 40
+
+
+def media_url(name):
+    """return url serving a stored file"""
+    return reverse('media', args=[name])
+
+
+@override_settings(
+    POST_IMAGE_RENDITIONS={'thumbnail': {'size': (20, 20), 'format': 'JPEG'}}
+)
+class PostMediaTests(TestCase):
+    """Tests post images are served to their owner only"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+        self.post.image.save('image.jpg', ContentFile(CONTENT))
+        self.name = self.post.image.name
+        self.url = media_url(self.name)
+
+    def tearDown(self):
+        storage = image_storage()
+        storage.delete(self.name)
+        storage.delete(rendition_name(self.name, 'thumbnail'))
+
+    def test_owner_served(self):
+        """Test the owner gets the image, cacheable for a long time"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_other_users_refused(self):
+        """Test images of other users' posts are not served"""
+        other = APIClient()
+        other.force_authenticate(user=get_user_model().objects.create_user(
+            email='other@email.com', password='demo1234'))
+
+        self.assertEqual(
+            other.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            APIClient().get(self.url).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_range(self):
+        """Test a byte range is answered with partial content"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(res.streaming_content), CONTENT[10:20])
+        self.assertEqual(
+            res['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+        res = self.client.get(self.url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(
+            res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_range_ignored_for_changed_file(self):
+        """Test If-Range with a stale ETag gets the whole file"""
+        res = self.client.get(
+            self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_not_modified(self):
+        """Test a client holding the image gets 304 Not Modified"""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(
+        MEDIA_SERVING='x-accel-redirect',
+        MEDIA_ACCEL_REDIRECT_LOCATION='/protected/'
+    )
+    def test_x_accel_redirect(self):
+        """Test the transfer can be handed to nginx"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected/{self.name}')
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_SERVING='x-sendfile')
+    def test_x_sendfile(self):
+        """Test the transfer can be handed to Apache or lighttpd"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res['X-Sendfile'], image_storage().path(self.name))
+
+    def test_rendition_served(self):
+        """Test renditions are served to the owner of their original"""
+        thumbnail = rendition_name(self.name, 'thumbnail')
+        with open(image_storage().path(thumbnail), 'wb') as file:
+            file.write(b'thumbnail')
+
+        res = self.client.get(media_url(thumbnail))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), b'thumbnail')
+        self.assertIn('no-cache', res['Cache-Control'])
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 import tempfile
@@ -83,7 +85,7 @@ class PrivatePostTests(TestCase):
         res = self.client.get(POST_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_posts_limited_to_user(self):
         """Test retrieving posts belong to the specific user"""
@@ -99,8 +101,28 @@ class PrivatePostTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['post_title'], post.post_title)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(
+            res.data['results'][0]['post_title'], post.post_title)
+
+    def test_retrieve_posts_paginated(self):
+        """Test walking every page of posts with cursors"""
+
+        posts = [
+            create_post(user=self.user, post_title=f'Post {i}')
+            for i in range(5)
+        ]
+
+        ids = []
+        url = f'{POST_URL}?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            ids.extend(post['id'] for post in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(ids, sorted((p.id for p in posts), reverse=True))
 
     def test_retrieve_post_detail(self):
         """Test retreiving post detail"""
@@ -166,6 +188,114 @@ class PrivatePostTests(TestCase):
         self.assertListEqual(
             [c.id for c in post.contents.all()], res.data['contents'])
 
+    def test_create_post_with_other_users_tag(self):
+        """Test tags of another user can not be attached to a post"""
+
+        user2 = get_user_model().objects.create_user(
+            email='test2@email.com',
+            password='demo1234'
+        )
+        tag = create_tag(user=user2)
+
+        params = {
+            'post_title': 'Post with tags',
+            'tags': [tag.id]
+        }
+
+        res = self.client.post(POST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.filter(user=self.user).exists())
+
+    def test_create_post_reports_every_missing_tag(self):
+        """Test all unknown tag ids are reported in one error"""
+
+        tag = create_tag(user=self.user)
+        params = {
+            'post_title': 'Post with tags',
+            'tags': [tag.id, 9998, 9999]
+        }
+
+        res = self.client.post(POST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertIn('9998, 9999', res.data['tags'][0])
+
+    def test_create_post_tag_queries_not_per_tag(self):
+        """Test tag ids are validated and linked in constant queries"""
+
+        tags = [create_tag(user=self.user, name=f'tag{i}') for i in range(20)]
+
+        counts = []
+        for count in (1, 20):
+            params = {
+                'post_title': 'Post with tags',
+                'tags': [tag.id for tag in tags[:count]]
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(POST_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_create_post_with_inline_tags_and_contents(self):
+        """Test creating tags by name and contents along with a post"""
+
+        existing = create_tag(user=self.user, name='existing')
+        params = {
+            'post_title': 'Nested post',
+            'tag_names': ['existing', 'new'],
+            'new_contents': [{'title': 'Intro', 'text': 'Hello'}],
+        }
+
+        res = self.client.post(POST_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get(id=res.data['id'])
+        self.assertEqual(
+            sorted(t.name for t in post.tags.all()), ['existing', 'new'])
+        self.assertIn(existing, post.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        content = post.contents.get()
+        self.assertEqual(content.title, 'Intro')
+        self.assertEqual(content.user, self.user)
+
+    def test_update_post_adds_inline_tags(self):
+        """Test inline tag names are added to an existing post"""
+
+        post = create_post(user=self.user)
+        tag = create_tag(user=self.user, name='old')
+        post.tags.add(tag)
+
+        res = self.client.patch(
+            post_detail_url(post.id), {'tag_names': ['new']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(t.name for t in post.tags.all()), ['new', 'old'])
+
+    def test_create_nested_post_queries_not_per_item(self):
+        """Test nested creation runs constant queries per post"""
+
+        counts = []
+        for count in (1, 20):
+            params = {
+                'post_title': 'Nested post',
+                'tag_names': [f'tag{i}' for i in range(count)],
+                'new_contents': [
+                    {'title': f'title{i}', 'text': 'text'}
+                    for i in range(count)
+                ],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(POST_URL, params, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
 
 class PostImageUploadTests(TestCase):
 
@@ -0,0 +1,194 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag, Content
+from post.cache import PostDocumentCache, post_documents
+
+ORIGIN = 'http://testserver/'
+
+
+def post_detail_url(post_id):
+    """return detail url for a post"""
+    return reverse('post:post-detail', args=[post_id])
+
+
+def create_sample_user(email='test@email.com'):
+    """Create a sample user"""
+    return get_user_model().objects.create_user(
+        email=email,
+        password='demo1234',
+        name='Test User'
+    )
+
+
+class PostDocumentCacheTests(TestCase):
+    """Tests the post document cache"""
+
+    def test_document_only_returned_to_owner(self):
+        """Test a cached document is a miss for other users"""
+        cache = PostDocumentCache(max_size=10, ttl=None)
+        cache.set(1, 1, 1, ORIGIN, {'id': 1})
+
+        self.assertEqual(cache.get(1, 1, 1, ORIGIN), {'id': 1})
+        self.assertIsNone(cache.get(1, 2, 1, ORIGIN))
+        self.assertEqual(cache.stats(), {
+            'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1})
+
+    def test_document_only_returned_at_its_version(self):
+        """Test a document rendered before its owner's data changed misses"""
+        cache = PostDocumentCache(max_size=10, ttl=None)
+        cache.set(1, 1, 1, ORIGIN, {'id': 1})
+
+        self.assertIsNone(cache.get(1, 1, 2, ORIGIN))
+
+    def test_document_only_returned_through_its_origin(self):
+        """Test a document whose URLs were built for another host misses"""
+        cache = PostDocumentCache(max_size=10, ttl=None)
+        cache.set(1, 1, 1, ORIGIN, {'id': 1})
+
+        self.assertIsNone(cache.get(1, 1, 1, 'https://testserver/'))
+        self.assertIsNone(cache.get(1, 1, 1, 'http://example.com/'))
+
+    def test_evictions_counted(self):
+        """Test documents past max size evict the oldest ones"""
+        cache = PostDocumentCache(max_size=2, ttl=None)
+        for post_id in range(3):
+            cache.set(post_id, 1, 1, ORIGIN, {'id': post_id})
+
+        self.assertIsNone(cache.get(0, 1, 1, ORIGIN))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+class PostCacheApiTests(TestCase):
+    """Tests post details are served from and dropped from the cache"""
+
+    def setUp(self):
+        post_documents.clear()
+        self.user = create_sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Tag')
+        self.content = Content.objects.create(
+            user=self.user, title='Content', text='text')
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+        self.post.tags.add(self.tag)
+        self.post.contents.add(self.content)
+        self.url = post_detail_url(self.post.id)
+
+    def assertDetailCached(self):
+        """Assert the post detail is served without loading the post"""
+        # only the data version lookup runs
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_detail_served_from_cache(self):
+        """Test a second detail read does not query the post"""
+        first = self.client.get(self.url)
+        res = self.assertDetailCached()
+
+        self.assertEqual(res.data, first.data)
+
+    def test_other_user_not_served(self):
+        """Test a cached post is not returned to another user"""
+        self.client.get(self.url)
+        other = APIClient()
+        other.force_authenticate(user=create_sample_user('other@email.com'))
+
+        res = other.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_origin_not_served(self):
+        """Test a document cached through one origin is not served another
+
+        Its rendition URLs are absolute, built for the scheme and host
+        requested.
+        """
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(self.url, secure=True)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # the post was loaded, past the data version lookup
+        self.assertGreater(len(queries), 1)
+
+    def test_post_update_invalidates(self):
+        """Test updating a post drops its document"""
+        self.client.get(self.url)
+        self.client.patch(self.url, {'post_title': 'New'})
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['post_title'], 'New')
+        self.assertDetailCached()
+
+    def test_write_elsewhere_not_served(self):
+        """Test a document is not served once its owner's version moved
+
+        As happens after a write handled by another process, whose
+        invalidation does not reach this process' documents.
+        """
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(post_title='Elsewhere')
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            data_version=F('data_version') + 1)
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['post_title'], 'Elsewhere')
+
+    def test_tag_update_invalidates(self):
+        """Test renaming a tag drops the documents of posts using it"""
+        self.client.get(self.url)
+        self.tag.name = 'Renamed'
+        self.tag.save()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['tags'][0]['name'], 'Renamed')
+
+    def test_content_delete_invalidates(self):
+        """Test deleting a content drops the documents of its posts"""
+        self.client.get(self.url)
+        self.content.delete()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['contents'], [])
+
+    def test_relations_change_invalidates(self):
+        """Test changing a post's tags from either side drops its document"""
+        other = Tag.objects.create(user=self.user, name='Other')
+
+        self.client.get(self.url)
+        self.post.tags.add(other)
+        res = self.client.get(self.url)
+        self.assertEqual(len(res.data['tags']), 2)
+
+        other.post_set.remove(self.post)
+        res = self.client.get(self.url)
+        self.assertEqual(len(res.data['tags']), 1)
+
+        self.tag.post_set.clear()
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['tags'], [])
+
+    def test_post_delete_invalidates(self):
+        """Test a deleted post is not served from the cache"""
+        self.client.get(self.url)
+        self.post.delete()
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,172 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Content, Post, Tag
+from post.filters import filter_posts
+
+
+POST_URL = reverse('post:post-list')
+
+
+class PostFilterTests(TestCase):
+    """Tests filtering the posts list by tags, contents and image"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.both = Post.objects.create(user=self.user, post_title='Salad')
+        self.both.tags.add(self.vegan, self.quick)
+        self.vegan_only = Post.objects.create(
+            user=self.user, post_title='Stew')
+        self.vegan_only.tags.add(self.vegan)
+        self.untagged = Post.objects.create(user=self.user, post_title='Ham')
+
+    def list_ids(self, **params):
+        """List posts with params, return their ids"""
+        res = self.client.get(POST_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {post['id'] for post in res.data['results']}
+
+    def test_filter_any_tags(self):
+        """Test posts with any of the tags are listed once"""
+        ids = self.list_ids(tags=f'{self.vegan.id},{self.quick.id}')
+
+        self.assertEqual(ids, {self.both.id, self.vegan_only.id})
+
+    def test_filter_all_tags(self):
+        """Test posts with every tag are listed"""
+        ids = self.list_ids(
+            tags=f'{self.vegan.id},{self.quick.id},{self.quick.id}',
+            tags_match='all'
+        )
+
+        self.assertEqual(ids, {self.both.id})
+
+    def test_filter_contents(self):
+        """Test posts are filtered by content"""
+        content = Content.objects.create(
+            user=self.user, title='Dressing', text='Oil')
+        other = Content.objects.create(
+            user=self.user, title='Croutons', text='Bread')
+        self.both.contents.add(content, other)
+        self.untagged.contents.add(content)
+
+        self.assertEqual(
+            self.list_ids(contents=str(content.id)),
+            {self.both.id, self.untagged.id}
+        )
+        self.assertEqual(
+            self.list_ids(
+                contents=f'{content.id},{other.id}', contents_match='all'),
+            {self.both.id}
+        )
+
+    def test_filter_has_image(self):
+        """Test posts are filtered by whether they have an image"""
+        Post.objects.filter(pk=self.both.pk).update(image='uploads/a.jpg')
+
+        self.assertEqual(self.list_ids(has_image='true'), {self.both.id})
+        self.assertEqual(
+            self.list_ids(has_image='false'),
+            {self.vegan_only.id, self.untagged.id}
+        )
+
+    def test_filters_combined(self):
+        """Test filters narrow each other down"""
+        ids = self.list_ids(tags=str(self.vegan.id), has_image='false')
+
+        self.assertEqual(ids, {self.both.id, self.vegan_only.id})
+
+    def test_invalid_filters(self):
+        """Test malformed filters are refused"""
+        for params, field in (
+            ({'tags': '1,two'}, 'tags'),
+            ({'tags': '1', 'tags_match': 'some'}, 'tags_match'),
+            ({'has_image': 'maybe'}, 'has_image'),
+        ):
+            res = self.client.get(POST_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, res.data)
+
+
+class PostFilterPlanTests(TestCase):
+    """Tests the tag and content filters are served by the link indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=cls.user, name=f'tag {i}') for i in range(1000))
+        contents = Content.objects.bulk_create(
+            Content(user=cls.user, title=f'content {i}', text='text')
+            for i in range(1000)
+        )
+        posts = Post.objects.bulk_create(
+            Post(user=cls.user, post_title=f'post {i}') for i in range(5000))
+        # every tag and content linked to 15 posts
+        Post.tags.through.objects.bulk_create(
+            Post.tags.through(
+                post_id=post.id, tag_id=tags[(i + j) % 1000].id)
+            for i, post in enumerate(posts) for j in range(3)
+        )
+        Post.contents.through.objects.bulk_create(
+            Post.contents.through(
+                post_id=post.id, content_id=contents[(i + j) % 1000].id)
+            for i, post in enumerate(posts) for j in range(3)
+        )
+        cls.tag_ids = ','.join(str(tag.id) for tag in tags[:2])
+        cls.content_ids = ','.join(
+            str(content.id) for content in contents[:2])
+        # statistics the planner would have on a live database
+        with connection.cursor() as cursor:
+            for table in (
+                'core_post', 'core_post_tags', 'core_post_contents'
+            ):
+                cursor.execute(f'ANALYZE {table}')
+
+    def plan(self, **params):
+        """Return the query plan of the posts list filtered by params"""
+        queryset = filter_posts(
+            Post.objects.filter(user=self.user), params).order_by('-id')
+        return queryset[:50].explain()
+
+    def test_any_tags_plan(self):
+        """Test posts with any tag are found from the tag link index"""
+        plan = self.plan(tags=self.tag_ids)
+
+        self.assertIn('core_post_tags_tag_post_idx', plan)
+        self.assertNotIn('Seq Scan on core_post_tags', plan)
+
+    def test_all_tags_plan(self):
+        """Test posts with all tags are grouped from the tag link index"""
+        plan = self.plan(tags=self.tag_ids, tags_match='all')
+
+        self.assertIn('core_post_tags_tag_post_idx', plan)
+        self.assertIn('Aggregate', plan)
+        # one semi-join, not a join per tag
+        self.assertEqual(plan.count(' on core_post_tags '), 1)
+
+    def test_contents_plan(self):
+        """Test posts with a content are found from the content link index"""
+        plan = self.plan(contents=self.content_ids, contents_match='all')
+
+        self.assertIn('core_post_contents_content_post_idx', plan)
+        self.assertNotIn('Seq Scan on core_post_contents', plan)
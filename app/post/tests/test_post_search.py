@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Content, Post
+
+
+POST_URL = reverse('post:post-list')
+
+
+class PostSearchTests(TestCase):
+    """Tests searching posts by title and content text"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_post(self, title, content_text=None, user=None):
+        """Create a post, with a content holding content_text if given"""
+        user = user or self.user
+        post = Post.objects.create(user=user, post_title=title)
+        if content_text:
+            post.contents.add(Content.objects.create(
+                user=user, title='Content', text=content_text))
+        return post
+
+    def search(self, term, **params):
+        """Search posts, return the ids found in order"""
+        res = self.client.get(POST_URL, {'search': term, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in res.data['results']]
+
+    def test_search_ranked(self):
+        """Test posts matching in the title rank above content matches"""
+        in_text = self.create_post('Dinner', 'Serve with fresh basil')
+        in_title = self.create_post('Basil pesto')
+        self.create_post('Lemon tart', 'Bake for an hour')
+
+        self.assertEqual(self.search('basil'), [in_title.id, in_text.id])
+
+    def test_search_limited_to_user(self):
+        """Test posts of other users are not found"""
+        other = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='demo1234',
+            name='Other User'
+        )
+        self.create_post('Basil pesto', user=other)
+
+        self.assertEqual(self.search('basil'), [])
+
+    def test_search_paginated(self):
+        """Test search results page by rank without gaps or repeats"""
+        posts = [
+            self.create_post('Basil ' * (i % 3 + 1), 'basil')
+            for i in range(7)
+        ]
+
+        ids = []
+        res = self.client.get(POST_URL, {'search': 'basil', 'page_size': 2})
+        while True:
+            ids.extend(post['id'] for post in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertCountEqual(ids, [post.id for post in posts])
+        self.assertEqual(ids, self.search('basil', page_size=10))
+
+    def test_search_paginated_by_number(self):
+        """Test search results sharing a rank page past the first page"""
+        posts = [self.create_post('Basil') for i in range(5)]
+
+        res = self.client.get(
+            POST_URL, {'search': 'basil', 'page_size': 2, 'page': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual(
+            [post['id'] for post in res.data['results']], [posts[0].id])
+        self.assertIsNone(res.data['next'])
+        self.assertIn('page=2', res.data['previous'])
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag, Content
+
+
+POST_URL = reverse('post:post-list')
+
+
+def post_detail_url(post_id):
+    """return detail url for a post"""
+    return reverse('post:post-detail', args=[post_id])
+
+
+class QueryBudgetMixin:
+    """Harness asserting an endpoint's query count does not grow with data
+
+    Posts are seeded in bulk up to every size in `sizes`; at each size the
+    endpoint is requested and its queries captured. The test fails if the
+    count changes between sizes or exceeds the given budget.
+    """
+
+    sizes = (1, 100, 10000)
+    tags_per_post = 2
+    contents_per_post = 2
+
+    def seed_posts(self, user, total):
+        """Bulk create posts for user until they own `total` of them"""
+        existing = Post.objects.filter(user=user).count()
+        if existing >= total:
+            return
+
+        tags = list(Tag.objects.filter(user=user)[:self.tags_per_post])
+        for i in range(len(tags), self.tags_per_post):
+            tags.append(Tag.objects.create(user=user, name=f'tag {i}'))
+        contents = list(
+            Content.objects.filter(user=user)[:self.contents_per_post])
+        for i in range(len(contents), self.contents_per_post):
+            contents.append(Content.objects.create(
+                user=user, title=f'content {i}', text='text'))
+
+        posts = Post.objects.bulk_create(
+            Post(user=user, post_title=f'post {i}')
+            for i in range(existing, total)
+        )
+        Post.tags.through.objects.bulk_create(
+            Post.tags.through(post_id=post.id, tag_id=tag.id)
+            for post in posts for tag in tags
+        )
+        Post.contents.through.objects.bulk_create(
+            Post.contents.through(post_id=post.id, content_id=content.id)
+            for post in posts for content in contents
+        )
+
+    def count_queries(self, url):
+        """Request url and return the number of queries it ran"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def assertQueryBudget(self, user, get_url, budget):
+        """Assert get_url() runs the same queries, within budget, per size"""
+        counts = {}
+        for size in self.sizes:
+            self.seed_posts(user, size)
+            counts[size] = self.count_queries(get_url())
+
+        self.assertLessEqual(max(counts.values()), budget, counts)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+
+class PostQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Tests the posts api runs a constant number of queries"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def latest_post_url(self):
+        """return detail url of the user's latest post"""
+        post = Post.objects.filter(user=self.user).latest('id')
+        return post_detail_url(post.id)
+
+    def test_list_posts_query_budget(self):
+        """Test listing posts does not query per post"""
+        # data version, posts, tags and contents
+        self.assertQueryBudget(self.user, lambda: POST_URL, budget=4)
+
+    def test_retrieve_post_query_budget(self):
+        """Test post detail does not query per tag or content"""
+        # data version, post, tags and contents
+        self.assertQueryBudget(self.user, self.latest_post_url, budget=4)
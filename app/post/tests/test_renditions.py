@@ -0,0 +1,145 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageStatus, Post
+from post import imaging
+from post.renditions import (
+    RenditionPool,
+    image_storage,
+    mark_renditions,
+    rendition_name,
+    rendition_targets
+)
+
+
+RENDITIONS = {
+    'thumbnail': {'size': (20, 20), 'format': 'JPEG'},
+    'webp': {'size': (50, 40), 'format': 'WEBP'},
+}
+
+
+def image_upload_url(post_id):
+    """return url for image upload"""
+    return reverse('post:post-upload-image', args=[post_id])
+
+
+def post_detail_url(post_id):
+    """return detail url for a post"""
+    return reverse('post:post-detail', args=[post_id])
+
+
+def sample_image(size=(100, 80), image_format='JPEG'):
+    """Return the bytes of a sample image"""
+    with tempfile.TemporaryFile() as temp:
+        Image.new('RGB', size, 'red').save(temp, format=image_format)
+        temp.seek(0)
+        return temp.read()
+
+
+@override_settings(POST_IMAGE_RENDITIONS=RENDITIONS)
+class RenditionTests(TestCase):
+    """Tests post image renditions"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+        self.post.image.save('sample.jpg', ContentFile(sample_image()))
+        self.name = self.post.image.name
+
+    def tearDown(self):
+        storage = image_storage()
+        for rendition in RENDITIONS:
+            storage.delete(rendition_name(self.name, rendition))
+        storage.delete(self.name)
+        self.post.refresh_from_db()
+        self.post.image.delete(save=False)
+
+    def assertRendered(self):
+        """Assert every rendition exists and fits its size"""
+        storage = image_storage()
+        for rendition, spec in RENDITIONS.items():
+            path = storage.path(rendition_name(self.name, rendition))
+            with Image.open(path) as image:
+                self.assertEqual(image.format, spec['format'])
+                self.assertLessEqual(image.width, spec['size'][0])
+                self.assertLessEqual(image.height, spec['size'][1])
+
+    def test_rendition_names(self):
+        """Test renditions are stored next to the original"""
+        name = rendition_name('uploads/post/abc.png', 'webp')
+
+        self.assertEqual(name, 'uploads/post/abc.webp.webp')
+
+    def test_render(self):
+        """Test renditions are scaled down to fit, keeping aspect ratio"""
+        imaging.render(self.post.image.path, rendition_targets(self.name))
+
+        self.assertRendered()
+        path = image_storage().path(rendition_name(self.name, 'webp'))
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (50, 40))
+
+    def test_render_in_pool(self):
+        """Test renditions are rendered in worker processes"""
+        pool = RenditionPool()
+        try:
+            pool.submit(self.post.id, self.name).result(timeout=60)
+        finally:
+            pool.shutdown()
+
+        self.assertRendered()
+
+    def test_upload_schedules_renditions(self):
+        """Test uploading queues renditions once the upload commits"""
+        with patch('post.renditions.transaction.on_commit') as on_commit, \
+                patch('post.renditions.rendition_pool.submit') as submit:
+            res = self.client.post(
+                image_upload_url(self.post.id),
+                {'image': ContentFile(sample_image(), name='new.jpg')},
+                format='multipart'
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['image_status'], ImageStatus.PENDING)
+            self.assertIsNone(res.data['renditions'])
+            submit.assert_not_called()
+
+            on_commit.call_args[0][0]()
+
+        self.post.refresh_from_db()
+        submit.assert_called_once_with(self.post.id, self.post.image.name)
+
+    def test_ready_renditions_serialized(self):
+        """Test post details show rendition urls once they are ready"""
+        mark_renditions(self.post.id, self.name, ImageStatus.READY)
+
+        res = self.client.get(post_detail_url(self.post.id))
+
+        self.assertEqual(res.data['image_status'], ImageStatus.READY)
+        self.assertEqual(set(res.data['renditions']), set(RENDITIONS))
+        self.assertTrue(res.data['renditions']['thumbnail'].endswith(
+            os.path.basename(rendition_name(self.name, 'thumbnail'))))
+
+    def test_replaced_image_not_marked(self):
+        """Test a job finishing for a replaced image changes nothing"""
+        mark_renditions(
+            self.post.id, 'uploads/post/old.jpg', ImageStatus.READY)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_status, '')
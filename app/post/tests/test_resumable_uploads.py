@@ -0,0 +1,250 @@
+import fcntl
+import io
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageStatus, ImageUpload, Post
+from post.uploads import append_chunk, part_path
+
+
+def create_upload_url(post_id):
+    """return url starting a resumable upload"""
+    return reverse('post:post-create-image-upload', args=[post_id])
+
+
+def upload_url(post_id, upload_id):
+    """return url of a resumable upload"""
+    return reverse('post:post-image-upload', args=[post_id, upload_id])
+
+
+def finalize_url(post_id, upload_id):
+    """return url completing a resumable upload"""
+    return reverse(
+        'post:post-finalize-image-upload', args=[post_id, upload_id])
+
+
+def sample_image_data(color=(255, 0, 0)):
+    """Return the bytes of a small PNG image"""
+    data = io.BytesIO()
+    Image.new('RGB', (40, 40), color).save(data, format='PNG')
+    return data.getvalue()
+
+
+class ResumableUploadTests(TestCase):
+    """Tests post images uploaded in chunks"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(user=self.user, post_title='Post')
+        self.data = sample_image_data()
+
+    def tearDown(self):
+        self.post.refresh_from_db()
+        self.post.image.delete()
+        for upload in ImageUpload.objects.all():
+            os.remove(part_path(upload.pk))
+
+    def start(self, size=None):
+        """Start an upload of self.data, return its id"""
+        res = self.client.post(create_upload_url(self.post.id), {
+            'filename': 'photo.png',
+            'size': len(self.data) if size is None else size,
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def put_chunk(self, upload_id, offset, chunk):
+        """Send a chunk of an upload"""
+        return self.client.put(
+            upload_url(self.post.id, upload_id), chunk,
+            content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_start_upload(self):
+        """Test starting an upload creates its empty partial file"""
+        upload_id = self.start()
+
+        upload = ImageUpload.objects.get(pk=upload_id)
+        self.assertEqual(upload.user, self.user)
+        self.assertEqual(upload.post, self.post)
+        self.assertEqual(upload.offset, 0)
+        self.assertEqual(os.path.getsize(part_path(upload_id)), 0)
+
+    def test_start_upload_too_large(self):
+        """Test uploads larger than an image may be are refused"""
+        with self.settings(POST_IMAGE_MAX_SIZE=100):
+            res = self.client.post(create_upload_url(self.post.id), {
+                'filename': 'photo.png', 'size': 101})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('size', res.data)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_upload_in_chunks(self):
+        """Test chunks append to the upload and report its progress"""
+        upload_id = self.start()
+
+        res = self.put_chunk(upload_id, 0, self.data[:50])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['offset'], 50)
+        self.assertEqual(res['Upload-Offset'], '50')
+
+        self.put_chunk(upload_id, 50, self.data[50:])
+        res = self.client.get(upload_url(self.post.id, upload_id))
+
+        self.assertEqual(res.data['offset'], len(self.data))
+        with open(part_path(upload_id), 'rb') as part:
+            self.assertEqual(part.read(), self.data)
+
+    def test_chunk_at_wrong_offset(self):
+        """Test a chunk not continuing the upload conflicts"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data[:50])
+
+        res = self.put_chunk(upload_id, 20, self.data[20:80])
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 50)
+        self.assertEqual(res['Upload-Offset'], '50')
+
+    def test_chunk_past_size(self):
+        """Test chunks ending past the announced size are refused"""
+        upload_id = self.start()
+
+        res = self.put_chunk(upload_id, 0, self.data + b'extra')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImageUpload.objects.get(pk=upload_id).offset, 0)
+
+    def test_chunk_without_offset(self):
+        """Test chunks must say where they start"""
+        upload_id = self.start()
+
+        res = self.client.put(
+            upload_url(self.post.id, upload_id), self.data,
+            content_type='application/octet-stream'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concurrent_chunk(self):
+        """Test a chunk arriving while another is written conflicts"""
+        upload_id = self.start()
+
+        with open(part_path(upload_id), 'r+b') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            res = self.put_chunk(upload_id, 0, self.data)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(ImageUpload.objects.get(pk=upload_id).offset, 0)
+
+    def test_interrupted_chunk_resumes(self):
+        """Test the bytes of an interrupted chunk are kept"""
+        upload_id = self.start()
+        upload = ImageUpload.objects.get(pk=upload_id)
+
+        # the client disconnected after sending 30 of 100 bytes
+        offset = append_chunk(upload, 0, io.BytesIO(self.data[:30]), 100)
+        self.assertEqual(offset, 30)
+
+        res = self.put_chunk(upload_id, 30, self.data[30:])
+        self.assertEqual(res.data['offset'], len(self.data))
+
+    def test_finalize_upload(self):
+        """Test a complete upload becomes the post's image"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data)
+
+        with patch('django.db.transaction.on_commit') as on_commit:
+            res = self.client.post(finalize_url(self.post.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_status, ImageStatus.PENDING)
+        with self.post.image.open() as image:
+            self.assertEqual(image.read(), self.data)
+        self.assertTrue(self.post.image.name.endswith('.png'))
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+        # the partial file was moved into storage
+        self.assertFalse(os.path.exists(part_path(upload_id)))
+        on_commit.assert_called()
+
+    def test_finalize_incomplete_upload(self):
+        """Test an upload missing bytes is not attached"""
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data[:50])
+
+        res = self.client.post(finalize_url(self.post.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 50)
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.image)
+
+    def test_finalize_invalid_image(self):
+        """Test a complete upload that is not an image is refused"""
+        self.data = b'not an image' * 10
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, self.data)
+
+        res = self.client.post(finalize_url(self.post.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(ImageUpload.objects.filter(pk=upload_id).exists())
+
+    def test_upload_of_other_user(self):
+        """Test uploads are only reachable by the user who started them"""
+        upload_id = self.start()
+        other = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='demo1234',
+            name='Other User'
+        )
+        self.client.force_authenticate(user=other)
+
+        res = self.client.get(upload_url(self.post.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_clean_expired_uploads(self):
+        """Test uploads receiving nothing for too long are deleted"""
+        expired_id = self.start()
+        active_id = self.start()
+        ImageUpload.objects.filter(pk=expired_id).update(
+            updated=timezone.now() - timedelta(days=2))
+
+        call_command('clean_image_uploads', stdout=io.StringIO())
+
+        self.assertFalse(ImageUpload.objects.filter(pk=expired_id).exists())
+        self.assertFalse(os.path.exists(part_path(expired_id)))
+        self.assertTrue(ImageUpload.objects.filter(pk=active_id).exists())
+        self.assertTrue(os.path.exists(part_path(active_id)))
+
+    def test_clean_orphaned_files(self):
+        """Test old partial files without an upload are deleted"""
+        upload_id = self.start()
+        ImageUpload.objects.filter(pk=upload_id).delete()
+        old = (timezone.now() - timedelta(days=2)).timestamp()
+        os.utime(part_path(upload_id), (old, old))
+
+        call_command('clean_image_uploads', stdout=io.StringIO())
+
+        self.assertFalse(os.path.exists(part_path(upload_id)))
@@ -0,0 +1,242 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, touch_user_tags
+from post.autocomplete import (
+    TagAutocomplete,
+    TagTrie,
+    prefix_query,
+    tag_autocomplete
+)
+
+
+TAGS_URL = reverse('post:tag-list')
+
+
+class TagTrieTests(SimpleTestCase):
+    """Tests looking tags up by name prefix in a trie"""
+
+    def setUp(self):
+        self.trie = TagTrie([(1, 'pasta'), (2, 'Pastry'), (3, 'pie')])
+
+    def test_search_by_prefix(self):
+        """Test tags starting with a prefix are found in key order"""
+        self.assertEqual(
+            self.trie.search('PAST', 10), [(1, 'pasta'), (2, 'Pastry')])
+        self.assertEqual(
+            self.trie.search('p', 2), [(1, 'pasta'), (2, 'Pastry')])
+        self.assertEqual(self.trie.search('q', 10), [])
+
+    def test_add_rename_and_remove(self):
+        """Test tags are kept in order as they change"""
+        self.trie.add(4, 'Parsley')
+        self.trie.add(1, 'risotto')
+        self.trie.remove(2)
+        self.trie.remove(99)
+
+        self.assertEqual(self.trie.search('pa', 10), [(4, 'Parsley')])
+        self.assertEqual(self.trie.search('r', 10), [(1, 'risotto')])
+        self.assertEqual(len(self.trie), 3)
+
+
+class TagAutocompleteTests(TestCase):
+    """Tests tag autocompletion on the tags api"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@email.com',
+            password='demo1234',
+            name='Test User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for name in ('pasta', 'Pastry', 'pie', 'stew'):
+            Tag.objects.create(user=self.user, name=name)
+        tag_autocomplete.clear()
+        # a background load could not see the test's uncommitted tags
+        patcher = patch.object(tag_autocomplete, 'warm')
+        self.warm = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        tag_autocomplete.clear()
+
+    def complete(self, prefix, **params):
+        """Autocomplete prefix, return the names found"""
+        res = self.client.get(TAGS_URL, {'prefix': prefix, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [tag['name'] for tag in res.data['results']]
+
+    def test_cold_lookup_from_database(self):
+        """Test users without a trie are answered from the database"""
+        other = get_user_model().objects.create_user(
+            email='other@email.com',
+            password='demo1234',
+            name='Other User'
+        )
+        Tag.objects.create(user=other, name='pancake')
+
+        self.assertEqual(self.complete('pa'), ['pasta', 'Pastry'])
+        self.assertEqual(self.complete('p', limit=2), ['pasta', 'Pastry'])
+        self.warm.assert_called_with(self.user.pk)
+
+    def test_warm_lookup_from_trie(self):
+        """Test a loaded trie answers and follows tag writes"""
+        with patch.object(tag_autocomplete, 'warm', tag_autocomplete.load):
+            self.complete('pa')
+        self.assertIsNotNone(tag_autocomplete.get(self.user.pk))
+
+        with patch('django.db.transaction.on_commit', lambda func: func()):
+            Tag.objects.create(user=self.user, name='Paella')
+            Tag.objects.filter(name='pasta').get().delete()
+            Tag.objects.bulk_create([Tag(user=self.user, name='panna')])
+        trie = tag_autocomplete.get(self.user.pk)
+        self.assertEqual(
+            [name for _, name in trie.search('PA', 10)],
+            ['Paella', 'panna', 'Pastry'])
+
+        # the trie followed the writes to the user's tag version
+        with patch('post.views.prefix_query') as query:
+            self.assertEqual(
+                self.complete('PA'), ['Paella', 'panna', 'Pastry'])
+        query.assert_not_called()
+
+    def test_write_elsewhere_reloads_trie(self):
+        """Test a trie older than the user's tag version is not used
+
+        As happens after a tag write handled by another process, whose
+        signals do not reach this process' tries.
+        """
+        tag_autocomplete.load(self.user.pk)
+        Tag.objects.filter(user=self.user, name='pie').update(name='pear')
+        touch_user_tags(self.user.pk)
+
+        self.assertEqual(self.complete('pe'), ['pear'])
+        self.warm.assert_called_with(self.user.pk)
+
+    def test_non_ascii_lookups_agree(self):
+        """Test the database and a trie match non-ASCII names alike"""
+        for name in ('éclair', 'Écru', 'straße', 'STRASSE'):
+            Tag.objects.create(user=self.user, name=name)
+        prefixes = ('é', 'É', 'e', 'stra', 'STRAß', 'strass')
+
+        cold = [self.complete(prefix) for prefix in prefixes]
+        tag_autocomplete.load(self.user.pk)
+        warm = [self.complete(prefix) for prefix in prefixes]
+
+        self.assertEqual(warm, cold)
+        self.assertEqual(cold[:2], [['éclair'], ['Écru']])
+        self.assertEqual(cold[4], ['straße'])
+
+    def test_prefix_is_literal(self):
+        """Test LIKE wildcards in the prefix match themselves"""
+        Tag.objects.create(user=self.user, name='50% off')
+
+        self.assertEqual(self.complete('5%'), [])
+        self.assertEqual(self.complete('50%'), ['50% off'])
+
+    def test_prefix_with_null_character(self):
+        """Test a prefix holding a null character is a bad request"""
+        res = self.client.get(TAGS_URL, {'prefix': 'pa\x00'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('prefix', res.data)
+
+    def test_prefix_before_surrogates(self):
+        """Test a prefix ending right before the surrogates is looked up"""
+        Tag.objects.create(user=self.user, name='pa\ud7ff')
+        Tag.objects.create(user=self.user, name='pa\ue000')
+
+        self.assertEqual(self.complete('pa\ud7ff'), ['pa\ud7ff'])
+        tag_autocomplete.load(self.user.pk)
+        self.assertEqual(self.complete('pa\ud7ff'), ['pa\ud7ff'])
+
+    def test_list_without_prefix(self):
+        """Test the tags list is unchanged without ?prefix="""
+        res = self.client.get(TAGS_URL)
+
+        self.assertIn('next', res.data)
+
+
+class TagAutocompleteCacheTests(TestCase):
+    """Tests the per-user tries are bounded and loaded safely"""
+
+    def setUp(self):
+        self.autocomplete = TagAutocomplete(max_size=3, ttl=None)
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'user{i}@email.com', password='demo1234')
+            for i in range(2)
+        ]
+        for user in self.users:
+            Tag.objects.create(user=user, name='pasta')
+            Tag.objects.create(user=user, name='pie')
+
+    def test_bounded_by_tags(self):
+        """Test the least recently used tries are evicted past the size"""
+        first, second = self.users
+        self.autocomplete.load(first.pk)
+        self.autocomplete.load(second.pk)
+
+        self.assertIsNone(self.autocomplete.get(first.pk))
+        self.assertIsNotNone(self.autocomplete.get(second.pk))
+
+    def test_failed_load_retried(self):
+        """Test a load failing does not keep the user marked loading"""
+        user = self.users[0]
+        with patch.object(Tag.objects, 'filter',
+                          side_effect=OperationalError), \
+                self.assertRaises(OperationalError):
+            self.autocomplete.load(user.pk)
+
+        self.assertEqual(self.autocomplete._loading, {})
+        with patch.object(self.autocomplete._executor, 'submit') as submit:
+            self.autocomplete.warm(user.pk)
+        submit.assert_called_once()
+
+    def test_trie_behind_other_write_stays_behind(self):
+        """Test a trie missing a write is not moved past it by a later one"""
+        user = self.users[0]
+        self.autocomplete.load(user.pk)
+        version = touch_user_tags(user.pk, 2)
+
+        self.autocomplete.saved(user.pk, 99, 'paella', version)
+
+        self.assertIsNone(self.autocomplete.get(user.pk, version))
+
+    def test_load_raced_by_write_dropped(self):
+        """Test a trie read while its tags changed is not kept"""
+        user = self.users[0]
+        self.autocomplete._loading[user.pk] = 0
+        self.autocomplete.saved(user.pk, 99, 'paella')
+
+        self.autocomplete.load(user.pk)
+
+        self.assertIsNone(self.autocomplete.get(user.pk))
+        self.autocomplete.load(user.pk)
+        self.assertIsNotNone(self.autocomplete.get(user.pk))
+
+
+class TagPrefixPlanTests(TestCase):
+    """Tests cold prefix lookups read one range of the prefix index"""
+
+    def test_prefix_plan(self):
+        user = get_user_model().objects.create_user(
+            email='test@email.com', password='demo1234')
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'tag {i}') for i in range(5000))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_tag')
+
+        plan = prefix_query(
+            Tag.objects.filter(user=user), 'tag 12')[:10].explain()
+
+        self.assertIn('core_tag_user_name_prefix_idx', plan)
+        self.assertNotIn('Sort', plan)
@@ -1,15 +1,20 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Tag, Post
 from post.serializers import TagSerializer
 
 
 TAGS_URL = reverse('post:tag-list')
+TAG_CLOUD_URL = reverse('post:tag-cloud')
 
 
 class PublicTagsApiTests(TestCase):
@@ -50,7 +55,7 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_tags_limited_to_user(self):
         """Test retrieving tags belong to the specific user"""
@@ -66,8 +71,31 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+
+    def test_retrieve_tags_with_count(self):
+        """Test asking for the total number of tags"""
+        Tag.objects.create(user=self.user, name='TestTag')
+        Tag.objects.create(user=self.user, name='TestTag2')
+
+        res = self.client.get(TAGS_URL, {'with_count': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+        self.assertFalse(res.data['count_is_approximate'])
+        self.assertEqual(len(res.data['results']), 2)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_retrieve_tags_with_approximate_count(self):
+        """Test large counts are flagged as approximate"""
+        Tag.objects.create(user=self.user, name='TestTag')
+
+        res = self.client.get(TAGS_URL, {'with_count': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['count_is_approximate'])
+        self.assertIsInstance(res.data['count'], int)
 
     def test_create_tags_successful(self):
         """Test creating a tag successfully"""
@@ -92,3 +120,155 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, params)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_tags(self):
+        """Test creating a list of tags in one insert"""
+
+        params = [{'name': f'tag{i}'} for i in range(3)]
+
+        # the check for taken names, then the insert and the owner's data
+        # and tag version bumps, in the savepoint that catches duplicate
+        # names; outside tests it is the transaction
+        with self.assertNumQueries(6):
+            res = self.client.post(TAGS_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [t['name'] for t in res.data], ['tag0', 'tag1', 'tag2'])
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(
+            sorted(t.id for t in tags), sorted(t['id'] for t in res.data))
+
+    def test_create_tag_duplicate_name(self):
+        """Test a user cannot have two tags named alike"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_tags_duplicate_names(self):
+        """Test names taken by a tag or an earlier item are reported"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        params = [{'name': 'a'}, {'name': 'vegan'}, {'name': 'b'},
+                  {'name': 'A'}]
+
+        res = self.client.post(TAGS_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([bool(item) for item in res.data],
+                         [False, True, False, True])
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[3])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_tags_raced_by_duplicate(self):
+        """Test a name taken after validation is reported by position"""
+        params = [{'name': 'a'}, {'name': 'vegan'}]
+
+        check = Tag.objects.taken_names
+
+        # another request creates the tag once the names are first checked
+        def taken_names(user, names):
+            if not Tag.objects.filter(user=user).exists():
+                Tag.objects.create(user=user, name='Vegan')
+                return []
+            return check(user, names)
+
+        with patch.object(Tag.objects, 'taken_names', taken_names):
+            res = self.client.post(TAGS_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(
+            list(Tag.objects.filter(user=self.user).values_list(
+                'name', flat=True)), ['Vegan'])
+
+    def test_bulk_create_tags_invalid_item(self):
+        """Test one invalid item is reported and nothing is created"""
+
+        params = [{'name': 'tag1'}, {'name': ''}, {'name': 'tag3'}]
+
+        res = self.client.post(TAGS_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(res.data[2], {})
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    @override_settings(POST_BULK_CREATE_MAX_SIZE=2)
+    def test_bulk_create_tags_too_many(self):
+        """Test batches over the configured size are rejected"""
+
+        params = [{'name': f'tag{i}'} for i in range(3)]
+
+        res = self.client.post(TAGS_URL, params, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', res.data)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_retrieve_tags_by_usage(self):
+        """Test ?sort=usage lists the most used tags first"""
+        rare = Tag.objects.create(user=self.user, name='a rare')
+        common = Tag.objects.create(user=self.user, name='b common')
+        for i in range(2):
+            post = Post.objects.create(user=self.user, post_title=f'post{i}')
+            post.tags.add(common)
+        post.tags.add(rare)
+
+        res = self.client.get(TAGS_URL, {'sort': 'usage'})
+
+        self.assertEqual(
+            [tag['id'] for tag in res.data['results']], [common.id, rare.id])
+
+    def test_retrieve_tags_by_usage_paginated_with_ties(self):
+        """Test pages of tags equally used seek by count and id"""
+        used = Tag.objects.create(user=self.user, name='used')
+        Post.objects.create(user=self.user, post_title='post').tags.add(used)
+        unused = [
+            Tag.objects.create(user=self.user, name=f'tag{i}')
+            for i in range(7)
+        ]
+
+        ids = []
+        url = f'{TAGS_URL}?sort=usage&page_size=2'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                ids.extend(tag['id'] for tag in res.data['results'])
+                url = res.data['next']
+
+        self.assertEqual(
+            ids, [used.id] + sorted((t.id for t in unused), reverse=True))
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries))
+
+    def test_tag_cloud(self):
+        """Test the tag cloud returns the top used tags and the total"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'tag{i}')
+            for i in range(3)
+        ]
+        Tag.objects.create(user=self.user, name='unused')
+        for i, tag in enumerate(tags):
+            for j in range(i + 1):
+                post = Post.objects.create(
+                    user=self.user, post_title=f'post{i}{j}')
+                post.tags.add(tag)
+
+        # data version, top tags and the user's total, no link is counted
+        with self.assertNumQueries(3):
+            res = self.client.get(TAG_CLOUD_URL, {'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total'], 6)
+        self.assertEqual(
+            [(tag['name'], tag['post_count']) for tag in res.data['results']],
+            [('tag2', 3), ('tag1', 2)]
+        )
@@ -0,0 +1,120 @@
+import fcntl
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+
+from core.models import ImageUpload
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded files to temporary files, refusing oversized ones
+
+    Every chunk is written to disk as it arrives, so a request holds one
+    chunk of its upload in memory whatever the file's size. A file growing
+    past max_size stops the upload with a validation error on its field.
+    """
+
+    default_error_messages = {
+        'too_large': _('Ensure this file has no more than {max_size} bytes.'),
+    }
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.max_size is not None and \
+                start + len(raw_data) > self.max_size:
+            self.file.close()
+            message = self.default_error_messages['too_large'].format(
+                max_size=self.max_size)
+            raise serializers.ValidationError(
+                {self.field_name: [message]}, code='too_large')
+        return super().receive_data_chunk(raw_data, start)
+
+
+def image_upload_handlers(request):
+    """Return the upload handlers of a post image upload request"""
+    return [LimitedTemporaryFileUploadHandler(
+        request, max_size=settings.POST_IMAGE_MAX_SIZE)]
+
+
+class UploadConflict(Exception):
+    """A chunk does not continue an upload where it stands"""
+
+
+class PartialFile(File):
+    """A fully received upload, moved rather than copied into storage"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_dir():
+    """Return the directory partial uploads are kept in"""
+    return settings.POST_IMAGE_UPLOAD_DIR or os.path.join(
+        settings.MEDIA_ROOT, 'partial')
+
+
+def part_path(upload_id):
+    """Return the path of the partial file of an upload"""
+    return os.path.join(upload_dir(), f'{upload_id}.part')
+
+
+def start_upload(upload):
+    """Create the empty partial file of a new upload"""
+    os.makedirs(upload_dir(), exist_ok=True)
+    open(part_path(upload.pk), 'wb').close()
+
+
+def append_chunk(upload, offset, stream, length, chunk_size=64 * 1024):
+    """Append length bytes of stream to an upload at offset
+
+    The chunk is written after what was received before, which is never
+    read again, and the new offset recorded. A client disconnecting midway
+    keeps the bytes that arrived. Chunks not starting at the upload's
+    offset, or arriving while another chunk is written, raise
+    UploadConflict. Returns the new offset.
+    """
+    with open(part_path(upload.pk), 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict(upload.offset)
+
+        # another chunk may have landed between reading upload and locking
+        current = ImageUpload.objects.values_list(
+            'offset', flat=True).get(pk=upload.pk)
+        if offset != current:
+            raise UploadConflict(current)
+
+        # drop bytes written past the recorded offset by a failed request
+        part.truncate(offset)
+        part.seek(offset)
+        remaining = length
+        while remaining > 0:
+            chunk = stream.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            part.write(chunk)
+            remaining -= len(chunk)
+        part.flush()
+        os.fsync(part.fileno())
+
+        upload.offset = offset + length - remaining
+        ImageUpload.objects.filter(pk=upload.pk).update(
+            offset=upload.offset, updated=timezone.now())
+    return upload.offset
+
+
+def remove_part(upload_id):
+    """Delete the partial file of an upload, if still there"""
+    try:
+        os.remove(part_path(upload_id))
+    except FileNotFoundError:
+        pass
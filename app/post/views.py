@@ -1,64 +1,308 @@
+import hashlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy as _
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Tag, Content, Post
+from core.authentication import CachedTokenAuthentication
+from core.media import serve_file
+from core.models import ImageUpload, Tag, Content, Post
+from core.replicas import ReplicaReadMixin
+from core.storage import CONTENT_ADDRESSED_NAME
+from core.timing import ServerTimingMixin
 from post import serializers
+from post.autocomplete import prefix_query, tag_autocomplete
+from post.cache import post_documents
+from post.filters import filter_posts
+from post.pagination import (
+    PostPagination,
+    TagPagination,
+    ContentPagination
+)
+from post.renditions import image_storage, original_names
+from post.uploads import (
+    PartialFile,
+    UploadConflict,
+    append_chunk,
+    image_upload_handlers,
+    part_path,
+    remove_part,
+    start_upload
+)
+
+
+UUID_PATTERN = '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+
+
+class ConditionalGetMixin:
+    """Answer unchanged list and detail reads with 304 Not Modified
+
+    ETag and Last-Modified are derived from the requesting user's data
+    version, which every write to their tags, contents and posts bumps.
+    They cost one single-row query, so an unchanged read is answered
+    before any object is fetched or serialized.
+    """
+
+    def get_validators(self, request):
+        """Return the (etag, last modified timestamp) of this response"""
+        version, modified, tag_version = get_user_model().objects.filter(
+            pk=request.user.pk
+        ).values_list('data_version', 'data_modified', 'tag_version').get()
+        # what the response is rendered from must be at least this recent
+        request.data_version = version
+        request.tag_version = tag_version
+
+        representation = ':'.join((
+            str(request.user.pk),
+            str(version),
+            request.get_full_path(),
+            request.accepted_media_type,
+        ))
+        etag = quote_etag(hashlib.sha256(representation.encode()).hexdigest())
+        return etag, modified and int(modified.timestamp())
 
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Run handler unless the client's copy is still current"""
+        etag, last_modified = self.get_validators(request)
 
-class BaseViewSet(viewsets.GenericViewSet,
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+
+class BaseViewSet(ServerTimingMixin,
+                  ReplicaReadMixin,
+                  ConditionalGetMixin,
+                  viewsets.GenericViewSet,
                   mixins.ListModelMixin,
                   mixins.CreateModelMixin):
     """Base viewset"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
+    def get_serializer(self, *args, **kwargs):
+        """Create every object of a submitted list in one request"""
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
     def perform_create(self, serializer):
         """Create new object"""
         serializer.save(user=self.request.user)
 
 
+@contextmanager
+def unique_tag_names(serializer):
+    """Answer writes giving a user two tags named alike as invalid
+
+    Lists of tags are checked as they are validated, the unique index on
+    (user, LOWER(name)) decides for the rest, so concurrent requests
+    cannot both create a name.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError:
+        if isinstance(serializer, serializers.TagListSerializer):
+            # a concurrent request took names since, report which
+            serializer.check_unique_names(serializer.validated_data)
+        raise ValidationError(
+            {'name': [_('A tag with this name already exists.')]},
+            code='unique'
+        )
+
+
 class TagViewSet(BaseViewSet):
     """Manage tags in db"""
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    pagination_class = TagPagination
 
     def get_queryset(self):
         """Get tags for authenticated user's only"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        return self.queryset.filter(
+            user=self.request.user).order_by(*TagPagination.ordering)
+
+    def perform_create(self, serializer):
+        """Create new tags, unless the user has tags named alike"""
+        with unique_tag_names(serializer):
+            super().perform_create(serializer)
+
+    def list(self, request, *args, **kwargs):
+        if 'prefix' in request.query_params:
+            return self.conditional_response(self.autocomplete, request)
+        return super().list(request, *args, **kwargs)
+
+    def autocomplete(self, request):
+        """Return the first ?limit= tags whose name starts with ?prefix=
+
+        Answered from the user's trie in this process once loaded at
+        the user's tag version, from the (user, name key, id) index
+        until then.
+        """
+        prefix = request.query_params['prefix']
+        if '\x00' in prefix:
+            # no tag name holds one, and the database rejects it
+            return Response(
+                {'prefix': [_('Null characters are not allowed.')]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.TAG_AUTOCOMPLETE_SIZE))
+        except ValueError:
+            limit = settings.TAG_AUTOCOMPLETE_SIZE
+        limit = min(max(limit, 1), settings.TAG_AUTOCOMPLETE_MAX_SIZE)
+
+        trie = tag_autocomplete.get(request.user.pk, request.tag_version)
+        if trie is not None:
+            tags = trie.search(prefix, limit)
+        else:
+            tags = prefix_query(
+                self.get_queryset(), prefix).values_list('id', 'name')[:limit]
+            tag_autocomplete.warm(request.user.pk)
+
+        return Response({'results': [
+            {'id': tag_id, 'name': name} for tag_id, name in tags
+        ]})
+
+    @action(methods=['GET'], detail=False)
+    def cloud(self, request):
+        """List the user's most used tags with their post counts"""
+        return self.conditional_response(self.cloud_document, request)
+
+    def cloud_document(self, request):
+        """Return the top ?limit= tags from the maintained post counts"""
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.TAG_CLOUD_SIZE))
+        except ValueError:
+            limit = settings.TAG_CLOUD_SIZE
+        limit = min(max(limit, 1), settings.TAG_CLOUD_MAX_SIZE)
+
+        # served from the (user, post_count, id) index, without counting
+        # the posts of every tag
+        tags = self.get_queryset().filter(post_count__gt=0).order_by(
+            *TagPagination.usage_ordering)[:limit]
+        total = get_user_model().objects.filter(
+            pk=request.user.pk
+        ).values_list('tag_usage_total', flat=True).get()
+
+        serializer = serializers.TagUsageSerializer(tags, many=True)
+        return Response({'total': total, 'results': serializer.data})
 
 
 class ContentViewSet(BaseViewSet):
     """Manage post contents"""
     queryset = Content.objects.all()
     serializer_class = serializers.ContentSerializer
+    pagination_class = ContentPagination
 
     def get_queryset(self):
         """Get tags for authenticated user's only"""
-        return self.queryset.filter(user=self.request.user).order_by('-title')
+        return self.queryset.filter(
+            user=self.request.user).order_by(*ContentPagination.ordering)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ServerTimingMixin,
+                  ReplicaReadMixin,
+                  ConditionalGetMixin,
+                  viewsets.ModelViewSet):
     """Manage posts"""
     queryset = Post.objects.all()
     serializer_class = serializers.PostSerializer
+    pagination_class = PostPagination
+    document_cache = post_documents
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
         """Get posts for authenticated user's only"""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        # the search document is only ever read by the database
+        queryset = self.queryset.filter(
+            user=self.request.user).defer('search_document')
+
+        if self.action == 'retrieve':
+            # detail serializer nests full tag and content objects
+            queryset = queryset.prefetch_related('tags', 'contents')
+        elif self.action in ('list', 'create', 'update', 'partial_update'):
+            # PostSerializer only renders related primary keys
+            queryset = queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+                Prefetch('contents', queryset=Content.objects.only('id')),
+            )
+
+        if self.action == 'list':
+            queryset = filter_posts(queryset, self.request.query_params)
+            search = self.request.query_params.get(
+                PostPagination.search_query_param)
+            if search:
+                return self.search(queryset, search)
+        return queryset.order_by(*PostPagination.ordering)
+
+    def search(self, queryset, search):
+        """Return the posts matching a search, the most relevant first"""
+        query = SearchQuery(search, config=settings.POST_SEARCH_CONFIG)
+        return queryset.filter(search_document=query).annotate(
+            rank=SearchRank(F('search_document'), query)
+        ).order_by(*PostPagination.search_ordering)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.retrieve_document, request, *args, **kwargs)
+
+    def retrieve_document(self, request, *args, **kwargs):
+        """Serve a post's detail from the document cache when possible"""
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if not str(pk).isdigit():
+            return super().retrieve(request, *args, **kwargs)
+
+        # the document holds absolute URLs, built for the requested host
+        key = (int(pk), request.user.pk, request.data_version,
+               request.build_absolute_uri('/'))
+        document = self.document_cache.get(*key)
+        if document is not None:
+            return Response(document)
+
+        response = super().retrieve(request, *args, **kwargs)
+        # store a plain copy, the serializer's data holds on to the post
+        self.document_cache.set(*key, dict(response.data))
+        return response
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.PostDetailSerializer
-        elif self.action == 'upload_image':
+        elif self.action in ('upload_image', 'finalize_image_upload'):
             return serializers.PostImageSerializer
+        elif self.action in ('create_image_upload', 'image_upload'):
+            return serializers.ImageUploadSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
@@ -68,6 +312,8 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a post"""
+        # stream the upload to disk, before its body is first read
+        request.upload_handlers = image_upload_handlers(request)
         post = self.get_object()
         serializer = self.get_serializer(
             post,
@@ -85,3 +331,105 @@ class PostViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    def get_image_upload(self, post, upload_id):
+        """Return a resumable upload to the post by the user"""
+        return get_object_or_404(
+            ImageUpload, pk=upload_id, post=post, user=self.request.user)
+
+    @action(methods=['POST'], detail=True, url_path='image-uploads')
+    def create_image_upload(self, request, pk=None):
+        """Start a resumable upload of an image to a post"""
+        post = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(user=request.user, post=post)
+        start_upload(upload)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED,
+            headers={'Upload-Offset': str(upload.offset)}
+        )
+
+    @action(methods=['GET', 'PUT'], detail=True,
+            url_path=f'image-uploads/(?P<upload_id>{UUID_PATTERN})')
+    def image_upload(self, request, pk=None, upload_id=None):
+        """Report the progress of an upload, or append a chunk to it
+
+        Chunks are sent as the raw request body, with the Upload-Offset
+        header telling where they start.
+        """
+        upload = self.get_image_upload(self.get_object(), upload_id)
+        if request.method == 'PUT':
+            offset = request.META.get('HTTP_UPLOAD_OFFSET', '')
+            length = request.META.get('CONTENT_LENGTH', '')
+            if not offset.isdigit() or not length.isdigit():
+                return Response(
+                    {'detail': _('Upload-Offset and Content-Length headers '
+                                 'are required.')},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if int(offset) + int(length) > upload.size:
+                return Response(
+                    {'detail': _('The chunk ends past the upload size.')},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            try:
+                append_chunk(upload, int(offset), request.stream, int(length))
+            except UploadConflict as conflict:
+                return Response(
+                    {'detail': _('The chunk does not start at the upload '
+                                 'offset.'), 'offset': conflict.args[0]},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Upload-Offset': str(conflict.args[0])}
+                )
+
+        serializer = self.get_serializer(upload)
+        return Response(
+            serializer.data, headers={'Upload-Offset': str(upload.offset)})
+
+    @action(methods=['POST'], detail=True,
+            url_path=f'image-uploads/(?P<upload_id>{UUID_PATTERN})/finalize')
+    @transaction.atomic
+    def finalize_image_upload(self, request, pk=None, upload_id=None):
+        """Attach a complete upload as the post's image"""
+        post = self.get_object()
+        upload = get_object_or_404(
+            ImageUpload.objects.select_for_update(),
+            pk=upload_id, post=post, user=request.user
+        )
+        if upload.offset != upload.size:
+            return Response(
+                {'detail': _('The upload is not complete.'),
+                 'offset': upload.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        with open(part_path(upload.pk), 'rb') as part:
+            serializer = self.get_serializer(
+                post, data={'image': PartialFile(part, name=upload.filename)})
+            serializer.is_valid(raise_exception=True)
+            # moves the partial file into storage
+            serializer.save()
+        upload.delete()
+        transaction.on_commit(lambda: remove_part(upload_id))
+        return Response(serializer.data)
+
+
+class PostMediaView(ServerTimingMixin, APIView):
+    """Serve the images of the user's posts and their renditions"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, name):
+        """Send a stored image once the user is known to own a post of it"""
+        names = original_names(name)
+        if not Post.objects.filter(
+                user=request.user, image__in=names).exists():
+            raise Http404(name)
+
+        # content addressed originals never change, renditions are
+        # rewritten in place
+        immutable = bool(CONTENT_ADDRESSED_NAME.search(name))
+        return serve_file(request, image_storage(), name, immutable)
@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
@@ -170,3 +171,32 @@ class PrivateUserAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(self.user.name, params['name'])
         self.assertTrue(self.user.check_password(params['password']))
+
+
+class CachedUserUpdateTests(TestCase):
+    """Tests updates through a cached token do not restore old fields"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@email.com', password='demo1234', name='Test User')
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        # caches the token's user
+        self.client.get(ME_URL)
+
+    def test_update_keeps_fields_changed_elsewhere(self):
+        """Test a field changed without invalidating the cache is kept"""
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.set_password('changed123')
+        # as another process would, its invalidation not reaching here
+        get_user_model().objects.filter(pk=user.pk).update(
+            password=user.password)
+
+        res = self.client.patch(ME_URL, {'name': 'New Name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertEqual(user.name, 'New Name')
+        self.assertTrue(user.check_password('changed123'))
+        self.assertFalse(user.check_password('demo1234'))